@@ -9,11 +9,21 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter
+from channels.routing import ChannelNameRouter, ProtocolTypeRouter, URLRouter
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
+# Initialise Django before importing consumers (they import models)
+django_asgi_app = get_asgi_application()
+
+from game.consumers import FraudEventConsumer  # noqa: E402
+from game.routing import websocket_urlpatterns  # noqa: E402
+from game.services.fraud import FRAUD_CHANNEL  # noqa: E402
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
+    # Sockets authenticate with a JWT in the query string, not cookies
+    "websocket": URLRouter(websocket_urlpatterns),
+    # Background work sent over the channel layer (`manage.py runworker <channel>`)
+    "channel": ChannelNameRouter({FRAUD_CHANNEL: FraudEventConsumer.as_asgi()}),
 })
-
@@ -4,7 +4,7 @@ Django settings for core project.
 
 from pathlib import Path
 import os
-from decouple import config
+from decouple import Csv, config
 import dj_database_url
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -71,6 +71,10 @@ DATABASES = {
         ssl_require=not DEBUG and bool(_db_url),
     )
 }
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # A file rather than shared-cache memory, so that the concurrency tests'
+    # threads wait for each other's locks instead of failing
+    DATABASES["default"]["TEST"] = {"NAME": (BASE_DIR / "test_db.sqlite3").as_posix()}
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -89,10 +93,63 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
 
 TELEGRAM_BOT_TOKEN = config("TELEGRAM_BOT_TOKEN", default="")
+TELEGRAM_API_BASE_URL = config("TELEGRAM_API_BASE_URL", default="https://api.telegram.org")
 JWT_SECRET_KEY = config("JWT_SECRET_KEY", default="CHANGE_THIS_TO_A_RANDOM_SECRET")
 JWT_ALGORITHM = config("JWT_ALGORITHM", default="HS256")
 JWT_EXP_DELTA_SECONDS = config("JWT_EXP_DELTA_SECONDS", default=60 * 60 * 24, cast=int)
 
+# Matchmaking queue: "memory" (single worker) or "database" (shared by all workers)
+MATCHMAKING_BACKEND = config("MATCHMAKING_BACKEND", default="memory")
+# PvP round state for the HTTP move endpoint: "memory" or "database" (shared, survives restarts)
+ROUND_STATE_BACKEND = config("ROUND_STATE_BACKEND", default="memory")
+# Where match events go for fraud scoring: "thread" (background thread in each
+# worker), "inline" (in the request) or "channel" (one `runworker fraud-events`
+# process fed over the channel layer; needs REDIS_URL)
+FRAUD_PIPELINE_SINK = config("FRAUD_PIPELINE_SINK", default="thread")
+# Per-user request limits: "memory" (per worker) or "cache" (Django cache, shared via REDIS_URL)
+RATE_LIMIT_BACKEND = config("RATE_LIMIT_BACKEND", default="memory")
+# Seconds jwt_required may reuse a loaded user (0 disables); USER_CACHE_SHARED
+# adds the Django cache (Redis with REDIS_URL) as a second level
+USER_CACHE_TTL = config("USER_CACHE_TTL", default=5, cast=int)
+USER_CACHE_SHARED = config("USER_CACHE_SHARED", default=False, cast=bool)
+# Serve the hot endpoints from game.async_views (for daphne/ASGI); turn off under WSGI
+ASYNC_VIEWS = config("ASYNC_VIEWS", default=True, cast=bool)
+# Stars invoices created ahead of time by refill_invoice_pool: how many to keep
+# per amount (0 disables the pool), for which amounts, and how many seconds an
+# unclaimed one may be handed out
+INVOICE_POOL_SIZE = config("INVOICE_POOL_SIZE", default=20, cast=int)
+INVOICE_POOL_AMOUNTS = config("INVOICE_POOL_AMOUNTS", default="50,100,250", cast=Csv(int))
+INVOICE_POOL_TTL = config("INVOICE_POOL_TTL", default=60 * 60, cast=int)
+# Secret set as secret_token in setWebhook; the webhook refuses requests without
+# it (empty accepts any request)
+TELEGRAM_WEBHOOK_SECRET = config("TELEGRAM_WEBHOOK_SECRET", default="")
+# Threads per web worker answering pre-checkout queries straight from the
+# webhook inbox (0 leaves them to process_webhooks)
+WEBHOOK_FAST_LANE_THREADS = config("WEBHOOK_FAST_LANE_THREADS", default=4, cast=int)
+# Seconds between polls that bring each worker's in-memory leaderboard up to
+# date with ratings saved by other workers
+LEADERBOARD_REFRESH = config("LEADERBOARD_REFRESH", default=5, cast=int)
+
+# Channel layer used to push match events to open WebSockets. The in-memory
+# layer only reaches sockets on the same worker; set REDIS_URL when running
+# several workers.
+_redis_url = config("REDIS_URL", default="")
+if _redis_url:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [_redis_url]},
+        }
+    }
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": _redis_url,
+        }
+    }
+else:
+    CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
 CORS_ALLOW_ALL_ORIGINS = config("CORS_ALLOW_ALL_ORIGINS", default=DEBUG, cast=bool)
 CORS_ALLOW_CREDENTIALS = True
 
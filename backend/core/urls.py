@@ -14,10 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from game.views import health_check, telegram_webhook
 
+if settings.ASYNC_VIEWS:
+    from game.async_views import telegram_webhook  # noqa: F811
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/", include("game.urls")),
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.utils import timezone
 from .models import User, Rating, Match, Transaction, Withdrawal, PlatformRevenue
-from .services.wallet import unlock_coins
+from .services.jwt_service import revoke_user_tokens
+from .services.leaderboard import remove_user
+from .services.user_cache import invalidate_users
+from .services.wallet import release_locked_coins, unlock_coins
 
 
 admin.site.register(Rating)
@@ -14,6 +17,18 @@ class UserAdmin(admin.ModelAdmin):
     list_filter = ("is_flagged", "is_banned")
     search_fields = ("username", "telegram_id")
 
+    def save_model(self, request, obj, form, change):
+        # Bans, flags and balance edits must not be served from the user cache
+        super().save_model(request, obj, form, change)
+        invalidate_users(obj.pk)
+        if obj.is_banned and "is_banned" in form.changed_data:
+            revoke_user_tokens(obj.pk)
+        if "is_banned" in form.changed_data:
+            # Other workers drop or restore the user on their next leaderboard refresh
+            Rating.objects.filter(user=obj).update(updated_at=timezone.now())
+            if obj.is_banned:
+                remove_user(obj.pk)
+
 
 @admin.register(Match)
 class MatchAdmin(admin.ModelAdmin):
@@ -37,13 +52,14 @@ class WithdrawalAdmin(admin.ModelAdmin):
     def approve_withdrawals(self, request, queryset):
         count = 0
         for w in queryset.filter(status="pending"):
-            if w.user.locked_coins >= w.amount:
+            try:
+                release_locked_coins(w.user, w.amount)
                 w.status = "approved"
                 w.processed_at = timezone.now()
-                w.user.locked_coins -= w.amount
-                w.user.save()
                 w.save()
                 count += 1
+            except ValueError:
+                pass
         self.message_user(request, f"Approved {count} withdrawal(s).")
 
     approve_withdrawals.short_description = "Approve selected"
@@ -0,0 +1,241 @@
+"""
+Async versions of the hot Mini App endpoints, served when ``ASYNC_VIEWS``
+is on (the default under daphne). Single queries use the async ORM;
+multi-statement money movements stay in the sync services and run in a
+thread, since the async ORM has no transactions. Calls to Telegram go
+through the async Bot API client, so a slow Bot API no longer ties up a
+worker thread.
+"""
+
+import json
+import logging
+import traceback
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from game.models import Payment, Rating
+from game.services.auth import async_jwt_required
+from game.services.invoice_pool import claim_invoice, invoice_link_request, new_payload_id
+from game.services.leaderboard import record_rating
+from game.services.matchmaking import enqueue_player
+from game.services.payout import payout_match
+from game.services.rate_limit import rate_limit
+from game.services.rps_engine import validate_move
+from game.services.telegram_bot import CircuitOpenError, get_bot_client
+from game.services.webhook_inbox import aenqueue_update, secret_token_ok
+from game.services.wallet import deduct_coins
+from game.services.quick_play import (
+    MAX_BATCH_ROUNDS,
+    STAKE_OPTIONS,
+    apply_ai_round,
+    play_ai_round,
+    play_batch,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@csrf_exempt
+@async_jwt_required
+@require_POST
+async def wallet_balance(request):
+    return JsonResponse({
+        "coins": request.user.coins,
+        "locked_coins": request.user.locked_coins,
+    })
+
+
+@csrf_exempt
+@async_jwt_required
+@require_POST
+@rate_limit("find_match")
+async def find_match(request):
+    body = json.loads(request.body)
+    stake = int(body.get("stake"))
+
+    ip_address = request.META.get("REMOTE_ADDR")
+
+    match = await sync_to_async(enqueue_player)(request.user, stake, ip_address)
+
+    if match:
+        return JsonResponse({
+            "matched": True,
+            "match_id": match.id
+        })
+
+    return JsonResponse({
+        "matched": False,
+        "message": "Waiting for opponent"
+    })
+
+
+@csrf_exempt
+@async_jwt_required(fresh=True)
+@require_POST
+@rate_limit("quick_play")
+async def quick_play_submit(request):
+    """Single-round RPS vs random opponent. Deducts stake, pays out on win, updates rating."""
+    body = json.loads(request.body)
+    move = body.get("move")
+    stake = int(body.get("stake", 0))
+
+    if not validate_move(move):
+        return JsonResponse({"error": "Invalid move"}, status=400)
+
+    if stake not in STAKE_OPTIONS:
+        return JsonResponse({"error": "Invalid stake"}, status=400)
+
+    if request.user.coins < stake:
+        return JsonResponse({"error": "Insufficient balance"}, status=400)
+
+    await sync_to_async(deduct_coins)(request.user, stake, tx_type="stake")
+    balance_after_stake = request.user.coins
+
+    opponent_move, result_str = play_ai_round(move)
+
+    if result_str == "win":
+        # payout_match refreshes request.user's balance
+        await sync_to_async(payout_match)(request.user, stake)
+        coins_delta = request.user.coins - balance_after_stake
+    else:
+        coins_delta = -stake
+
+    rating_obj, _ = await Rating.objects.aget_or_create(user=request.user, defaults={"value": 1000})
+    rating_delta = apply_ai_round(rating_obj, result_str)
+    await rating_obj.asave()
+    record_rating(rating_obj.user_id, rating_obj.value)
+
+    return JsonResponse({
+        "player_move": move,
+        "opponent_move": opponent_move,
+        "result": result_str,
+        "coins_delta": coins_delta,
+        "rating_delta": rating_delta,
+        "new_balance": request.user.coins,
+        "new_rating": rating_obj.value,
+    })
+
+
+@csrf_exempt
+@async_jwt_required(fresh=True)
+@require_POST
+@rate_limit("quick_play_batch")
+async def quick_play_batch(request):
+    """Auto-play: one round vs random opponent per move, settled in a single transaction."""
+    body = json.loads(request.body)
+    moves = body.get("moves")
+    stake = int(body.get("stake", 0))
+
+    if not isinstance(moves, list) or not 0 < len(moves) <= MAX_BATCH_ROUNDS:
+        return JsonResponse({"error": f"Send 1 to {MAX_BATCH_ROUNDS} moves"}, status=400)
+
+    if not all(validate_move(move) for move in moves):
+        return JsonResponse({"error": "Invalid move"}, status=400)
+
+    if stake not in STAKE_OPTIONS:
+        return JsonResponse({"error": "Invalid stake"}, status=400)
+
+    if request.user.coins < stake:
+        return JsonResponse({"error": "Insufficient balance"}, status=400)
+
+    try:
+        rounds = await sync_to_async(play_batch)(request.user, moves, stake)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=409)
+
+    return JsonResponse({
+        "rounds": rounds,
+        "played": len(rounds),
+        "stopped_early": len(rounds) < len(moves),
+        "new_balance": request.user.coins,
+        "new_rating": rounds[-1]["new_rating"] if rounds else None,
+    })
+
+
+@csrf_exempt
+@async_jwt_required
+@require_POST
+async def create_invoice_view(request):
+    """
+    Creates a pending Payment and returns a Telegram Stars invoice link.
+    """
+    body = json.loads(request.body)
+    amount = int(body.get("amount", 10))  # Stars amount
+
+    if amount <= 0:
+        return JsonResponse({"error": "Invalid amount"}, status=400)
+
+    payment_obj = await sync_to_async(claim_invoice)(request.user, amount)
+    if payment_obj is not None:
+        return JsonResponse({
+            "invoice_link": payment_obj.invoice_link,
+            "payment_id": payment_obj.id
+        })
+
+    # 1 Star = 1 Coin (adjust ratio as needed)
+    coins_to_credit = amount
+    payload_id = new_payload_id()
+
+    payment_obj = None
+    try:
+        payment_obj = await Payment.objects.acreate(
+            user=request.user,
+            payload_id=payload_id,
+            amount=amount,
+            coins_credited=coins_to_credit,
+            status="pending"
+        )
+
+        res_data = await get_bot_client().acall(
+            "createInvoiceLink", invoice_link_request(payload_id, coins_to_credit, amount)
+        )
+        if res_data.get("ok"):
+            return JsonResponse({
+                "invoice_link": res_data["result"],
+                "payment_id": payment_obj.id
+            })
+
+        payment_obj.status = "failed"
+        await payment_obj.asave()
+        return JsonResponse({
+            "error": "Telegram API Error",
+            "details": res_data.get("description", "Unknown error"),
+            "raw": res_data
+        }, status=400)
+    except CircuitOpenError:
+        payment_obj.status = "failed"
+        await payment_obj.asave()
+        return JsonResponse({"error": "Payments are temporarily unavailable"}, status=503)
+    except Exception as e:
+        error_tb = traceback.format_exc()
+        logger.error(f"Invoice Creation Error: {error_tb}")
+
+        if payment_obj is not None:
+            payment_obj.status = "failed"
+            await payment_obj.asave()
+
+        return JsonResponse({
+            "error": "Internal Server Error",
+            "details": str(e),
+            "traceback": error_tb if settings.DEBUG else None
+        }, status=500)
+
+
+@csrf_exempt
+async def telegram_webhook(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "invalid request"}, status=400)
+
+    if not secret_token_ok(request.headers.get("X-Telegram-Bot-Api-Secret-Token")):
+        return JsonResponse({"error": "Forbidden"}, status=403)
+
+    try:
+        await aenqueue_update(json.loads(request.body))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"status": "queued"})
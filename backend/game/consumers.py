@@ -0,0 +1,286 @@
+import asyncio
+from urllib.parse import parse_qs
+
+from channels.consumer import SyncConsumer
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from game.models import Match, User
+from game.services.fraud import FraudScorer
+from game.services.jwt_service import decode_jwt
+from game.services.match import resolve_round
+from game.services.matchmaking import QUEUE_TIMEOUT, enqueue_player, get_queue, leave_queue
+from game.services.notifications import match_group, user_group
+from game.services.rps_engine import ROUND_TIMEOUT, validate_move
+
+# Re-park a waiting socket before its queue entry expires (server-side, no client traffic)
+KEEPALIVE_INTERVAL = QUEUE_TIMEOUT / 3
+ROUND_INTERVAL = 1  # seconds between a round result and the next round
+
+CLOSE_UNAUTHORIZED = 4001
+CLOSE_FORBIDDEN = 4003
+
+
+@database_sync_to_async
+def _get_user(user_id):
+    return User.objects.filter(id=user_id).first()
+
+
+@database_sync_to_async
+def _get_active_match(match_id):
+    return Match.objects.filter(id=match_id, status="active").first()
+
+
+@database_sync_to_async
+def _play_round(match_id, move1, move2):
+    match = Match.objects.select_related("player1", "player2").get(id=match_id)
+    if match.status != "active":
+        return None
+    return resolve_round(match, move1, move2)
+
+
+async def authenticate(scope):
+    """
+    User for the ``?token=<jwt>`` query parameter, or None (also for banned users).
+    Browsers cannot set an Authorization header on a WebSocket handshake.
+    """
+    params = parse_qs(scope.get("query_string", b"").decode())
+    token = (params.get("token") or [None])[0]
+    payload = decode_jwt(token) if token else None
+    if not payload:
+        return None
+    user = await _get_user(payload["user_id"])
+    if user is None or user.is_banned:
+        return None
+    return user
+
+
+class MatchmakingConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Parks a player in the matchmaking queue and pushes ``match_found`` the
+    moment ``enqueue_player`` pairs them, instead of the client polling
+    /api/match/find/.
+
+    Client → {"action": "find", "stake": 50} | {"action": "cancel"}
+    Server → {"type": "waiting"} | {"type": "match_found", "match_id": 1}
+             | {"type": "error", "error": "..."}
+    """
+
+    async def connect(self):
+        self.user = await authenticate(self.scope)
+        if self.user is None:
+            await self.close(code=CLOSE_UNAUTHORIZED)
+            return
+
+        self.search = None
+        self.group = user_group(self.user.id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if getattr(self, "user", None) is None:
+            return
+        await self.stop_search(leave=True)
+        await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get("action")
+
+        if action == "find":
+            try:
+                stake = int(content.get("stake"))
+            except (TypeError, ValueError):
+                stake = 0
+            if stake <= 0:
+                await self.send_json({"type": "error", "error": "Invalid stake"})
+                return
+            await self.stop_search(leave=False)
+            self.search = asyncio.create_task(self.search_loop(stake))
+
+        elif action == "cancel":
+            await self.stop_search(leave=True)
+
+        else:
+            await self.send_json({"type": "error", "error": "Unknown action"})
+
+    async def search_loop(self, stake):
+        ip_address = (self.scope.get("client") or [None])[0]
+        notified = False
+        while True:
+            try:
+                match = await database_sync_to_async(enqueue_player)(self.user, stake, ip_address)
+            except ValueError as exc:
+                await self.send_json({"type": "error", "error": str(exc)})
+                return
+            if match:
+                # enqueue_player already pushed match.found to both players
+                return
+            if not notified:
+                await self.send_json({"type": "waiting"})
+                notified = True
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+
+    async def stop_search(self, leave):
+        if self.search is not None:
+            self.search.cancel()
+            self.search = None
+            if leave:
+                await database_sync_to_async(leave_queue)(self.user)
+
+    async def match_found(self, event):
+        """Group event sent by ``notify_match_found``."""
+        if self.search is not None:
+            self.search.cancel()
+            self.search = None
+        # The match was delivered here, so drop the claim a later poll would pick up
+        await database_sync_to_async(get_queue().pop_match)(self.user)
+        await self.send_json({"type": "match_found", "match_id": event["match_id"]})
+
+
+class MatchConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Runs a PvP match in real time, one socket per player on ws/match/<id>/.
+
+    Player 1's socket owns the match lifecycle: it starts each round once both
+    players are connected, collects both moves (player 2's arrive through the
+    match group, so the sockets may live on different workers), resolves the
+    round when both are in or when the ROUND_TIMEOUT timer fires, and
+    broadcasts the result. Moves are never forwarded to the opponent.
+
+    Client → {"action": "move", "move": "rock"}
+    Server → {"type": "round_start", "round": 1, "timeout": 2}
+             | {"type": "move_accepted", "round": 1}
+             | {"type": "round_result", "round": 1, "round_result": "player1",
+                "player1_score": 1, "player2_score": 0, "match_finished": false,
+                "winner": null}
+             | {"type": "error", "error": "..."}
+    """
+
+    group = None
+
+    async def connect(self):
+        self.user = await authenticate(self.scope)
+        if self.user is None:
+            await self.close(code=CLOSE_UNAUTHORIZED)
+            return
+
+        self.match_id = self.scope["url_route"]["kwargs"]["match_id"]
+        match = await _get_active_match(self.match_id)
+        if match is None or self.user.id not in (match.player1_id, match.player2_id):
+            await self.close(code=CLOSE_FORBIDDEN)
+            return
+
+        self.player_ids = (match.player1_id, match.player2_id)
+        self.is_owner = self.user.id == match.player1_id
+        self.peer_ready = False
+        self.round_open = False
+        self.round_no = 0
+        self.moves = {}
+        self.timer = None  # owner: ROUND_TIMEOUT timer of the round being collected
+        self.pause = None  # owner: delay before the next round
+
+        self.group = match_group(self.match_id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+        await self.broadcast("player.ready", user_id=self.user.id)
+
+    async def disconnect(self, code):
+        if self.group is None:
+            return
+        for task in (self.timer, self.pause):
+            if task is not None:
+                task.cancel()
+        await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def broadcast(self, event_type, **data):
+        await self.channel_layer.group_send(self.group, {"type": event_type, **data})
+
+    async def receive_json(self, content, **kwargs):
+        if content.get("action") != "move":
+            await self.send_json({"type": "error", "error": "Unknown action"})
+            return
+
+        move = content.get("move")
+        if not validate_move(move):
+            await self.send_json({"type": "error", "error": "Invalid move"})
+            return
+        if not self.round_open:
+            await self.send_json({"type": "error", "error": "No round in progress"})
+            return
+
+        await self.broadcast("move.submitted", user_id=self.user.id, round=self.round_no, move=move)
+        await self.send_json({"type": "move_accepted", "round": self.round_no})
+
+    # --- group events -------------------------------------------------
+
+    async def player_ready(self, event):
+        if event["user_id"] == self.user.id or self.peer_ready:
+            return
+        self.peer_ready = True
+        # Answer once so a player who connected first learns about us too
+        await self.broadcast("player.ready", user_id=self.user.id)
+        if self.is_owner and self.round_no == 0:
+            await self.start_round()
+
+    async def move_submitted(self, event):
+        if not self.is_owner or self.timer is None or event["round"] != self.round_no:
+            return
+        self.moves.setdefault(event["user_id"], event["move"])
+        if len(self.moves) == len(self.player_ids):
+            self.timer.cancel()
+            await self.finish_round()
+
+    async def round_start(self, event):
+        self.round_open = True
+        self.round_no = event["round"]
+        await self.send_json({"type": "round_start", "round": event["round"], "timeout": event["timeout"]})
+
+    async def round_result(self, event):
+        self.round_open = False
+        await self.send_json({**event, "type": "round_result"})
+        if event["match_finished"]:
+            await self.close()
+
+    # --- owner-side round lifecycle -----------------------------------
+
+    async def start_round(self):
+        self.round_no += 1
+        self.moves = {}
+        self.timer = asyncio.create_task(self.round_timer(self.round_no))
+        await self.broadcast("round.start", round=self.round_no, timeout=ROUND_TIMEOUT)
+
+    async def round_timer(self, round_no):
+        await asyncio.sleep(ROUND_TIMEOUT)
+        if round_no == self.round_no:
+            await self.finish_round()
+
+    async def finish_round(self):
+        # Cleared before any await so a late move cannot resolve the round twice
+        self.timer = None
+        player1_id, player2_id = self.player_ids
+        outcome = await _play_round(
+            self.match_id, self.moves.get(player1_id), self.moves.get(player2_id)
+        )
+        if outcome is None:
+            return
+
+        await self.broadcast("round.result", round=self.round_no, **outcome)
+        if not outcome["match_finished"]:
+            self.pause = asyncio.create_task(self.next_round())
+
+    async def next_round(self):
+        await asyncio.sleep(ROUND_INTERVAL)
+        self.pause = None
+        await self.start_round()
+
+
+class FraudEventConsumer(SyncConsumer):
+    """
+    Scores match events sent by the "channel" fraud sink. Run one worker
+    (`manage.py runworker fraud-events`) so all events reach the same windows.
+    """
+
+    scorer = FraudScorer()
+
+    def fraud_event(self, message):
+        self.scorer.process(message["event"])
@@ -0,0 +1,54 @@
+"""
+Helpers shared by the benchmark commands.
+
+Benchmarks run against a throwaway copy of the schema (the same test
+database Django's test runner would create), never against real data.
+"""
+
+import os
+import statistics
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """Create a disposable test database for the duration of the block."""
+    connection = connections["default"]
+    if connection.vendor == "sqlite":
+        # A file (not :memory:) so that worker threads can share it
+        tmp_dir = tempfile.mkdtemp(prefix="rps-bench-")
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tmp_dir, "bench.sqlite3")
+
+    old_name = connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, serialize=False
+    )
+    try:
+        yield connection
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not samples:
+        return 0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Mean / p50 / p95 / p99 of latency samples in seconds, reported in ms."""
+    if not samples:
+        return "n=0"
+    return (
+        f"n={len(samples)} "
+        f"mean={statistics.fmean(samples) * 1000:.2f}ms "
+        f"p50={percentile(samples, 50) * 1000:.2f}ms "
+        f"p95={percentile(samples, 95) * 1000:.2f}ms "
+        f"p99={percentile(samples, 99) * 1000:.2f}ms"
+    )
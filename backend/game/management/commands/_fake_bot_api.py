@@ -0,0 +1,97 @@
+"""
+A local stand-in for api.telegram.org, used by the load tests and the
+`fake_bot_api` command. It answers the Bot API methods this app calls and
+can be told to be slow, flaky or rate limited.
+"""
+
+import json
+import multiprocessing
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeBotAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, latency=0.0, fail_rate=0.0, rate_limit=0, retry_after=1):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.fail_rate = fail_rate  # share of calls answered with HTTP 502
+        self.rate_limit = rate_limit  # calls per second before answering 429 (0: unlimited)
+        self.retry_after = retry_after
+        self.calls = 0
+        self._window = (0, 0)  # (second, calls in that second)
+        self._lock = threading.Lock()
+
+    def over_rate_limit(self):
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            second, count = self._window
+            now = int(time.time())
+            count = count + 1 if now == second else 1
+            self._window = (now, count)
+            return count > self.rate_limit
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real Bot API
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        server.calls += 1
+        time.sleep(server.latency)
+
+        if random.random() < server.fail_rate:
+            return self._reply(502, {"ok": False, "error_code": 502, "description": "Bad Gateway"})
+        if server.over_rate_limit():
+            return self._reply(429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {server.retry_after}",
+                "parameters": {"retry_after": server.retry_after},
+            })
+
+        method = self.path.rsplit("/", 1)[-1]
+        if method == "createInvoiceLink":
+            return self._reply(200, {"ok": True, "result": f"https://t.me/$fake-{payload.get('payload', '')}"})
+        if method in ("answerPreCheckoutQuery", "sendMessage"):
+            return self._reply(200, {"ok": True, "result": True})
+        if method == "getMe":
+            return self._reply(200, {"ok": True, "result": {"id": 1, "is_bot": True, "username": "fake_bot"}})
+        return self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found: method not found"})
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(port_queue, kwargs):
+    server = FakeBotAPIServer(("127.0.0.1", 0), **kwargs)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def start_fake_bot_api(**kwargs):
+    """
+    Run the fake server in a child process (so it does not compete for the
+    caller's GIL). Returns (process, base_url); terminate the process when done.
+    """
+    ctx = multiprocessing.get_context("fork")
+    port_queue = ctx.Queue()
+    process = ctx.Process(target=_serve, args=(port_queue, kwargs), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=10)}"
@@ -0,0 +1,73 @@
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+
+from game.services.telegram_bot import CircuitBreaker, TelegramAPIError, TelegramBotClient
+from ._bench import summarize
+from ._fake_bot_api import start_fake_bot_api
+
+INVOICE = {"title": "Bench", "description": "Bench", "payload": "bench", "currency": "XTR", "prices": []}
+
+
+def _legacy_call(base_url, method, payload, timeout=10):
+    """What the views did before: a bare requests.post, new connection every time."""
+    return requests.post(f"{base_url}/botbench/{method}", json=payload, timeout=timeout).json()
+
+
+class Command(BaseCommand):
+    help = "Compares bare requests.post with TelegramBotClient against a local fake Bot API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=300)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("\n=== TELEGRAM BOT CLIENT ==="))
+        self.healthy(options["calls"])
+        self.rate_limited()
+        self.outage()
+
+    def _run(self, label, call, count):
+        samples, failures = [], 0
+        start = time.perf_counter()
+        for _ in range(count):
+            t0 = time.perf_counter()
+            try:
+                ok = call().get("ok")
+            except TelegramAPIError:
+                ok = False
+            samples.append(time.perf_counter() - t0)
+            failures += not ok
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"  {label:<28} failed={failures:<4} total={elapsed:.2f}s  {summarize(samples)}")
+
+    def healthy(self, calls):
+        process, base_url = start_fake_bot_api()
+        try:
+            self.stdout.write("Healthy Bot API, sequential createInvoiceLink:")
+            client = TelegramBotClient(token="bench", base_url=base_url)
+            self._run("requests.post", lambda: _legacy_call(base_url, "createInvoiceLink", INVOICE), calls)
+            self._run("TelegramBotClient (pooled)", lambda: client.call("createInvoiceLink", INVOICE), calls)
+        finally:
+            process.terminate()
+
+    def rate_limited(self):
+        process, base_url = start_fake_bot_api(rate_limit=20, retry_after=1)
+        try:
+            self.stdout.write("Bot API limited to 20 calls/s, 60 calls:")
+            client = TelegramBotClient(token="bench", base_url=base_url)
+            self._run("requests.post", lambda: _legacy_call(base_url, "createInvoiceLink", INVOICE), 60)
+            time.sleep(1)
+            self._run("TelegramBotClient (retry_after)", lambda: client.call("createInvoiceLink", INVOICE), 60)
+        finally:
+            process.terminate()
+
+    def outage(self):
+        process, base_url = start_fake_bot_api(latency=1.0, fail_rate=1.0)
+        try:
+            self.stdout.write("Bot API down (1s then HTTP 502), 20 calls:")
+            client = TelegramBotClient(token="bench", base_url=base_url, breaker=CircuitBreaker(reset_timeout=60))
+            self._run("requests.post", lambda: _legacy_call(base_url, "createInvoiceLink", INVOICE), 20)
+            self._run("TelegramBotClient (breaker)", lambda: client.call("createInvoiceLink", INVOICE), 20)
+        finally:
+            process.terminate()
@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from game.models import Match, User
+from game.services.match import enter_match
+from game.services.wallet import deduct_coins
+from ._bench import scratch_database
+
+
+def _two_step_enter_match(player1, player2, stake):
+    """The previous flow: two separately committed debits, then the match row."""
+    deduct_coins(player1, stake, tx_type="stake")
+    deduct_coins(player2, stake, tx_type="stake")
+    return Match.objects.create(player1=player1, player2=player2, stake=stake, status="active")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures matches created per second by the escrow in enter_match. "
+        "Runs against the configured database engine (SQLite by default, "
+        "Postgres when DATABASE_URL points at one)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--matches", type=int, default=2_000)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--pairs", type=int, default=50, help="Distinct player pairs")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(self.style.SUCCESS(f"\n=== MATCH ESCROW ({connection.vendor}) ==="))
+            for name, create in (("two-step", _two_step_enter_match), ("enter_match", enter_match)):
+                self.run(name, create, options)
+            self.check_no_partial_debit()
+
+    def run(self, name, create, options):
+        Match.objects.all().delete()
+        User.objects.all().delete()
+        User.objects.bulk_create(
+            User(telegram_id=i + 1, username=f"escrow_{i}", coins=10**9)
+            for i in range(2 * options["pairs"])
+        )
+        users = list(User.objects.order_by("id"))
+        pairs = [(users[i], users[i + 1]) for i in range(0, len(users), 2)]
+        errors = []
+
+        def op(i):
+            player1, player2 = pairs[i % len(pairs)]
+            try:
+                create(player1, player2, 50)
+            except OperationalError as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            list(pool.map(op, range(options["matches"])))
+        elapsed = time.perf_counter() - start
+
+        created = Match.objects.count()
+        self.stdout.write(
+            f"  {name:<12} {created / elapsed:8.0f} matches/s "
+            f"({created} in {elapsed:.2f}s, {options['threads']} threads, lock errors: {len(errors)})"
+        )
+
+    def check_no_partial_debit(self):
+        rich = User.objects.create(telegram_id=10**9, username="rich", coins=100)
+        poor = User.objects.create(telegram_id=10**9 + 1, username="poor", coins=10)
+        try:
+            enter_match(rich, poor, 50)
+        except ValueError:
+            pass
+        rich.refresh_from_db()
+        status = "ok" if rich.coins == 100 else f"FAILED (balance {rich.coins})"
+        self.stdout.write(f"  Failed escrow leaves player1 untouched: {status}")
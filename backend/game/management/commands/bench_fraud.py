@@ -0,0 +1,78 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game.models import User
+from game.services.fraud import FraudScorer
+from ._bench import scratch_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Feeds synthetic match events through the fraud scorer, reports events/s "
+        "and checks that planted farming accounts, and only those, get flagged (honest "
+        "accounts sharing an IP included)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20_000)
+        parser.add_argument("--matches", type=int, default=200_000)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            User.objects.bulk_create(
+                (User(telegram_id=i + 1, username=f"fraud_{i}") for i in range(options["users"] + 7)),
+                batch_size=5_000,
+            )
+            ids = list(User.objects.order_by("id").values_list("id", flat=True))
+            honest, (dumper, receiver, farmer, feeder, *household) = ids[:-7], ids[-7:]
+            events = self.build_events(options["matches"], honest, dumper, receiver, farmer, feeder, household)
+
+            scorer = FraudScorer()
+            start = time.perf_counter()
+            for event in events:
+                scorer.process(event)
+            elapsed = time.perf_counter() - start
+
+            flagged = set(User.objects.filter(is_flagged=True).values_list("id", flat=True))
+
+        planted = {dumper, receiver, farmer, feeder}
+        self.stdout.write(self.style.SUCCESS("\n=== FRAUD PIPELINE ==="))
+        self.stdout.write(
+            f"  {len(events)} events in {elapsed:.2f}s ({len(events) / elapsed:,.0f} events/s, "
+            f"{elapsed / len(events) * 1e6:.1f}µs each)"
+        )
+        self.stdout.write(f"  Planted accounts flagged: {len(planted & flagged)}/{len(planted)}")
+        self.stdout.write(f"  Honest accounts flagged: {len(flagged - planted)}")
+        if planted - flagged:
+            raise CommandError(f"Planted accounts not flagged: {sorted(planted - flagged)}")
+
+    def build_events(self, matches, honest, dumper, receiver, farmer, feeder, household):
+        now = time.time()
+        events = []
+
+        def play(match_id, player1, player2, winner, ip1, ip2, stake=50):
+            base = {
+                "match": match_id, "player1": player1, "player2": player2,
+                "player1_ip": ip1, "player2_ip": ip2, "stake": stake,
+                "at": now + match_id * 0.01,
+            }
+            events.append(dict(base, kind="match.created"))
+            events.append(dict(base, kind="match.finished", winner=winner))
+
+        for match_id in range(matches):
+            player1, player2 = random.sample(honest, 2)
+            play(match_id, player1, player2, random.choice((player1, player2)),
+                 f"10.{player1 % 250}.{player1 // 250 % 250}.1", f"10.{player2 % 250}.{player2 // 250 % 250}.1")
+
+            # Every so often the planted accounts play among themselves, and an
+            # honest household plays from its one address
+            if match_id % (matches // 10 or 1) == 0:
+                play(match_id, dumper, receiver, receiver, "192.0.2.1", "198.51.100.1", stake=100)
+                play(match_id, farmer, feeder, farmer, "203.0.113.7", "203.0.113.7")
+                # Each pair of the household in turn, wins alternating
+                round_ = match_id // (matches // 10 or 1)
+                a, b = household[round_ % 3], household[(round_ + 1) % 3]
+                play(match_id, a, b, (a, b)[round_ // 3 % 2], "203.0.113.99", "203.0.113.99")
+        return events
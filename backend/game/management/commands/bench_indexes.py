@@ -0,0 +1,153 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from game.models import Match, Payment, PlatformRevenue, Transaction, User, Withdrawal
+from ._bench import scratch_database
+
+# Indexes added for the hot queries; dropped for the "before" pass
+HOT_INDEX_MODELS = (User, Match, Transaction, Payment, Withdrawal, PlatformRevenue)
+BATCH_SIZE = 5_000
+HISTORY_DAYS = 90
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a scratch database with a few million rows and reports the query "
+        "plan and timing of each hot query with and without its index"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20_000)
+        parser.add_argument("--transactions", type=int, default=2_000_000)
+        parser.add_argument("--matches", type=int, default=500_000)
+        parser.add_argument("--payments", type=int, default=200_000)
+        parser.add_argument("--withdrawals", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=50, help="Runs per query")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.seed(options)
+            indexes = [(model, index) for model in HOT_INDEX_MODELS for index in model._meta.indexes]
+
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.remove_index(model, index)
+            self.analyze()
+            before = self.measure(options["repeat"])
+
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.add_index(model, index)
+            self.analyze()
+            after = self.measure(options["repeat"])
+
+            self.report(before, after)
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def seed(self, options):
+        now = timezone.now()
+        start = time.perf_counter()
+        User.objects.bulk_create(
+            (
+                User(telegram_id=i + 1, username=f"idx_{i}", created_at=now - timedelta(days=random.random() * HISTORY_DAYS))
+                for i in range(options["users"])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        user_ids = list(User.objects.values_list("id", flat=True))
+        self.user_ids = user_ids
+
+        def when():
+            return now - timedelta(days=random.random() * HISTORY_DAYS)
+
+        self._bulk(Transaction, options["transactions"], lambda: Transaction(
+            user_id=random.choice(user_ids), amount=random.randint(-100, 100), type="stake", created_at=when(),
+        ))
+        self._bulk(Match, options["matches"], lambda: Match(
+            player1_id=random.choice(user_ids), player2_id=random.choice(user_ids), stake=50,
+            status="finished", created_at=when(),
+        ))
+
+        def payment():
+            status = random.choice(["pending", "completed", "failed"])
+            return Payment(
+                user_id=random.choice(user_ids), amount=100, coins_credited=1000,
+                status=status, completed_at=when() if status == "completed" else None,
+            )
+
+        self._bulk(Payment, options["payments"], payment)
+        # auto_now / auto_now_add overwrite these on insert, so each batch is back-dated afterwards
+        self._bulk(Withdrawal, options["withdrawals"], lambda: Withdrawal(
+            user_id=random.choice(user_ids), amount=100, wallet_address="EQ...",
+        ), backdate="requested_at")
+        self._bulk(PlatformRevenue, options["matches"], lambda: PlatformRevenue(amount=10), backdate="created_at")
+
+        self.stdout.write(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+    def _bulk(self, model, count, make, backdate=None):
+        for offset in range(0, count, BATCH_SIZE):
+            last_id = model.objects.order_by("-id").values_list("id", flat=True).first() or 0
+            model.objects.bulk_create([make() for _ in range(min(BATCH_SIZE, count - offset))])
+            if backdate:
+                model.objects.filter(id__gt=last_id).update(
+                    **{backdate: timezone.now() - timedelta(days=random.random() * HISTORY_DAYS)}
+                )
+
+    def queries(self):
+        """The hot queries, written the way the views and services issue them."""
+        now = timezone.now()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        user_id, other_id = random.sample(self.user_ids, 2)
+        return {
+            "transaction history": Transaction.objects.filter(user_id=user_id).order_by("-created_at")[:50],
+            "daily withdrawals": Withdrawal.objects.filter(user_id=user_id, requested_at__gte=today_start),
+            "rapid play check": Match.objects.filter(player1_id=user_id, created_at__gte=now - timedelta(minutes=1)),
+            "anti_farm pair": Match.objects.filter(
+                Q(player1_id=user_id, player2_id=other_id) | Q(player1_id=other_id, player2_id=user_id)
+            ).order_by("-created_at")[:5],
+            "stars today": Payment.objects.filter(status="completed", completed_at__gte=today_start),
+            "rake today": PlatformRevenue.objects.filter(created_at__gte=today_start),
+            "new users today": User.objects.filter(created_at__gte=today_start),
+            "matches today": Match.objects.filter(created_at__gte=today_start),
+        }
+
+    def run_query(self, name, queryset):
+        if name in ("daily withdrawals", "stars today", "rake today"):
+            return queryset.aggregate(Sum("amount"))
+        if name.endswith("today") or name == "rapid play check":
+            return queryset.count()
+        return list(queryset)
+
+    def measure(self, repeat):
+        results = {}
+        for name, queryset in self.queries().items():
+            plan = queryset.explain()
+            samples = []
+            for _ in range(repeat):
+                queryset = self.queries()[name]
+                start = time.perf_counter()
+                self.run_query(name, queryset)
+                samples.append(time.perf_counter() - start)
+            results[name] = (plan, sorted(samples)[len(samples) // 2])
+        return results
+
+    def report(self, before, after):
+        self.stdout.write(self.style.SUCCESS(f"\n=== HOT QUERY INDEXES ({connection.vendor}) ==="))
+        for name in before:
+            plan_before, median_before = before[name]
+            plan_after, median_after = after[name]
+            speedup = median_before / median_after if median_after else float("inf")
+            self.stdout.write(self.style.SUCCESS(
+                f"\n{name}: {median_before * 1000:.2f}ms -> {median_after * 1000:.2f}ms (x{speedup:.1f})"
+            ))
+            self.stdout.write("  before: " + plan_before.replace("\n", "\n          "))
+            self.stdout.write("  after:  " + plan_after.replace("\n", "\n          "))
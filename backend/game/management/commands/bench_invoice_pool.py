@@ -0,0 +1,62 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from game.models import Payment, User
+from game.services.invoice_pool import refill_pool
+from game.services.jwt_service import generate_jwt
+from game.services.telegram_bot import TelegramBotClient
+from ._bench import scratch_database, summarize
+from ._fake_bot_api import start_fake_bot_api
+
+
+class Command(BaseCommand):
+    help = "Invoice creation latency on a pool miss (Telegram round trip) vs a pool hit"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--telegram-latency", type=float, default=0.1, help="Seconds per Bot API call")
+
+    def handle(self, *args, **options):
+        count = options["requests"]
+        bot_api, bot_api_url = start_fake_bot_api(latency=options["telegram_latency"])
+        try:
+            with scratch_database(), override_settings(
+                ALLOWED_HOSTS=["*"],
+                SECURE_SSL_REDIRECT=False,
+                ASYNC_VIEWS=False,
+                TELEGRAM_API_BASE_URL=bot_api_url,
+                TELEGRAM_BOT_TOKEN="bench",
+                INVOICE_POOL_AMOUNTS=[100],
+            ):
+                user = User.objects.create(telegram_id=1, username="bench")
+                client = Client(headers={"Authorization": f"Bearer {generate_jwt(user)}"})
+
+                self.stdout.write(self.style.SUCCESS("\n=== INVOICE POOL ==="))
+                self.stdout.write(f"Bot API latency {options['telegram_latency'] * 1000:.0f}ms, {count} sequential requests")
+                self._run("pool empty (miss)", client, count)
+
+                start = time.perf_counter()
+                created = refill_pool(size=count, ttl=3600, client=TelegramBotClient())
+                self.stdout.write(f"  refilled {created[100]} invoices in {time.perf_counter() - start:.2f}s (off the request path)")
+                self._run("pool stocked (hit)", client, count)
+
+                left = Payment.objects.filter(status="pooled").count()
+                claimed = Payment.objects.filter(status="pending", invoice_link__isnull=False).count()
+                self.stdout.write(f"  pooled left={left} claimed={claimed}")
+        finally:
+            bot_api.terminate()
+
+    def _run(self, label, client, count):
+        samples, errors = [], 0
+        for _ in range(count):
+            t0 = time.perf_counter()
+            response = client.post(
+                "/api/wallet/stars/invoice/", json.dumps({"amount": 100}), content_type="application/json"
+            )
+            samples.append(time.perf_counter() - t0)
+            errors += response.status_code != 200
+        self.stdout.write(f"  {label:<20} errors={errors:<3} {summarize(samples)}")
@@ -0,0 +1,37 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from game.models import User
+from game.services.jwt_service import decode_jwt, generate_jwt
+from ._bench import summarize
+
+TARGET_RPS = 10_000
+
+
+class Command(BaseCommand):
+    help = "Measures decode_jwt cost per request with and without the verified-token cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=2_000, help="Distinct tokens in flight")
+        parser.add_argument("--requests", type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        # Unsaved users: generating and decoding tokens needs no database
+        tokens = [generate_jwt(User(id=i + 1, telegram_id=i + 1)) for i in range(options["clients"])]
+        stream = [random.choice(tokens) for _ in range(options["requests"])]
+
+        self.stdout.write(self.style.SUCCESS(f"\n=== JWT DECODE ({options['clients']} clients) ==="))
+        for label, use_cache in (("full verification", False), ("verified-token cache", True)):
+            samples = []
+            for token in stream:
+                start = time.perf_counter()
+                decode_jwt(token, use_cache=use_cache)
+                samples.append(time.perf_counter() - start)
+            mean = sum(samples) / len(samples)
+            self.stdout.write(f"  {label:<22} {summarize(samples)}")
+            self.stdout.write(
+                f"  {'':<22} {mean * 1e6:.1f}µs per request; at {TARGET_RPS:,} RPS "
+                f"{mean * TARGET_RPS:.1%} of one core spent decoding"
+            )
@@ -0,0 +1,80 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from game.models import Rating, User
+from game.services.leaderboard import DatabaseLeaderboard, Leaderboard, decode_cursor
+from ._bench import percentile, scratch_database
+
+
+def _us(samples):
+    return f"p50={percentile(samples, 50) * 1e6:.1f}µs p99={percentile(samples, 99) * 1e6:.1f}µs"
+
+
+class Command(BaseCommand):
+    help = "Rank and top-page latency of the in-memory leaderboard vs queries against the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000, help="Rated users on the in-memory board")
+        parser.add_argument("--db-users", type=int, default=100_000, help="Rated users in the scratch database")
+        parser.add_argument("--queries", type=int, default=2_000)
+
+    def _measure(self, label, board, user_ids, queries):
+        rank, top, deep = [], [], []
+        for _ in range(queries):
+            user_id = random.choice(user_ids)
+            start = time.perf_counter()
+            board.rank(user_id)
+            rank.append(time.perf_counter() - start)
+
+        after = None
+        for _ in range(min(queries, 200)):
+            start = time.perf_counter()
+            board.top(50)
+            top.append(time.perf_counter() - start)
+
+            # Walk down the board page by page, as a scrolling client would
+            start = time.perf_counter()
+            _, cursor = board.top(50, after)
+            deep.append(time.perf_counter() - start)
+            after = decode_cursor(cursor) if cursor else None
+        self.stdout.write(f"  {label}")
+        self.stdout.write(f"    rank          {_us(rank)}")
+        self.stdout.write(f"    top 50        {_us(top)}")
+        self.stdout.write(f"    next page     {_us(deep)}")
+
+    def handle(self, *args, **options):
+        users, queries = options["users"], options["queries"]
+
+        self.stdout.write(self.style.SUCCESS(f"\n=== IN-MEMORY LEADERBOARD ({users:,} users) ==="))
+        rows = [(user_id, int(random.gauss(1000, 150))) for user_id in range(1, users + 1)]
+        start = time.perf_counter()
+        board = Leaderboard(rows)
+        self.stdout.write(f"  load          {time.perf_counter() - start:.2f}s")
+        self._measure("reads", board, range(1, users + 1), queries)
+
+        updates = []
+        for _ in range(queries):
+            user_id = random.randint(1, users)
+            start = time.perf_counter()
+            board.update(user_id, board.values[user_id] + random.randint(-32, 32))
+            updates.append(time.perf_counter() - start)
+        self.stdout.write(f"    update        {_us(updates)}")
+
+        db_users = options["db_users"]
+        with scratch_database():
+            self.stdout.write(self.style.SUCCESS(f"\n=== DATABASE LEADERBOARD ({db_users:,} users) ==="))
+            User.objects.bulk_create(
+                (User(telegram_id=i + 1, username=f"bench_{i}") for i in range(db_users)), batch_size=5_000
+            )
+            user_ids = list(User.objects.values_list("id", flat=True))
+            Rating.objects.bulk_create(
+                (Rating(user_id=user_id, value=int(random.gauss(1000, 150))) for user_id in user_ids),
+                batch_size=5_000,
+            )
+            self._measure("reads", DatabaseLeaderboard(), user_ids, min(queries, 500))
+
+            # Same data in memory, so both boards answer over the same set
+            rows = Rating.objects.values_list("user_id", "value")
+            self._measure("in-memory, same users", Leaderboard(rows), user_ids, queries)
@@ -0,0 +1,92 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from game.models import Match, User
+from game.services.matchmaking import QUEUE_BACKENDS, enqueue_player
+from ._bench import scratch_database, summarize
+
+
+class Command(BaseCommand):
+    help = "Measures time-to-match under concurrent load across simulated workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backend", choices=sorted(QUEUE_BACKENDS), default="database")
+        parser.add_argument("--workers", type=int, default=4, help="Simulated server processes")
+        parser.add_argument("--players", type=int, default=100)
+        parser.add_argument("--stake", type=int, default=50)
+        parser.add_argument("--poll-interval", type=float, default=0.2, help="Seconds between polls")
+        parser.add_argument("--timeout", type=float, default=10.0, help="Seconds a player waits")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options)
+
+    def run(self, options):
+        backend = QUEUE_BACKENDS[options["backend"]]
+        if options["backend"] == "memory":
+            # Every process has its own dict, which is exactly the problem
+            workers = [backend() for _ in range(options["workers"])]
+        else:
+            shared = backend()
+            workers = [shared] * options["workers"]
+
+        User.objects.bulk_create(
+            User(telegram_id=900_000 + i, username=f"bench_{i}", coins=10_000)
+            for i in range(options["players"])
+        )
+        users = list(User.objects.order_by("id"))
+
+        started_at = {}
+        paired_at = {}
+        errors = []
+
+        def player(user):
+            start = started_at[user.id] = time.perf_counter()
+            deadline = start + options["timeout"]
+            try:
+                while time.perf_counter() < deadline:
+                    try:
+                        match = enqueue_player(
+                            user, options["stake"], "127.0.0.1", queue=random.choice(workers)
+                        )
+                    except OperationalError as exc:
+                        errors.append(exc)
+                        match = None
+                    if match:
+                        paired_at[user.id] = time.perf_counter()
+                        return
+                    time.sleep(options["poll_interval"])
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=player, args=(u,)) for u in users]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+            time.sleep(0.005)  # stagger arrivals
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        waits = [paired_at[uid] - started_at[uid] for uid in paired_at]
+        timed_out = options["players"] - len(waits)
+        matches = Match.objects.count()
+        double_booked = sum(1 for u in users if _match_count(u) > 1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n=== MATCHMAKING ({options['backend']}, {options['workers']} workers) ==="
+        ))
+        self.stdout.write(f"  Players: {options['players']}  Wall time: {elapsed:.2f}s")
+        self.stdout.write(f"  Time to match: {summarize(waits)}")
+        self.stdout.write(f"  Timed out: {timed_out}")
+        self.stdout.write(f"  Matches created: {matches}  Players paired more than once: {double_booked}")
+        if errors:
+            self.stdout.write(self.style.WARNING(f"  Lock errors retried: {len(errors)}"))
+
+
+def _match_count(user):
+    return user.player1_matches.count() + user.player2_matches.count()
@@ -0,0 +1,150 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from game.models import HourlyMetrics, Match, Payment, PlatformRevenue, User
+from game.services.analytics import get_platform_metrics, rollup_metrics
+from ._bench import scratch_database, summarize
+
+
+def baseline_platform_metrics():
+    """get_platform_metrics before the rollups: eight aggregates over the source tables."""
+    now = timezone.now()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    total_stars_revenue = Payment.objects.filter(status="completed").aggregate(Sum("amount"))["amount__sum"] or 0
+    today_stars_revenue = Payment.objects.filter(status="completed", updated_at__gte=today_start).aggregate(Sum("amount"))["amount__sum"] or 0
+    total_rake = PlatformRevenue.objects.aggregate(Sum("amount"))["amount__sum"] or 0
+    today_rake = PlatformRevenue.objects.filter(created_at__gte=today_start).aggregate(Sum("amount"))["amount__sum"] or 0
+    total_users = User.objects.count()
+    new_users_today = User.objects.filter(created_at__gte=today_start).count()
+    total_matches = Match.objects.count()
+    active_matches_today = Match.objects.filter(created_at__gte=today_start).count()
+
+    return {
+        "revenue": {
+            "total_stars": total_stars_revenue,
+            "today_stars": today_stars_revenue,
+            "total_rake_coins": total_rake,
+            "today_rake_coins": today_rake,
+        },
+        "users": {
+            "total": total_users,
+            "new_today": new_users_today,
+        },
+        "matches": {
+            "total": total_matches,
+            "active_today": active_matches_today,
+        },
+        "timestamp": now.isoformat()
+    }
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the seeded auto_now / auto_now_add values."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = "get_platform_metrics over a seeded history, the original full-table scans vs reading the hourly rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500_000, help="Matches seeded (rake rows and users scale with it)")
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--calls", type=int, default=20)
+
+    def _seed(self, rows, days):
+        now = timezone.now()
+        span = days * 86400
+
+        def moment():
+            return now - timedelta(seconds=random.uniform(0, span))
+
+        User.objects.bulk_create(
+            (User(telegram_id=i + 1, username=f"bench_{i}", created_at=moment()) for i in range(rows // 10)),
+            batch_size=5_000,
+        )
+        first = User.objects.order_by("id").values_list("id", flat=True)[:1][0]
+        for offset in range(0, rows, 50_000):
+            count = min(50_000, rows - offset)
+            player1 = [first + random.randrange(rows // 10 - 1) for _ in range(count)]
+            Match.objects.bulk_create(
+                (Match(player1_id=p, player2_id=p + 1, stake=50, status="finished", created_at=moment()) for p in player1),
+                batch_size=5_000,
+            )
+        with explicit_timestamps(
+            PlatformRevenue._meta.get_field("created_at"),
+            Payment._meta.get_field("created_at"),
+            Payment._meta.get_field("updated_at"),
+        ):
+            PlatformRevenue.objects.bulk_create(
+                (PlatformRevenue(amount=10, created_at=moment()) for _ in range(rows)), batch_size=5_000
+            )
+            payments = []
+            for i in range(rows // 20):
+                # Never saved again, so the baseline's updated_at is the completion time too
+                paid_at = moment()
+                status = random.choice(("completed", "completed", "failed"))
+                payments.append(Payment(
+                    user_id=first + i % (rows // 10), payload_id=f"bench-{i}", amount=random.choice((50, 100, 250)),
+                    coins_credited=500, status=status, created_at=paid_at, updated_at=paid_at,
+                    completed_at=paid_at if status == "completed" else None,
+                ))
+            Payment.objects.bulk_create(payments, batch_size=5_000)
+
+    def _time(self, label, metrics_fn, calls):
+        samples = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(calls):
+                start = time.perf_counter()
+                metrics = metrics_fn()
+                samples.append(time.perf_counter() - start)
+        self.stdout.write(f"  {label:<10} {summarize(samples)}  ({len(queries) // calls} queries per call)")
+        metrics.pop("timestamp")
+        return metrics
+
+    def handle(self, *args, **options):
+        rows, calls = options["rows"], options["calls"]
+        with scratch_database():
+            self.stdout.write(self.style.SUCCESS("\n=== PLATFORM METRICS ==="))
+            start = time.perf_counter()
+            self._seed(rows, options["days"])
+            self.stdout.write(
+                f"Seeded {rows:,} matches, {rows:,} rake rows, {rows // 10:,} users, {rows // 20:,} payments "
+                f"over {options['days']} days in {time.perf_counter() - start:.1f}s"
+            )
+
+            scanned = self._time("baseline", baseline_platform_metrics, calls)
+
+            start = time.perf_counter()
+            hours = rollup_metrics()
+            self.stdout.write(f"  first rollup: {hours:,} hours in {time.perf_counter() - start:.2f}s")
+            rolled = self._time("rollups", get_platform_metrics, calls)
+            self._compare(scanned, rolled)
+
+            # Steady state: the periodic run only has the hours since the last one to sum
+            HourlyMetrics.objects.order_by("-hour")[:1].get().delete()
+            start = time.perf_counter()
+            rollup_metrics()
+            self.stdout.write(f"  incremental rollup (1 hour): {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def _compare(self, scanned, rolled):
+        if rolled == scanned:
+            self.stdout.write(self.style.SUCCESS("  same metrics both ways"))
+        else:
+            self.stdout.write(self.style.ERROR(f"  metrics differ:\n    baseline {scanned}\n    rollup   {rolled}"))
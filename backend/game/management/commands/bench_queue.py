@@ -0,0 +1,62 @@
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from game.services.matchmaking import DEFAULT_RATING, QUEUE_TIMEOUT, InMemoryQueue, QueuedPlayer
+
+
+def _legacy_enqueue(queue, user, now):
+    """The original list-based enqueue_player, minus the DB write."""
+    queue[:] = [q for q in queue if now - q["time"] < QUEUE_TIMEOUT]
+    for q in queue:
+        queue.remove(q)
+        return q["user"]
+    queue.append({"user": user, "time": now, "ip": None})
+    return None
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark of the in-memory matchmaking queue against the legacy list queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+        parser.add_argument("--ops", type=int, default=500, help="Operations timed per size")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("\n=== MATCHMAKING QUEUE ==="))
+        for size in options["sizes"]:
+            legacy = self.bench_legacy(size, options["ops"])
+            current = self.bench_current(size, options["ops"])
+            self.stdout.write(
+                f"  {size:>8} queued: legacy {legacy * 1e6:10.1f}µs/op   "
+                f"current {current * 1e6:8.2f}µs/op   ({legacy / current:,.0f}x)"
+            )
+
+    def bench_legacy(self, size, ops):
+        now = time.time()
+        queue = [
+            {"user": SimpleNamespace(id=i), "time": now, "ip": None}
+            for i in range(size)
+        ]
+        # Each op pairs with the head; a new arrival refills the tail so the queue stays at ``size``
+        start = time.perf_counter()
+        for i in range(ops):
+            _legacy_enqueue(queue, SimpleNamespace(id=-1 - i), now)
+            queue.append({"user": SimpleNamespace(id=size + i), "time": now, "ip": None})
+        return (time.perf_counter() - start) / ops
+
+    def bench_current(self, size, ops):
+        now = time.time()
+        queue = InMemoryQueue()
+
+        def park(user_id):
+            queue._park(QueuedPlayer(SimpleNamespace(id=user_id), now, None, DEFAULT_RATING, now), 50)
+
+        for i in range(size):
+            park(i)
+        start = time.perf_counter()
+        for i in range(ops):
+            queue.pair_or_enqueue(SimpleNamespace(id=-1 - i), 50)
+            park(size + i)
+        return (time.perf_counter() - start) / ops
@@ -0,0 +1,82 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import path
+
+from game import views
+from game.models import Transaction, User
+from game.services import rate_limit
+from game.services.jwt_service import generate_jwt
+from game.services.quick_play import MAX_BATCH_ROUNDS
+from ._bench import scratch_database
+
+# The sync views, so that every query runs on this thread and is counted
+urlpatterns = [
+    path("single/", views.quick_play_submit),
+    path("batch/", views.quick_play_batch),
+]
+
+
+class _Unlimited:
+    """Limiter that lets every request through."""
+
+    def hit(self, key, limit, period):
+        return 0
+
+
+class Command(BaseCommand):
+    help = "Quick-play rounds one request each vs the batched auto-play endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=1000)
+        parser.add_argument("--batch", type=int, default=MAX_BATCH_ROUNDS)
+
+    def handle(self, *args, **options):
+        rounds, batch = options["rounds"], options["batch"]
+        moves = [random.choice(["rock", "paper", "scissors"]) for _ in range(rounds)]
+
+        with scratch_database(), override_settings(
+            ROOT_URLCONF=__name__, ALLOWED_HOSTS=["*"], SECURE_SSL_REDIRECT=False
+        ):
+            single_user = User.objects.create(telegram_id=1, username="single", coins=10**9)
+            batch_user = User.objects.create(telegram_id=2, username="batch", coins=10**9)
+
+            self.stdout.write(self.style.SUCCESS("\n=== QUICK PLAY BATCH ==="))
+            self.stdout.write(f"{rounds} rounds at stake 50")
+            rate_limit._limiter = _Unlimited()
+            try:
+                self._run("one round per request", single_user, [
+                    ("/single/", {"move": move, "stake": 50}) for move in moves
+                ])
+                self._run(f"batches of {batch}", batch_user, [
+                    ("/batch/", {"moves": moves[i:i + batch], "stake": 50})
+                    for i in range(0, rounds, batch)
+                ])
+            finally:
+                rate_limit._limiter = None
+
+    def _run(self, label, user, requests):
+        client = Client(headers={"Authorization": f"Bearer {generate_jwt(user)}"})
+        errors, queries = 0, 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            start = time.perf_counter()
+            for path, body in requests:
+                response = client.post(path, json.dumps(body), content_type="application/json")
+                errors += response.status_code != 200
+            elapsed = time.perf_counter() - start
+        played = Transaction.objects.filter(user=user, type="stake").count()
+        self.stdout.write(
+            f"  {label:<24} requests={len(requests):<5} errors={errors} rounds={played} "
+            f"total={elapsed:.2f}s ({played / elapsed:.0f} rounds/s, {queries / played:.2f} queries/round)"
+        )
@@ -0,0 +1,63 @@
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from game.models import Match, User
+from game.services.rating_replay import apply_ratings, replay_history
+from ._bench import scratch_database
+
+
+class Command(BaseCommand):
+    help = "Time and peak memory of replaying match history for recompute_ratings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--matches", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--chunk-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        matches, users = options["matches"], options["users"]
+        with scratch_database():
+            self.stdout.write(self.style.SUCCESS("\n=== RECOMPUTE RATINGS ==="))
+            start = time.perf_counter()
+            User.objects.bulk_create(
+                (User(telegram_id=i + 1, username=f"bench_{i}") for i in range(users)), batch_size=5_000
+            )
+            first, last = User.objects.order_by("id").values_list("id", flat=True)[:1][0], users
+            t0 = timezone.now() - timedelta(days=365)
+            for offset in range(0, matches, 50_000):
+                batch = []
+                for i in range(offset, min(offset + 50_000, matches)):
+                    player1 = random.randint(first, first + last - 1)
+                    player2 = random.randint(first, first + last - 2)
+                    player2 += player2 >= player1
+                    batch.append(Match(
+                        player1_id=player1, player2_id=player2, stake=50, status="finished", rated=True,
+                        winner_id=random.choice((player1, player2)), created_at=t0 + timedelta(seconds=i),
+                    ))
+                Match.objects.bulk_create(batch, batch_size=5_000)
+            self.stdout.write(f"Seeded {users:,} users and {matches:,} finished matches in {time.perf_counter() - start:.1f}s")
+
+            start = time.perf_counter()
+            ratings, played, games = replay_history(chunk_size=options["chunk_size"])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"  replay      {elapsed:7.2f}s  {games / elapsed:,.0f} matches/s  "
+                f"rating array {ratings.buffer_info()[1] * ratings.itemsize / 1024:,.0f} KiB"
+            )
+
+            # A second, traced pass for the peak Python allocation
+            tracemalloc.start()
+            replay_history(chunk_size=options["chunk_size"])
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(f"  replay peak allocation {peak / 2**20:.1f} MiB (chunk size {options['chunk_size']:,})")
+
+            start = time.perf_counter()
+            updated, created = apply_ratings(ratings, played)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"  write back  {elapsed:7.2f}s  {created:,} ratings created, {updated:,} updated")
@@ -0,0 +1,91 @@
+import math
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from game.services.rating_service import elo_delta, elo_deltas
+from game.services.rps_engine import (
+    ROUND_RESULTS,
+    VALID_MOVES,
+    decide_round_winner,
+    decide_round_winners,
+    random_moves,
+)
+
+
+def _legacy_decide(move1, move2):
+    """decide_round_winner before the move codes: chained string comparisons."""
+    if move1 == move2:
+        return "draw"
+    if (
+        (move1 == "rock" and move2 == "scissors") or
+        (move1 == "scissors" and move2 == "paper") or
+        (move1 == "paper" and move2 == "rock")
+    ):
+        return "player1"
+    return "player2"
+
+
+def _legacy_elo(winner, loser):
+    """Elo deltas before the batch API: math.pow per game."""
+    expected_winner = 1 / (1 + math.pow(10, (loser - winner) / 400))
+    expected_loser = 1 / (1 + math.pow(10, (winner - loser) / 400))
+    return int(32 * (1 - expected_winner)), int(32 * (0 - expected_loser))
+
+
+class Command(BaseCommand):
+    help = "Scalar vs NumPy batch round resolution and Elo deltas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=10_000_000)
+        parser.add_argument(
+            "--scalar-rounds", type=int, default=1_000_000,
+            help="Rounds timed through the scalar functions (extrapolated to --rounds)",
+        )
+
+    def handle(self, *args, **options):
+        rounds, sample = options["rounds"], min(options["scalar_rounds"], options["rounds"])
+        rng = np.random.default_rng(42)
+        self.stdout.write(self.style.SUCCESS("\n=== RPS ENGINE ==="))
+
+        moves1, moves2 = random_moves(rounds, rng), random_moves(rounds, rng)
+        names1 = [VALID_MOVES[code] for code in moves1[:sample].tolist()]
+        names2 = [VALID_MOVES[code] for code in moves2[:sample].tolist()]
+
+        self.stdout.write(f"Round resolution, {rounds:,} rounds:")
+        self._scalar("string compares (before)", lambda: [_legacy_decide(a, b) for a, b in zip(names1, names2)], sample, rounds)
+        self._scalar("decide_round_winner", lambda: [decide_round_winner(a, b) for a, b in zip(names1, names2)], sample, rounds)
+        start = time.perf_counter()
+        results = decide_round_winners(moves1, moves2)
+        self._row("decide_round_winners", time.perf_counter() - start, rounds)
+
+        legacy = [_legacy_decide(a, b) for a, b in zip(names1, names2)]
+        assert [ROUND_RESULTS[code] for code in results[:sample].tolist()] == legacy
+
+        winners = rng.integers(400, 2400, size=rounds)
+        losers = rng.integers(400, 2400, size=rounds)
+        pairs = list(zip(winners[:sample].tolist(), losers[:sample].tolist()))
+
+        self.stdout.write(f"Elo deltas, {rounds:,} games:")
+        self._scalar("math.pow per game (before)", lambda: [_legacy_elo(w, l) for w, l in pairs], sample, rounds)
+        self._scalar("elo_delta", lambda: [elo_delta(w, l) for w, l in pairs], sample, rounds)
+        start = time.perf_counter()
+        winner_deltas, loser_deltas = elo_deltas(winners, losers)
+        self._row("elo_deltas", time.perf_counter() - start, rounds)
+
+        legacy = [_legacy_elo(w, l) for w, l in pairs]
+        assert list(zip(winner_deltas[:sample].tolist(), loser_deltas[:sample].tolist())) == legacy
+        self.stdout.write(f"Batch results match the scalar ones on the first {sample:,}.")
+
+    def _scalar(self, label, run, sample, rounds):
+        start = time.perf_counter()
+        run()
+        elapsed = (time.perf_counter() - start) * rounds / sample
+        self._row(label, elapsed, rounds, extrapolated=sample < rounds)
+
+    def _row(self, label, elapsed, rounds, extrapolated=False):
+        note = " (extrapolated)" if extrapolated else ""
+        self.stdout.write(
+            f"  {label:<28} {elapsed:8.3f}s  {rounds / elapsed / 1e6:8.1f}M/s  {elapsed / rounds * 1e9:7.1f}ns each{note}"
+        )
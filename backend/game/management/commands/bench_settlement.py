@@ -0,0 +1,105 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+
+from game.models import Match, PlatformRevenue, Rating, Transaction, User
+from game.services.leaderboard import rating_saved
+from game.services.payout import split_pot
+from game.services.rating_service import elo_delta
+from game.services.settlement import settle_match
+from ._bench import scratch_database, summarize
+
+# Statements settle_match may issue once both players have a Rating row,
+# transaction control excluded: the four of the payout, plus the anti-farm
+# lookup and the read and write of the two ratings
+SETTLEMENT_QUERY_BUDGET = 7
+
+
+def _legacy_settle(match, winner):
+    """
+    The original submit_move_view + payout_match sequence, for comparison,
+    plus the rating update the way the original services would have done
+    it (the pair-history anti-farm query, get_or_create of both ratings and
+    a save of each), so both sides do the same work.
+    """
+    match.save()
+    match.winner = winner
+    match.status = "finished"
+    match.save()
+
+    rake, winner_reward = split_pot(match.stake)
+    with transaction.atomic():
+        winner.coins += winner_reward
+        winner.save()
+        Transaction.objects.create(user=winner, amount=winner_reward, type="win")
+        Transaction.objects.create(user=winner, amount=-rake, type="commission")
+        PlatformRevenue.objects.create(amount=rake, match=match)
+
+        loser = match.player2 if winner.pk == match.player1_id else match.player1
+        recent = Match.objects.filter(
+            Q(player1=winner, player2=loser) | Q(player1=loser, player2=winner)
+        ).order_by("-created_at")[:5]
+        winner_rating, _ = Rating.objects.get_or_create(user=winner, defaults={"value": 1000})
+        loser_rating, _ = Rating.objects.get_or_create(user=loser, defaults={"value": 1000})
+        winner_delta, loser_delta = elo_delta(
+            winner_rating.value, loser_rating.value, winner_gains=recent.count() < 3
+        )
+        winner_rating.value += winner_delta
+        loser_rating.value += loser_delta
+        winner_rating.save()
+        loser_rating.save()
+        rating_saved(winner_rating, loser_rating)
+
+
+def _statements(queries):
+    return [
+        q["sql"] for q in queries
+        if not q["sql"].upper().startswith(("BEGIN", "COMMIT", "SAVEPOINT", "RELEASE"))
+    ]
+
+
+class Command(BaseCommand):
+    help = "Measures match settlement latency and query count, legacy vs settle_match"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--matches", type=int, default=2_000)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options["matches"])
+
+    def run(self, count):
+        p1 = User.objects.create(telegram_id=1, username="p1", coins=10**9)
+        p2 = User.objects.create(telegram_id=2, username="p2", coins=10**9)
+        Rating.objects.bulk_create([Rating(user=p1), Rating(user=p2)])
+
+        self.stdout.write(self.style.SUCCESS("\n=== MATCH SETTLEMENT ==="))
+        for name, settle in (("legacy", _legacy_settle), ("settle_match", settle_match)):
+            Match.objects.bulk_create(
+                Match(player1=p1, player2=p2, stake=50, status="active", player1_score=2)
+                for _ in range(count)
+            )
+            matches = list(Match.objects.filter(status="active").select_related("player1", "player2"))
+
+            samples, query_counts = [], []
+            for match in matches:
+                connection.queries_log.clear()
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    settle(match, match.player1)
+                    samples.append(time.perf_counter() - start)
+                query_counts.append(len(_statements(ctx.captured_queries)))
+
+            self.stdout.write(f"  {name:<13} {summarize(samples)}  queries/settlement={max(query_counts)}")
+            if name == "settle_match" and max(query_counts) > SETTLEMENT_QUERY_BUDGET:
+                raise CommandError(
+                    f"settle_match issued {max(query_counts)} queries, budget is {SETTLEMENT_QUERY_BUDGET}"
+                )
+
+        # Settling twice must be a no-op
+        match = Match.objects.filter(status="finished").first()
+        if settle_match(match, match.player1):
+            raise CommandError("settle_match paid out an already finished match")
@@ -0,0 +1,61 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from game import views
+from game.models import Transaction, User
+from game.services import user_cache
+from game.services.jwt_service import generate_jwt
+from ._bench import scratch_database, summarize
+
+# Read-only endpoints that take the cached user
+ENDPOINTS = [
+    ("post", views.wallet_balance),
+    ("get", views.wallet_transactions),
+    ("get", views.withdraw_list),
+]
+
+
+class Command(BaseCommand):
+    help = "Compares jwt_required latency with and without the user cache and reports hit rate per endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=5_000, help="Requests per endpoint")
+        parser.add_argument("--ttl", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            User.objects.bulk_create(
+                User(telegram_id=i + 1, username=f"cache_{i}") for i in range(options["users"])
+            )
+            users = list(User.objects.all())
+            Transaction.objects.bulk_create(
+                Transaction(user=user, amount=10, type="purchase") for user in users for _ in range(5)
+            )
+            tokens = [generate_jwt(user) for user in users]
+            factory = RequestFactory()
+
+            self.stdout.write(self.style.SUCCESS("\n=== USER CACHE ==="))
+            for label, ttl in (("no cache", 0), (f"ttl={options['ttl']}s", options["ttl"])):
+                user_cache._user_cache = user_cache.UserCache(ttl)
+                self.stdout.write(self.style.SUCCESS(f"\n{label}"))
+                for method, view in ENDPOINTS:
+                    samples = []
+                    for _ in range(options["requests"]):
+                        request = getattr(factory, method)(
+                            "/", HTTP_AUTHORIZATION=f"Bearer {random.choice(tokens)}"
+                        )
+                        start = time.perf_counter()
+                        view(request)
+                        samples.append(time.perf_counter() - start)
+                    self.stdout.write(f"  {view.__name__:<20} {summarize(samples)}")
+
+                for endpoint, stats in user_cache.get_user_cache().report().items():
+                    self.stdout.write(
+                        f"  {endpoint:<20} hit rate {stats['hit_rate']:.1%}, "
+                        f"DB time saved {stats['saved'] * 1000:.0f}ms over {stats['hits']} hits"
+                    )
+            user_cache._user_cache = None
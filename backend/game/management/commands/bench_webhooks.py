@@ -0,0 +1,110 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.test import Client
+from django.test.utils import override_settings
+
+from game.models import Payment, User, WebhookUpdate
+from game.services import webhook_inbox
+from ._bench import scratch_database, summarize
+from ._fake_bot_api import start_fake_bot_api
+
+
+class Command(BaseCommand):
+    help = "Webhook ack latency with the work done in the request vs the ack-first inbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--payments", type=int, default=200)
+        parser.add_argument("--telegram-latency", type=float, default=0.2, help="Seconds per Bot API call")
+        parser.add_argument("--rate", type=float, default=10.0, help="Purchases per second sent to the inbox")
+
+    def handle(self, *args, **options):
+        count = options["payments"]
+        bot_api, bot_api_url = start_fake_bot_api(latency=options["telegram_latency"])
+        try:
+            with scratch_database(), override_settings(
+                ALLOWED_HOSTS=["*"],
+                SECURE_SSL_REDIRECT=False,
+                TELEGRAM_API_BASE_URL=bot_api_url,
+                TELEGRAM_BOT_TOKEN="bench",
+                TELEGRAM_WEBHOOK_SECRET="bench",
+            ):
+                user = User.objects.create(telegram_id=1, username="bench")
+                self.stdout.write(self.style.SUCCESS("\n=== WEBHOOK INBOX ==="))
+                self.stdout.write(
+                    f"Bot API latency {options['telegram_latency'] * 1000:.0f}ms, "
+                    f"{count} purchases (pre-checkout + successful_payment each), {options['rate']:g}/s into the inbox"
+                )
+                self.inline(user, count)
+                self.inbox(user, count, options["rate"])
+        finally:
+            bot_api.terminate()
+
+    def _updates(self, user, count, prefix, first_id):
+        payments = Payment.objects.bulk_create(
+            Payment(user=user, payload_id=f"{prefix}_{i}", amount=100, coins_credited=100, status="pending")
+            for i in range(count)
+        )
+        for i, payment in enumerate(payments):
+            query = {"id": f"{prefix}_q{i}", "invoice_payload": payment.payload_id}
+            sp = {"invoice_payload": payment.payload_id, "telegram_payment_charge_id": f"{prefix}_c{i}"}
+            yield (
+                {"update_id": first_id + 2 * i, "pre_checkout_query": query},
+                {"update_id": first_id + 2 * i + 1, "message": {"successful_payment": sp}},
+            )
+
+    def inline(self, user, count):
+        """What the webhook did before: answer and credit before responding."""
+        pre_checkout, payment = [], []
+        for query_update, payment_update in self._updates(user, count, "inline", 1):
+            t0 = time.perf_counter()
+            webhook_inbox.answer_pre_checkout(query_update["pre_checkout_query"])
+            pre_checkout.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            webhook_inbox.complete_payment(payment_update["message"]["successful_payment"])
+            payment.append(time.perf_counter() - t0)
+        self.stdout.write("Work in the request (before):")
+        self.stdout.write(f"  pre-checkout response   {summarize(pre_checkout)}")
+        self.stdout.write(f"  payment response        {summarize(payment)}")
+
+    def inbox(self, user, count, rate):
+        client = Client(headers={"X-Telegram-Bot-Api-Secret-Token": "bench"})
+        acks = {"pre_checkout": [], "payment": []}
+        start = time.perf_counter()
+        for i, updates in enumerate(self._updates(user, count, "inbox", 100_000)):
+            time.sleep(max(0.0, start + i / rate - time.perf_counter()))
+            for update in updates:
+                t0 = time.perf_counter()
+                client.post("/telegram_webhook/", json.dumps(update), content_type="application/json")
+                acks[webhook_inbox.update_kind(update)].append(time.perf_counter() - t0)
+
+        # The fast lane answers pre-checkout queries and credits payments while the acks go out
+        deadline = time.monotonic() + 60
+        # Updates it failed on go back to the queue for the drain below
+        pending = WebhookUpdate.objects.filter(kind__in=webhook_inbox.FAST_LANE_KINDS).filter(
+            Q(status="processing") | Q(status="queued", attempts=0)
+        )
+        while pending.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        handled = {kind: [] for kind in webhook_inbox.FAST_LANE_KINDS}
+        for kind, received_at, processed_at in WebhookUpdate.objects.filter(status="done").values_list(
+            "kind", "received_at", "processed_at"
+        ):
+            handled[kind].append((processed_at - received_at).total_seconds())
+
+        start = time.perf_counter()
+        drained = webhook_inbox.drain()
+        elapsed = time.perf_counter() - start
+        failed = WebhookUpdate.objects.exclude(status="done").count()
+
+        self.stdout.write("Ack-first inbox (after):")
+        self.stdout.write(f"  pre-checkout ack        {summarize(acks['pre_checkout'])}")
+        self.stdout.write(f"  payment ack             {summarize(acks['payment'])}")
+        self.stdout.write(f"  pre-checkout answered   {summarize(handled['pre_checkout'])}  (fast lane, after receipt)")
+        self.stdout.write(f"  payment credited        {summarize(handled['payment'])}  (fast lane, after receipt)")
+        self.stdout.write(
+            f"  drained {drained} left-over updates in {elapsed:.2f}s "
+            f"({drained / elapsed if elapsed else 0:.0f}/s), not done={failed}"
+        )
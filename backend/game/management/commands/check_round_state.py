@@ -0,0 +1,64 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from game.models import Match, User
+from game.services.round_state import STORE_BACKENDS
+from ._bench import scratch_database
+
+
+def _player(store, match_id, user_id, move, barrier, results):
+    """One worker process: join the round and record a move at the same instant as the other."""
+    connections.close_all()
+    try:
+        barrier.wait()
+        store.start_round(match_id)
+        moves = store.submit_move(match_id, user_id, move)
+        results.put((user_id, len(moves or {})))
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Runs two processes submitting moves for the same match and checks no move is lost"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backend", choices=sorted(STORE_BACKENDS), default="database")
+        parser.add_argument("--rounds", type=int, default=50)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            lost = self.run(options)
+        if lost:
+            raise CommandError(f"{lost} of {options['rounds']} rounds lost a move")
+        self.stdout.write(self.style.SUCCESS(f"All {options['rounds']} rounds recorded both moves"))
+
+    def run(self, options):
+        store = STORE_BACKENDS[options["backend"]]()
+        player1 = User.objects.create(telegram_id=1, username="p1")
+        player2 = User.objects.create(telegram_id=2, username="p2")
+        ctx = multiprocessing.get_context("fork")
+        lost = 0
+
+        for _ in range(options["rounds"]):
+            match = Match.objects.create(player1=player1, player2=player2, stake=50, status="active")
+            connections.close_all()  # children must not share the parent's connection
+
+            barrier = ctx.Barrier(2)
+            results = ctx.Queue()
+            procs = [
+                ctx.Process(target=_player, args=(store, match.id, player1.id, "rock", barrier, results)),
+                ctx.Process(target=_player, args=(store, match.id, player2.id, "paper", barrier, results)),
+            ]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+
+            # Seen from this (third) process, as a later request would see it
+            round_data = store.get_round(match.id)
+            if not round_data or len(round_data["moves"]) != 2:
+                lost += 1
+
+        return lost
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from ._fake_bot_api import FakeBotAPIServer
+
+
+class Command(BaseCommand):
+    help = "Runs a local fake Telegram Bot API (point TELEGRAM_API_BASE_URL at it)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8081)
+        parser.add_argument("--latency", type=float, default=0.05, help="Seconds before each answer")
+        parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of calls answered with HTTP 502")
+        parser.add_argument("--rate-limit", type=int, default=0, help="Calls per second before 429s (0: off)")
+        parser.add_argument("--retry-after", type=int, default=1)
+
+    def handle(self, *args, **options):
+        server = FakeBotAPIServer(
+            ("127.0.0.1", options["port"]),
+            latency=options["latency"],
+            fail_rate=options["fail_rate"],
+            rate_limit=options["rate_limit"],
+            retry_after=options["retry_after"],
+        )
+        self.stdout.write(f"Fake Bot API on http://127.0.0.1:{options['port']} (Ctrl-C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,101 @@
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+import httpx
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import path
+
+from game import async_views, views
+from game.models import User
+from game.services import rate_limit
+from game.services.jwt_service import generate_jwt
+from ._bench import scratch_database, summarize
+from ._fake_bot_api import start_fake_bot_api
+
+# Served from this module while the load test runs: each endpoint in both flavours
+urlpatterns = [
+    path("sync/balance/", views.wallet_balance),
+    path("async/balance/", async_views.wallet_balance),
+    path("sync/quick-play/", views.quick_play_submit),
+    path("async/quick-play/", async_views.quick_play_submit),
+    path("sync/invoice/", views.create_invoice_view),
+    path("async/invoice/", async_views.create_invoice_view),
+]
+
+ENDPOINTS = {
+    "balance": {},
+    "quick-play": {"move": "rock", "stake": 50},
+    "invoice": {"amount": 100},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests the sync and async versions of the hot endpoints through the "
+        "ASGI handler, with Telegram replaced by a local server with fixed latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint and flavour")
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--telegram-latency", type=float, default=0.2, help="Seconds per Bot API call")
+
+    def handle(self, *args, **options):
+        bot_api, bot_api_url = start_fake_bot_api(latency=options["telegram_latency"])
+        try:
+            with scratch_database(), override_settings(
+                ROOT_URLCONF=__name__,
+                ALLOWED_HOSTS=["*"],
+                SECURE_SSL_REDIRECT=False,
+                TELEGRAM_API_BASE_URL=bot_api_url,
+                TELEGRAM_BOT_TOKEN="load-test",
+            ):
+                User.objects.bulk_create(
+                    User(telegram_id=i + 1, username=f"load_{i}", coins=10**9) for i in range(options["users"])
+                )
+                tokens = [generate_jwt(user) for user in User.objects.all()]
+
+                self.stdout.write(self.style.SUCCESS(
+                    f"\n=== SYNC vs ASYNC VIEWS ({options['requests']} requests, "
+                    f"concurrency {options['concurrency']}, Bot API {options['telegram_latency'] * 1000:.0f}ms) ==="
+                ))
+                for endpoint, body in ENDPOINTS.items():
+                    for flavour in ("sync", "async"):
+                        rate_limit._limiter = None  # each run starts with empty windows
+                        samples, errors, elapsed = asyncio.run(
+                            self.run(f"/{flavour}/{endpoint}/", body, tokens, options)
+                        )
+                        self.stdout.write(
+                            f"  {endpoint:<11} {flavour:<5} {len(samples) / elapsed:7.0f} req/s  "
+                            f"errors={dict(errors)}  {summarize(samples)}"
+                        )
+        finally:
+            bot_api.terminate()
+
+    async def run(self, url, body, tokens, options):
+        app = ASGIHandler()
+        limit = asyncio.Semaphore(options["concurrency"])
+        token_cycle = itertools.cycle(tokens)
+        samples, errors = [], Counter()
+
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://testserver", timeout=60
+        ) as client:
+            async def one():
+                headers = {"Authorization": f"Bearer {next(token_cycle)}"}
+                async with limit:
+                    start = time.perf_counter()
+                    response = await client.post(url, json=body, headers=headers)
+                    if response.status_code == 200:
+                        samples.append(time.perf_counter() - start)
+                    else:
+                        errors[response.status_code] += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(options["requests"])))
+            return samples, errors, time.perf_counter() - start
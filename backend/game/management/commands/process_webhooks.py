@@ -0,0 +1,48 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from game.services.webhook_inbox import DRAIN_BATCH_SIZE, drain, prune
+
+
+def drain_pass(batch_size):
+    # Pre-checkout queries first: Telegram only waits 10 seconds for them
+    return drain(batch_size, kinds=["pre_checkout"]) + drain(batch_size)
+
+
+class Command(BaseCommand):
+    help = "Processes Telegram updates stored in the webhook inbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep draining every --interval seconds")
+        parser.add_argument("--interval", type=float, default=1.0)
+        parser.add_argument("--batch-size", type=int, default=DRAIN_BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=1, help="Draining threads (with --loop)")
+        parser.add_argument("--keep-days", type=int, default=7, help="Days processed updates are kept")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if not options["loop"]:
+            processed = drain_pass(batch_size)
+            pruned = prune(options["keep_days"])
+            self.stdout.write(f"Processed {processed} update(s), pruned {pruned}")
+            return
+
+        def work():
+            while True:
+                drain_pass(batch_size)
+                close_old_connections()
+                time.sleep(options["interval"])
+
+        for i in range(options["workers"] - 1):
+            threading.Thread(target=work, name=f"process-webhooks-{i}", daemon=True).start()
+
+        while True:
+            processed = drain_pass(batch_size)
+            pruned = prune(options["keep_days"])
+            if processed or pruned:
+                self.stdout.write(f"Processed {processed} update(s), pruned {pruned}")
+            close_old_connections()
+            time.sleep(options["interval"])
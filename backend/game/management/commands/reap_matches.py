@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from game.services.reaper import REAP_BATCH_SIZE, STUCK_MATCH_TIMEOUT, sweep
+
+
+class Command(BaseCommand):
+    help = "Expires abandoned rounds and refunds matches stuck in 'active'"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep sweeping every --interval seconds")
+        parser.add_argument("--interval", type=float, default=60.0)
+        parser.add_argument("--match-timeout", type=int, default=STUCK_MATCH_TIMEOUT, help="Seconds")
+        parser.add_argument("--batch-size", type=int, default=REAP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        while True:
+            result = sweep(options["match_timeout"], options["batch_size"])
+            self.stdout.write(
+                f"Expired {result['rounds']} round(s), refunded {result['matches']} stuck match(es)"
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
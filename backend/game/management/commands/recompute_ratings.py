@@ -0,0 +1,67 @@
+import heapq
+import time
+
+from django.core.management.base import BaseCommand
+
+from game.services.rating_replay import REPLAY_CHUNK_SIZE, WRITE_BATCH_SIZE, apply_ratings, replay_history
+from game.services.rating_service import INITIAL_RATING, K_FACTOR
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds ratings by replaying every rated PvP match in order, plus each user's "
+        "quick-play offset. Only reports what would change unless --apply is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--apply", action="store_true", help="Write the rebuilt ratings (default: dry run)")
+        parser.add_argument("--k-factor", type=float, default=K_FACTOR)
+        parser.add_argument("--initial", type=int, default=INITIAL_RATING, help="Rating before a user's first game")
+        parser.add_argument("--chunk-size", type=int, default=REPLAY_CHUNK_SIZE, help="Matches fetched per query")
+        parser.add_argument("--batch-size", type=int, default=WRITE_BATCH_SIZE, help="Ratings read/written per query")
+        parser.add_argument("--top", type=int, default=20, help="Largest changes to list")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        def progress(games):
+            self.stdout.write(f"  replayed {games:,} matches ({time.perf_counter() - start:.1f}s)")
+
+        ratings, played, games = replay_history(
+            k=options["k_factor"],
+            initial=options["initial"],
+            chunk_size=options["chunk_size"],
+            progress=progress,
+        )
+        replayed_at = time.perf_counter()
+        self.stdout.write(f"Replayed {games:,} matches for {played.count(1):,} players in {replayed_at - start:.1f}s")
+
+        largest = []
+
+        def on_change(user_id, old, new):
+            change = (abs(new - (options["initial"] if old is None else old)), user_id, old, new)
+            if len(largest) < options["top"]:
+                heapq.heappush(largest, change)
+            elif change > largest[0]:
+                heapq.heapreplace(largest, change)
+
+        dry_run = not options["apply"]
+        updated, created = apply_ratings(
+            ratings,
+            played,
+            initial=options["initial"],
+            batch_size=options["batch_size"],
+            dry_run=dry_run,
+            on_change=on_change,
+        )
+
+        update, create = ("Would update", "create") if dry_run else ("Updated", "created")
+        self.stdout.write(
+            f"{update} {updated:,} rating(s) and {create} {created:,} in {time.perf_counter() - replayed_at:.1f}s"
+        )
+        if largest:
+            self.stdout.write("Largest changes:")
+            for _, user_id, old, new in sorted(largest, reverse=True):
+                self.stdout.write(f"  user {user_id:>10}: {'-' if old is None else old:>6} -> {new}")
+        if dry_run:
+            self.stdout.write(self.style.WARNING("Dry run, nothing written. Pass --apply to write the ratings."))
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from game.services.invoice_pool import expire_pool, refill_pool
+
+
+class Command(BaseCommand):
+    help = "Drops expired pooled Stars invoices and tops the pool back up"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep refilling every --interval seconds")
+        parser.add_argument("--interval", type=float, default=30.0)
+        parser.add_argument("--size", type=int, default=None, help="Invoices per amount (default INVOICE_POOL_SIZE)")
+        parser.add_argument("--ttl", type=int, default=None, help="Seconds (default INVOICE_POOL_TTL)")
+
+    def handle(self, *args, **options):
+        size = settings.INVOICE_POOL_SIZE if options["size"] is None else options["size"]
+        while True:
+            expired = expire_pool()
+            created = refill_pool(size=size, ttl=options["ttl"]) if size > 0 else {}
+            self.stdout.write(
+                f"Expired {expired} pooled invoice(s), created "
+                + (", ".join(f"{n} x {amount}" for amount, n in created.items()) or "none")
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
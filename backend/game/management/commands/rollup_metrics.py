@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from game.services.analytics import rollup_high_water_mark, rollup_metrics
+
+
+class Command(BaseCommand):
+    help = "Rolls closed hours up into HourlyMetrics for get_platform_metrics"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep rolling up every --interval seconds")
+        parser.add_argument("--interval", type=float, default=300.0)
+
+    def handle(self, *args, **options):
+        while True:
+            written = rollup_metrics()
+            mark = rollup_high_water_mark()
+            self.stdout.write(f"Rolled up {written} hour(s), up to {mark.isoformat() if mark else 'nothing yet'}")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
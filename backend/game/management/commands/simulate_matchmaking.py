@@ -0,0 +1,86 @@
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from game.services.matchmaking import DEFAULT_RATING, InMemoryQueue
+from ._bench import percentile, summarize
+
+
+class Command(BaseCommand):
+    help = "Simulates rating-banded matchmaking and reports match quality and lookup latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=20_000)
+        parser.add_argument("--arrival-rate", type=float, default=200.0, help="New players per second")
+        parser.add_argument("--rating-spread", type=float, default=200.0, help="Std-dev of player ratings")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between client polls")
+        parser.add_argument("--patience", type=float, default=30.0, help="Seconds before a player gives up")
+        parser.add_argument("--stakes", type=int, nargs="+", default=[50, 100, 200])
+        parser.add_argument("--fifo", action="store_true", help="Ignore ratings (legacy first-come pairing)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        clock = SimpleNamespace(now=0.0)
+        queue = InMemoryQueue(clock=lambda: clock.now)
+
+        # (arrival time, user, stake, rating)
+        arrivals = []
+        t = 0.0
+        for i in range(options["players"]):
+            t += rng.expovariate(options["arrival_rate"])
+            rating = max(0, int(rng.gauss(DEFAULT_RATING, options["rating_spread"])))
+            arrivals.append((t, SimpleNamespace(id=i + 1), rng.choice(options["stakes"]), rating))
+
+        # Pending polls as (next poll time, arrival index)
+        polls = [(a[0], idx) for idx, a in enumerate(arrivals)]
+        matched = set()
+        gaps, waits, lookups = [], [], []
+        gave_up = 0
+
+        while polls:
+            polls.sort(reverse=True)
+            batch_time = polls[-1][0]
+            due = []
+            while polls and polls[-1][0] <= batch_time + options["poll_interval"] / 10:
+                due.append(polls.pop())
+            for poll_time, idx in due:
+                arrived, user, stake, rating = arrivals[idx]
+                if user.id in matched:
+                    continue
+                if poll_time - arrived > options["patience"]:
+                    gave_up += 1
+                    continue
+                clock.now = poll_time
+                start = time.perf_counter()
+                paired = queue.pair_or_enqueue(
+                    user, stake, rating=DEFAULT_RATING if options["fifo"] else rating
+                )
+                lookups.append(time.perf_counter() - start)
+                if paired is None:
+                    polls.append((poll_time + options["poll_interval"], idx))
+                    continue
+                opponent, _ = paired
+                queue.release(opponent)
+                o_arrived, _, _, o_rating = arrivals[opponent.id - 1]
+                matched.update((user.id, opponent.id))
+                gaps.append(abs(rating - o_rating))
+                waits.extend((poll_time - arrived, poll_time - o_arrived))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n=== MATCHMAKING SIMULATION ({'fifo' if options['fifo'] else 'rating-banded'}) ==="
+        ))
+        self.stdout.write(f"  Players: {options['players']}  Matched: {len(matched)}  Gave up: {gave_up}")
+        if gaps:
+            self.stdout.write(
+                f"  Rating gap: mean={statistics.fmean(gaps):.1f} "
+                f"p50={percentile(gaps, 50)} p95={percentile(gaps, 95)} max={max(gaps)}"
+            )
+            self.stdout.write(
+                f"  Wait (simulated): mean={statistics.fmean(waits):.2f}s "
+                f"p95={percentile(waits, 95):.2f}s"
+            )
+        self.stdout.write(f"  Lookup latency: {summarize(lookups)}")
@@ -0,0 +1,97 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import Sum
+
+from game.models import Transaction, User
+from game.services.wallet import add_coins, deduct_coins
+from ._bench import scratch_database
+
+
+def _legacy_deduct(user, amount):
+    """The original read-modify-write deduct_coins, for comparison."""
+    if user.coins < amount:
+        raise ValueError("Insufficient balance")
+    with transaction.atomic():
+        user.coins -= amount
+        user.save()
+        Transaction.objects.create(user=user, amount=-amount, type="stake")
+
+
+class Command(BaseCommand):
+    help = "Hammers the wallet from many threads and checks the balance matches the ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stakes", type=int, default=1_000, help="Concurrent wallet operations (4 in 5 are stakes)")
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--users", type=int, default=4)
+        parser.add_argument("--stake", type=int, default=50)
+        parser.add_argument("--legacy", action="store_true", help="Use the old read-modify-write code")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            broken = self.run(options)
+        if broken:
+            raise CommandError(f"Balance not conserved for {broken} user(s)")
+        self.stdout.write(self.style.SUCCESS("Balances match the ledger for every user"))
+
+    def run(self, options):
+        initial = options["stakes"] * options["stake"] // (2 * options["users"])
+        User.objects.bulk_create(
+            User(telegram_id=i + 1, username=f"stress_{i}", coins=initial)
+            for i in range(options["users"])
+        )
+        user_ids = list(User.objects.values_list("id", flat=True))
+        outcome = {"ok": 0, "insufficient": 0, "locked": 0}
+        lock = threading.Lock()
+
+        def op(i):
+            # Each thread works on its own (possibly stale) copy, like separate requests
+            user = User.objects.get(id=random.choice(user_ids))
+            try:
+                if options["legacy"]:
+                    _legacy_deduct(user, options["stake"])
+                elif i % 5 == 0:
+                    add_coins(user, options["stake"], tx_type="win")
+                else:
+                    deduct_coins(user, options["stake"], tx_type="stake")
+                key = "ok"
+            except ValueError:
+                key = "insufficient"
+            except OperationalError:
+                key = "locked"
+            finally:
+                connections.close_all()
+            with lock:
+                outcome[key] += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            list(pool.map(op, range(options["stakes"])))
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n=== WALLET STRESS ({'legacy' if options['legacy'] else 'conditional UPDATE'}) ==="
+        ))
+        self.stdout.write(
+            f"  {options['stakes']} ops on {options['users']} users with {options['threads']} threads "
+            f"in {elapsed:.2f}s"
+        )
+        self.stdout.write(
+            f"  Applied: {outcome['ok']}  Rejected (insufficient): {outcome['insufficient']}  "
+            f"Lock errors: {outcome['locked']}"
+        )
+
+        broken = 0
+        for user in User.objects.all():
+            ledger = Transaction.objects.filter(user=user).aggregate(total=Sum("amount"))["total"] or 0
+            expected = initial + ledger
+            status = "ok" if user.coins == expected and user.coins >= 0 else "MISMATCH"
+            if status != "ok":
+                broken += 1
+            self.stdout.write(f"  {user.username}: balance={user.coins} ledger says {expected} [{status}]")
+        return broken
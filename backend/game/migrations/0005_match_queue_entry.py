@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0004_payment_payload_id_payment_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchQueueEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stake', models.IntegerField()),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('enqueued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claimed', models.BooleanField(default=False)),
+                ('match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='game.match')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='game.user')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['stake', 'claimed', 'enqueued_at'], name='game_matchq_stake_cfd49a_idx')],
+            },
+        ),
+    ]
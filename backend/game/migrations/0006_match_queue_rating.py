@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0005_match_queue_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchqueueentry',
+            name='rating',
+            field=models.IntegerField(default=1000),
+        ),
+        migrations.AddField(
+            model_name='matchqueueentry',
+            name='waiting_since',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='First enqueue; kept across polls to widen the rating window'),
+        ),
+        migrations.AddIndex(
+            model_name='matchqueueentry',
+            index=models.Index(fields=['stake', 'claimed', 'rating'], name='game_matchq_stake_09f1a7_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_match_queue_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiveRound',
+            fields=[
+                ('match', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='game.match')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RoundMove',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('move', models.CharField(max_length=10)),
+                ('round', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moves', to='game.activeround')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='game.user')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('round', 'user'), name='unique_round_move')],
+            },
+        ),
+    ]
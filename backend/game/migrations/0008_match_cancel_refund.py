@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_shared_round_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='match',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('active', 'Active'), ('finished', 'Finished'), ('cancelled', 'Cancelled')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='type',
+            field=models.CharField(choices=[('stake', 'Stake'), ('win', 'Win'), ('commission', 'Commission'), ('purchase', 'Purchase'), ('withdrawal', 'Withdrawal'), ('refund', 'Refund')], max_length=20),
+        ),
+    ]
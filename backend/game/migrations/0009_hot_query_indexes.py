@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_match_cancel_refund'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['player1', 'created_at'], name='game_match_player1_1eaaa0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['player1', 'player2', '-created_at'], name='game_match_player1_6b8a54_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['created_at'], name='game_match_created_3f5367_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'updated_at'], name='game_paymen_status_9966ba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='platformrevenue',
+            index=models.Index(fields=['created_at'], name='game_platfo_created_406abd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-created_at'], name='game_transa_user_id_3fc05a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created_at'], name='game_user_created_683b15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='withdrawal',
+            index=models.Index(fields=['user', 'requested_at'], name='game_withdr_user_id_0414bd_idx'),
+        ),
+    ]
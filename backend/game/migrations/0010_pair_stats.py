@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Q
+
+
+def backfill_pair_stats(apps, schema_editor):
+    Match = apps.get_model("game", "Match")
+    PairStats = apps.get_model("game", "PairStats")
+
+    pairs = {}
+    rows = Match.objects.values("player1_id", "player2_id").annotate(
+        matches=Count("id"),
+        same_ip=Count("id", filter=Q(player1_ip=F("player2_ip"))),
+        first=Min("created_at"),
+        last=Max("created_at"),
+    )
+    for row in rows:
+        key = tuple(sorted((row["player1_id"], row["player2_id"])))
+        stats = pairs.setdefault(key, PairStats(
+            user_low_id=key[0], user_high_id=key[1], first_match_at=row["first"], last_match_at=row["last"],
+        ))
+        stats.match_count += row["matches"]
+        stats.same_ip_count += row["same_ip"]
+        stats.first_match_at = min(stats.first_match_at, row["first"])
+        stats.last_match_at = max(stats.last_match_at, row["last"])
+
+    PairStats.objects.bulk_create(pairs.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0009_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PairStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('match_count', models.IntegerField(default=0)),
+                ('same_ip_count', models.IntegerField(default=0)),
+                ('first_match_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_match_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.user')),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.user')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user_low', 'user_high'), name='unique_pair_stats')],
+            },
+        ),
+        migrations.RunPython(backfill_pair_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0013_leaderboard_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='Start of the hour', unique=True)),
+                ('stars_revenue', models.BigIntegerField(default=0)),
+                ('rake_coins', models.BigIntegerField(default=0)),
+                ('new_users', models.IntegerField(default=0)),
+                ('matches', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:13
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0015_drop_pair_history_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='match',
+            name='game_match_player1_1eaaa0_idx',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:20
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_quick_play_delta(apps, schema_editor):
+    # PvP settlement never changed ratings before this migration, so every
+    # rating so far is the 1000 start plus quick-play rounds
+    Rating = apps.get_model("game", "Rating")
+    Rating.objects.update(quick_play_delta=F("value") - 1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0016_drop_rapid_play_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='rated',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='rating',
+            name='quick_play_delta',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_quick_play_delta, migrations.RunPython.noop),
+    ]
@@ -16,6 +16,11 @@ class User(models.Model):
 
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
+
     def __str__(self):
         return f"{self.username or self.telegram_id}"
 
@@ -23,9 +28,20 @@ class User(models.Model):
 class Rating(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     value = models.IntegerField(default=1000)
+    # Net change from quick-play rounds, which leave no replayable history;
+    # recompute_ratings adds it to the rating rebuilt from PvP matches
+    quick_play_delta = models.IntegerField(default=0)
 
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Leaderboard cold start: rank by COUNT of higher ratings, top-N by value
+            models.Index(fields=["-value", "user"]),
+            # Leaderboard refresh: ratings changed since the last poll
+            models.Index(fields=["updated_at"]),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.value}"
 
@@ -35,6 +51,7 @@ class Match(models.Model):
         ('pending', 'Pending'),
         ('active', 'Active'),
         ('finished', 'Finished'),
+        ('cancelled', 'Cancelled'),
     ]
 
     player1 = models.ForeignKey(User, related_name='player1_matches', on_delete=models.CASCADE)
@@ -58,9 +75,16 @@ class Match(models.Model):
     player2_score = models.IntegerField(default=0)
 
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    # Settled with an Elo update; only these are replayed by recompute_ratings
+    rated = models.BooleanField(default=False)
 
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
+
     def __str__(self):
         return f"Match {self.id} ({self.player1} vs {self.player2})"
 
@@ -73,6 +97,7 @@ class Transaction(models.Model):
         ('commission', 'Commission'),
         ('purchase', 'Purchase'),
         ('withdrawal', 'Withdrawal'),
+        ('refund', 'Refund'),
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -81,23 +106,35 @@ class Transaction(models.Model):
 
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at"]),
+        ]
+
     def __str__(self):
         return f"{self.user} {self.type} {self.amount}"
 
 class Payment(models.Model):
     STATUS_CHOICES = [
+        ("pooled", "Pooled"),
         ("pending", "Pending"),
         ("completed", "Completed"),
         ("failed", "Failed"),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Empty while the invoice sits unclaimed in the pool
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     # Unique ID we send to Telegram as payload
     payload_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    invoice_link = models.CharField(max_length=512, null=True, blank=True)
+    # Pooled invoices are only handed out until then
+    expires_at = models.DateTimeField(null=True, blank=True)
     
     # These are filled when the payment succeeds
     telegram_payment_charge_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
     provider_payment_charge_id = models.CharField(max_length=255, null=True, blank=True)
+    # Set once with the status; revenue is bucketed by it, unlike updated_at
+    completed_at = models.DateTimeField(null=True, blank=True)
     
     amount = models.IntegerField(help_text="Amount in Stars (XTR)")
     coins_credited = models.IntegerField()
@@ -106,8 +143,15 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "completed_at"]),
+            models.Index(fields=["status", "amount", "expires_at"]),
+        ]
+
     def __str__(self):
-        return f"{self.user.username} - {self.amount} Stars ({self.status})"
+        owner = self.user.username if self.user else "pool"
+        return f"{owner} - {self.amount} Stars ({self.status})"
 class Withdrawal(models.Model):
     STATUS_CHOICES = [
         ("pending", "Pending"),
@@ -122,6 +166,11 @@ class Withdrawal(models.Model):
     requested_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "requested_at"]),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.amount} - {self.status}"
 
@@ -138,5 +187,136 @@ class PlatformRevenue(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
+
     def __str__(self):
         return f"Rake {self.amount} coins"
+
+
+class PairStats(models.Model):
+    """
+    Running history of matches between two players, kept for the anti-farm
+    checks. The pair is unordered: ``user_low`` always has the smaller id.
+    """
+    user_low = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    user_high = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    match_count = models.IntegerField(default=0)
+    same_ip_count = models.IntegerField(default=0)
+    first_match_at = models.DateTimeField(default=timezone.now)
+    last_match_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_low", "user_high"], name="unique_pair_stats"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_low_id} vs {self.user_high_id}: {self.match_count} matches"
+
+
+class MatchQueueEntry(models.Model):
+    """A player waiting for an opponent in the shared matchmaking queue."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    stake = models.IntegerField()
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    rating = models.IntegerField(default=1000)
+    enqueued_at = models.DateTimeField(default=timezone.now)
+    waiting_since = models.DateTimeField(
+        default=timezone.now,
+        help_text="First enqueue; kept across polls to widen the rating window",
+    )
+
+    # Set by the worker that paired this player; the player picks the match up on its next poll
+    claimed = models.BooleanField(default=False)
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["stake", "claimed", "enqueued_at"]),
+            models.Index(fields=["stake", "claimed", "rating"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} waiting at {self.stake}"
+
+
+class ActiveRound(models.Model):
+    """Round in progress for a PvP match, shared by every worker."""
+    match = models.OneToOneField(Match, on_delete=models.CASCADE, primary_key=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Round of match {self.match_id}"
+
+
+class RoundMove(models.Model):
+    """One player's move in an ActiveRound; the first move per player wins."""
+    round = models.ForeignKey(ActiveRound, on_delete=models.CASCADE, related_name="moves")
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    move = models.CharField(max_length=10)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["round", "user"], name="unique_round_move"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} played {self.move}"
+
+
+class WebhookUpdate(models.Model):
+    """
+    Raw Telegram update, stored before the webhook answers and processed
+    afterwards by process_webhooks (pre-checkout queries also by the fast lane).
+    """
+    KIND_CHOICES = [
+        ("pre_checkout", "Pre-checkout query"),
+        ("payment", "Successful payment"),
+        ("other", "Other"),
+    ]
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("processing", "Processing"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    # Telegram's id; redelivered updates are dropped on insert
+    update_id = models.BigIntegerField(unique=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    received_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "kind"]),
+            models.Index(fields=["status", "processed_at"]),
+        ]
+
+    def __str__(self):
+        return f"Update {self.update_id} ({self.kind}, {self.status})"
+
+
+class HourlyMetrics(models.Model):
+    """
+    Platform totals for one closed UTC hour, written by rollup_metrics.
+    Every hour gets a row (zeros included), so the latest one is the
+    high-water mark: get_platform_metrics only scans source rows past it.
+    """
+    hour = models.DateTimeField(unique=True, help_text="Start of the hour")
+    stars_revenue = models.BigIntegerField(default=0)
+    rake_coins = models.BigIntegerField(default=0)
+    new_users = models.IntegerField(default=0)
+    matches = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Metrics for {self.hour:%Y-%m-%d %H:00}"
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .consumers import MatchConsumer, MatchmakingConsumer
+
+websocket_urlpatterns = [
+    path("ws/matchmaking/", MatchmakingConsumer.as_asgi()),
+    path("ws/match/<int:match_id>/", MatchConsumer.as_asgi()),
+]
@@ -1,7 +1,87 @@
-from django.db.models import Sum, Count
+"""
+Platform KPIs. Totals come from HourlyMetrics, one row per closed hour
+written by rollup_metrics; only source rows past the last rolled-up hour
+(the current, partial bucket) are aggregated live. Rows are bucketed by
+the timestamp they carry (for payments completed_at, which unlike
+updated_at never moves), so rollups lag by ROLLUP_DELAY to let
+transactions in flight at the end of an hour commit first. Users and
+matches deleted later stay counted in the hour they were created.
+"""
+
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncHour
 from django.utils import timezone
-from datetime import timedelta
-from game.models import Payment, User, Match, PlatformRevenue
+
+from game.models import HourlyMetrics, Match, Payment, PlatformRevenue, User
+
+ROLLUP_DELAY = timedelta(minutes=5)
+ROLLUP_CHUNK = timedelta(days=7)  # hours aggregated per pass when catching up
+
+
+def _sources():
+    """HourlyMetrics column → (source rows, timestamp field, aggregate, aggregated field)."""
+    return {
+        "stars_revenue": (Payment.objects.filter(status="completed"), "completed_at", Sum, "amount"),
+        "rake_coins": (PlatformRevenue.objects.all(), "created_at", Sum, "amount"),
+        "new_users": (User.objects.all(), "created_at", Count, "id"),
+        "matches": (Match.objects.all(), "created_at", Count, "id"),
+    }
+
+
+def _start_of_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_high_water_mark():
+    """End of the last rolled-up hour, or None before the first rollup."""
+    last = HourlyMetrics.objects.aggregate(Max("hour"))["hour__max"]
+    return last + timedelta(hours=1) if last else None
+
+
+def rollup_metrics(now=None):
+    """
+    Write HourlyMetrics for every hour between the high-water mark (or the
+    oldest source row) and the last hour closed ROLLUP_DELAY ago. Returns
+    how many hours were written.
+    """
+    until = _start_of_hour((now or timezone.now()) - ROLLUP_DELAY)
+    start = rollup_high_water_mark()
+    if start is None:
+        firsts = [
+            rows.aggregate(first=Min(field))["first"]
+            for rows, field, _, _ in _sources().values()
+        ]
+        firsts = [first for first in firsts if first is not None]
+        if not firsts:
+            return 0
+        start = _start_of_hour(min(firsts))
+
+    written = 0
+    while start < until:
+        end = min(start + ROLLUP_CHUNK, until)
+        totals = {}
+        for column, (rows, field, aggregate, source) in _sources().items():
+            per_hour = (
+                rows.filter(**{f"{field}__gte": start, f"{field}__lt": end})
+                .annotate(bucket=TruncHour(field, tzinfo=dt_timezone.utc))
+                .order_by()
+                .values("bucket")
+                .annotate(total=aggregate(source))
+            )
+            for row in per_hour:
+                totals.setdefault(row["bucket"], {})[column] = row["total"] or 0
+
+        hours = [start + timedelta(hours=i) for i in range((end - start) // timedelta(hours=1))]
+        # A concurrent run writes the same rows; whichever lands second is dropped
+        HourlyMetrics.objects.bulk_create(
+            [HourlyMetrics(hour=hour, **totals.get(hour, {})) for hour in hours], ignore_conflicts=True
+        )
+        written += len(hours)
+        start = end
+    return written
+
 
 def get_platform_metrics():
     """
@@ -9,38 +89,39 @@ def get_platform_metrics():
     """
     now = timezone.now()
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-    # 1. Revenue (Completed Payments)
-    total_stars_revenue = Payment.objects.filter(status="completed").aggregate(Sum("amount"))["amount__sum"] or 0
-    today_stars_revenue = Payment.objects.filter(status="completed", updated_at__gte=today_start).aggregate(Sum("amount"))["amount__sum"] or 0
-
-    # 2. Match Rake (Platform Revenue table)
-    total_rake = PlatformRevenue.objects.aggregate(Sum("amount"))["amount__sum"] or 0
-    today_rake = PlatformRevenue.objects.filter(created_at__gte=today_start).aggregate(Sum("amount"))["amount__sum"] or 0
-
-    # 3. User Growth
-    total_users = User.objects.count()
-    new_users_today = User.objects.filter(created_at__gte=today_start).count()
 
-    # 4. Engagement
-    total_matches = Match.objects.count()
-    active_matches_today = Match.objects.filter(created_at__gte=today_start).count()
+    # Rolled-up hours, then the live tail past the mark (everything before the first rollup)
+    rolled = HourlyMetrics.objects.aggregate(last_hour=Max("hour"), **{
+        f"{prefix}{column}": Sum(column, filter=today)
+        for column in _sources()
+        for prefix, today in (("total_", None), ("today_", Q(hour__gte=today_start)))
+    })
+    mark = rolled["last_hour"] + timedelta(hours=1) if rolled["last_hour"] else None
+    totals, today = {}, {}
+    for column, (rows, field, aggregate, source) in _sources().items():
+        if mark is not None:
+            rows = rows.filter(**{f"{field}__gte": mark})
+        tail = rows.aggregate(
+            total=aggregate(source),
+            today=aggregate(source, filter=Q(**{f"{field}__gte": today_start})),
+        )
+        totals[column] = (rolled[f"total_{column}"] or 0) + (tail["total"] or 0)
+        today[column] = (rolled[f"today_{column}"] or 0) + (tail["today"] or 0)
 
     return {
         "revenue": {
-            "total_stars": total_stars_revenue,
-            "today_stars": today_stars_revenue,
-            "total_rake_coins": total_rake,
-            "today_rake_coins": today_rake,
+            "total_stars": totals["stars_revenue"],
+            "today_stars": today["stars_revenue"],
+            "total_rake_coins": totals["rake_coins"],
+            "today_rake_coins": today["rake_coins"],
         },
         "users": {
-            "total": total_users,
-            "new_today": new_users_today,
+            "total": totals["new_users"],
+            "new_today": today["new_users"],
         },
         "matches": {
-            "total": total_matches,
-            "active_today": active_matches_today,
+            "total": totals["matches"],
+            "active_today": today["matches"],
         },
         "timestamp": now.isoformat()
     }
@@ -1,35 +1,67 @@
-from django.db.models import Q
-from game.models import Match
+from django.db import IntegrityError, transaction
+from django.db.models import F
 
+from game.models import PairStats
 
-def is_same_ip_farming(match) -> bool:
+# Matches between the same two players after which rating gains stop
+PAIR_MATCH_LIMIT = 3
+
+
+def pair_key(user_a_id, user_b_id):
+    """The unordered pair as (low id, high id)."""
+    return (user_a_id, user_b_id) if user_a_id < user_b_id else (user_b_id, user_a_id)
+
+
+def _is_same_ip(match) -> bool:
+    return bool(match.player1_ip and match.player1_ip == match.player2_ip)
+
+
+def record_pair_match(match) -> None:
     """
-    Detect same-IP farming: two accounts from same IP playing each other repeatedly.
-    Returns True if we should block rating gains / treat as suspicious.
+    Count a new match in the pair's PairStats row. Called from enter_match,
+    inside the transaction that creates the match.
     """
-    if not match.player1_ip or not match.player2_ip:
-        return False
-    if match.player1_ip != match.player2_ip:
-        return False
+    low, high = pair_key(match.player1_id, match.player2_id)
+    same_ip = int(_is_same_ip(match))
+    changes = {
+        "match_count": F("match_count") + 1,
+        "same_ip_count": F("same_ip_count") + same_ip,
+        "last_match_at": match.created_at,
+    }
 
-    # Same IP on this match: check if they play each other repeatedly
-    recent = Match.objects.filter(
-        Q(player1=match.player1, player2=match.player2)
-        | Q(player1=match.player2, player2=match.player1)
-    ).order_by("-created_at")[:5]
+    if PairStats.objects.filter(user_low_id=low, user_high_id=high).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            PairStats.objects.create(
+                user_low_id=low,
+                user_high_id=high,
+                match_count=1,
+                same_ip_count=same_ip,
+                first_match_at=match.created_at,
+                last_match_at=match.created_at,
+            )
+    except IntegrityError:
+        # The pair's first two matches were created at the same time
+        PairStats.objects.filter(user_low_id=low, user_high_id=high).update(**changes)
 
-    return recent.count() >= 3
 
+def _pair_match_count(user_a_id, user_b_id) -> int:
+    low, high = pair_key(user_a_id, user_b_id)
+    return PairStats.objects.filter(user_low_id=low, user_high_id=high).values_list(
+        "match_count", flat=True
+    ).first() or 0
 
-def can_gain_rating(player, opponent, match=None) -> bool:
+
+def gains_allowed(pair_match_count) -> bool:
+    """The anti-farm rule, given how many matches the pair has played (this one included)."""
+    return pair_match_count < PAIR_MATCH_LIMIT
+
+
+def can_gain_rating(player, opponent) -> bool:
     """
     Block rating gains if same pair plays repeatedly or same-IP farming.
+    Same-IP farming is the repeated-pair rule on a shared IP, so both come
+    down to one lookup of the pair's match count.
     """
-    if match and is_same_ip_farming(match):
-        return False
-
-    recent_matches = Match.objects.filter(
-        Q(player1=player, player2=opponent) | Q(player1=opponent, player2=player)
-    ).order_by("-created_at")[:5]
-
-    return recent_matches.count() < 3
+    return gains_allowed(_pair_match_count(player.pk, opponent.pk))
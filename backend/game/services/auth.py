@@ -1,28 +1,76 @@
 from django.http import JsonResponse
 from functools import wraps
-from game.models import User
 from game.services.jwt_service import decode_jwt
+from game.services.user_cache import get_user_cache
 
 
-def jwt_required(view_func):
+def _token_payload(request):
+    """(payload, None) for a valid Bearer token, else (None, error response)."""
+    auth_header = request.headers.get("Authorization")
+
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None, JsonResponse({"error": "Missing token"}, status=401)
+
+    token = auth_header.split(" ")[1]
+    payload = decode_jwt(token)
+
+    if not payload:
+        return None, JsonResponse({"error": "Invalid or expired token"}, status=401)
+    return payload, None
+
+
+def _user_error(user):
+    if user is None:
+        return JsonResponse({"error": "User not found"}, status=401)
+    if user.is_banned:
+        return JsonResponse({"error": "Account banned"}, status=403)
+    return None
+
+
+def jwt_required(view_func=None, *, fresh=False):
+    """
+    Authenticate the request from its Bearer token and set ``request.user``.
+    The user may come from the short-lived user cache; views that move
+    money or check account flags use ``@jwt_required(fresh=True)`` to read
+    the row from the database.
+    """
+    if view_func is None:
+        return lambda func: jwt_required(func, fresh=fresh)
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        auth_header = request.headers.get("Authorization")
+        payload, error = _token_payload(request)
+        if error:
+            return error
 
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return JsonResponse({"error": "Missing token"}, status=401)
+        user = get_user_cache().get(payload["user_id"], fresh=fresh, endpoint=view_func.__name__)
+        error = _user_error(user)
+        if error:
+            return error
+        request.user = user
 
-        token = auth_header.split(" ")[1]
-        payload = decode_jwt(token)
+        return view_func(request, *args, **kwargs)
+
+    return wrapper
 
-        if not payload:
-            return JsonResponse({"error": "Invalid or expired token"}, status=401)
 
-        try:
-            request.user = User.objects.get(id=payload["user_id"])
-        except User.DoesNotExist:
-            return JsonResponse({"error": "User not found"}, status=401)
+def async_jwt_required(view_func=None, *, fresh=False):
+    """jwt_required for ``async def`` views; a cached user costs no thread hop."""
+    if view_func is None:
+        return lambda func: async_jwt_required(func, fresh=fresh)
 
-        return view_func(request, *args, **kwargs)
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        payload, error = _token_payload(request)
+        if error:
+            return error
+
+        user = await get_user_cache().aget(payload["user_id"], fresh=fresh, endpoint=view_func.__name__)
+        error = _user_error(user)
+        if error:
+            return error
+        request.user = user
+
+        return await view_func(request, *args, **kwargs)
 
     return wrapper
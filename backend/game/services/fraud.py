@@ -0,0 +1,235 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from game.models import User
+from game.services.user_cache import invalidate_users
+
+logger = logging.getLogger(__name__)
+
+# Channel the "channel" sink publishes to; drained by `manage.py runworker fraud-events`
+FRAUD_CHANNEL = "fraud-events"
+
+WINDOW = 24 * 60 * 60  # seconds of history every feature looks back over
+MAX_TRACKED_KEYS = 100_000  # users / IPs / pairs kept per feature; least recently seen are dropped
+MAX_EVENTS_PER_KEY = 200
+# Seconds a user just flagged is not flagged again; once an admin clears the
+# flag, the user can trip the rules again after this long
+FLAG_MEMORY = 10 * 60
+
+# Pair: one side keeps winning against the same opponent, from the same IP.
+# A strong player meeting a weak one looks the same, so the win rate alone
+# is not enough
+PAIR_MIN_MATCHES = 5
+PAIR_WIN_RATE = 0.9
+# IP: several accounts playing each other from the same address. Households,
+# cafés and carrier NAT do that too, so it is logged for review, not flagged
+IP_MAX_ACCOUNTS = 3
+# Chip dumping: most of a user's losses go to a single opponent
+DUMP_MIN_COINS = 500
+DUMP_SHARE = 0.8
+
+
+def match_created_event(match):
+    return {
+        "kind": "match.created",
+        "match": match.pk,
+        "player1": match.player1_id,
+        "player2": match.player2_id,
+        "player1_ip": match.player1_ip,
+        "player2_ip": match.player2_ip,
+        "stake": match.stake,
+        "at": time.time(),
+    }
+
+
+def match_finished_event(match, winner):
+    event = match_created_event(match)
+    event.update(kind="match.finished", winner=winner.pk)
+    return event
+
+
+class _Windows:
+    """Per-key deques of (timestamp, value), trimmed to WINDOW and bounded in size."""
+
+    def __init__(self):
+        self.keys = OrderedDict()
+
+    def add(self, key, now, value):
+        events = self.keys.get(key)
+        if events is None:
+            events = self.keys[key] = deque(maxlen=MAX_EVENTS_PER_KEY)
+            if len(self.keys) > MAX_TRACKED_KEYS:
+                self.keys.popitem(last=False)
+        else:
+            self.keys.move_to_end(key)
+        events.append((now, value))
+        while events[0][0] < now - WINDOW:
+            events.popleft()
+        return events
+
+
+class FraudScorer:
+    """
+    Incremental fraud features over match events. Everything lives in
+    memory; the only database write is the UPDATE that flags users, and it
+    only happens when a rule trips for a user not flagged yet.
+    """
+
+    def __init__(self):
+        self.pairs = _Windows()  # (low, high) → (winner, stake)
+        self.ips = _Windows()  # ip → (player1, player2) of same-IP matches
+        self.losses = _Windows()  # loser → (winner, stake)
+        self.flagged = OrderedDict()  # user → when flagged, oldest first
+        self._lock = threading.Lock()
+
+    def process(self, event):
+        """Consume one event. Returns the ids of users newly flagged by it."""
+        with self._lock:
+            suspects = self._score(event)
+            suspects = self._not_flagged_recently(suspects, event["at"])
+        if suspects:
+            self.flag(suspects, event)
+        return suspects
+
+    def _not_flagged_recently(self, suspects, now):
+        """Drop suspects flagged within FLAG_MEMORY and remember the rest as flagged now."""
+        while self.flagged and next(iter(self.flagged.values())) < now - FLAG_MEMORY:
+            self.flagged.popitem(last=False)
+        suspects = {user for user in suspects if user not in self.flagged}
+        for user in suspects:
+            self.flagged[user] = now
+            if len(self.flagged) > MAX_TRACKED_KEYS:
+                self.flagged.popitem(last=False)
+        return suspects
+
+    def _score(self, event):
+        now = event["at"]
+        player1, player2 = event["player1"], event["player2"]
+        suspects = set()
+
+        if event["kind"] == "match.created":
+            ip = event["player1_ip"]
+            if ip and ip == event["player2_ip"]:
+                matches = self.ips.add(ip, now, (player1, player2))
+                accounts = {user for _, pair in matches for user in pair}
+                before = {user for _, pair in list(matches)[:-1] for user in pair}
+                if len(accounts) >= IP_MAX_ACCOUNTS and accounts != before:
+                    logger.warning(
+                        "Fraud pipeline: accounts %s played each other from %s (for review, not flagged)",
+                        sorted(accounts), ip,
+                    )
+            return suspects
+
+        winner = event["winner"]
+        loser = player2 if winner == player1 else player1
+        pair = (player1, player2) if player1 < player2 else (player2, player1)
+
+        results = self.pairs.add(pair, now, (winner, event["stake"]))
+        same_ip = event["player1_ip"] and event["player1_ip"] == event["player2_ip"]
+        if same_ip and len(results) >= PAIR_MIN_MATCHES:
+            _, wins = Counter(w for _, (w, _) in results).most_common(1)[0]
+            if wins / len(results) >= PAIR_WIN_RATE:
+                suspects |= set(pair)
+
+        lost_to = Counter()
+        for _, (opponent, stake) in self.losses.add(loser, now, (winner, event["stake"])):
+            lost_to[opponent] += stake
+        total_lost = sum(lost_to.values())
+        if total_lost >= DUMP_MIN_COINS:
+            opponent, coins = lost_to.most_common(1)[0]
+            if coins / total_lost >= DUMP_SHARE:
+                suspects |= {loser, opponent}
+
+        return suspects
+
+    def flag(self, user_ids, event):
+        User.objects.filter(pk__in=user_ids, is_flagged=False).update(is_flagged=True)
+        invalidate_users(*user_ids)
+        logger.warning(
+            "Fraud pipeline flagged users %s after %s of match %s",
+            sorted(user_ids), event["kind"], event["match"],
+        )
+
+
+class InlineSink:
+    """Score in the calling thread. Simple, but a flag UPDATE lands on the request."""
+
+    def __init__(self, scorer=None):
+        self.scorer = scorer or FraudScorer()
+
+    def publish(self, event):
+        self.scorer.process(event)
+
+
+class ThreadSink:
+    """Hand events to a daemon thread in this process; publishing never blocks."""
+
+    def __init__(self, scorer=None, maxsize=100_000):
+        self.scorer = scorer or FraudScorer()
+        self.events = queue.Queue(maxsize=maxsize)
+        self._worker = None
+
+    def publish(self, event):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            logger.warning("Fraud pipeline backlog full, dropping %s of match %s", event["kind"], event["match"])
+
+    def start(self):
+        if self._worker is not None:
+            return
+
+        def run():
+            while True:
+                event = self.events.get()
+                try:
+                    self.scorer.process(event)
+                except Exception:
+                    logger.exception("Fraud pipeline failed on %s", event)
+                finally:
+                    self.events.task_done()
+
+        self._worker = threading.Thread(target=run, name="fraud-pipeline", daemon=True)
+        self._worker.start()
+
+
+class ChannelSink:
+    """
+    Send events over the channel layer to a dedicated worker process, so
+    every web worker feeds one scorer. Needs a shared layer (REDIS_URL).
+    """
+
+    def publish(self, event):
+        async_to_sync(get_channel_layer().send)(FRAUD_CHANNEL, {"type": "fraud.event", "event": event})
+
+
+FRAUD_SINKS = {
+    "inline": InlineSink,
+    "thread": ThreadSink,
+    "channel": ChannelSink,
+}
+
+_sink = None
+
+
+def get_sink():
+    """Sink selected by ``settings.FRAUD_PIPELINE_SINK``, built once per process."""
+    global _sink
+    if _sink is None:
+        _sink = FRAUD_SINKS[settings.FRAUD_PIPELINE_SINK]()
+        if isinstance(_sink, ThreadSink):
+            _sink.start()
+    return _sink
+
+
+def publish(event):
+    """Publish a match event once the surrounding transaction commits."""
+    transaction.on_commit(lambda: get_sink().publish(event))
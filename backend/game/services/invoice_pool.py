@@ -0,0 +1,121 @@
+import logging
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from game.models import Payment
+from game.services.telegram_bot import TelegramAPIError, get_bot_client
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CANDIDATES = 5  # pooled rows read per claim; concurrent claims pick different ones
+
+
+def new_payload_id():
+    return f"pay_{uuid.uuid4().hex}"
+
+
+def invoice_link_request(payload_id, coins, amount):
+    """Body of the createInvoiceLink call for a Stars purchase."""
+    return {
+        "title": f"Purchase {coins} Coins",
+        "description": f"Buy {coins} coins for Rock-Paper-Scissors Arena",
+        "payload": payload_id,
+        "currency": "XTR",
+        "prices": [
+            {"label": f"{coins} Coins", "amount": amount}
+        ]
+    }
+
+
+def claim_invoice(user, amount):
+    """
+    Hand a pooled, unexpired invoice for ``amount`` Stars to ``user``.
+    Returns the Payment, now pending for that user, or None on a pool miss.
+
+    The claim is one conditional UPDATE; if another request took the row
+    first the next candidate is tried.
+    """
+    if amount not in settings.INVOICE_POOL_AMOUNTS:
+        return None
+
+    now = timezone.now()
+    candidates = list(
+        Payment.objects.filter(status="pooled", amount=amount, expires_at__gt=now)
+        .order_by("expires_at")
+        .values_list("pk", "payload_id", "invoice_link", "coins_credited")[:CLAIM_CANDIDATES]
+    )
+    random.shuffle(candidates)
+
+    for pk, payload_id, invoice_link, coins_credited in candidates:
+        claimed = Payment.objects.filter(pk=pk, status="pooled", expires_at__gt=now).update(
+            user=user, status="pending", updated_at=now
+        )
+        if claimed:
+            return Payment(
+                pk=pk,
+                user=user,
+                payload_id=payload_id,
+                invoice_link=invoice_link,
+                amount=amount,
+                coins_credited=coins_credited,
+                status="pending",
+                updated_at=now,
+            )
+    return None
+
+
+def expire_pool():
+    """Drop pooled invoices past their TTL. Returns how many were removed."""
+    deleted, _ = Payment.objects.filter(status="pooled", expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def refill_pool(size=None, ttl=None, amounts=None, client=None):
+    """
+    Top the pool up to ``size`` unexpired invoices per amount, creating each
+    link with the Bot API before its row exists. Stops early when Telegram
+    fails; the next run carries on. Returns ``{amount: invoices created}``.
+    """
+    size = settings.INVOICE_POOL_SIZE if size is None else size
+    ttl = settings.INVOICE_POOL_TTL if ttl is None else ttl
+    amounts = settings.INVOICE_POOL_AMOUNTS if amounts is None else amounts
+    client = client or get_bot_client()
+
+    now = timezone.now()
+    stocked = dict(
+        Payment.objects.filter(status="pooled", amount__in=amounts, expires_at__gt=now)
+        .values_list("amount")
+        .annotate(n=Count("pk"))
+    )
+
+    created = {}
+    for amount in amounts:
+        created[amount] = 0
+        for _ in range(size - stocked.get(amount, 0)):
+            # 1 Star = 1 Coin, as in create_invoice_view
+            coins = amount
+            payload_id = new_payload_id()
+            try:
+                res_data = client.call("createInvoiceLink", invoice_link_request(payload_id, coins, amount))
+            except TelegramAPIError as e:
+                logger.error(f"Invoice pool refill stopped: {e}")
+                return created
+            if not res_data.get("ok"):
+                logger.error(f"Invoice pool refill stopped: {res_data.get('description')}")
+                return created
+
+            Payment.objects.create(
+                payload_id=payload_id,
+                invoice_link=res_data["result"],
+                amount=amount,
+                coins_credited=coins,
+                status="pooled",
+                expires_at=timezone.now() + timedelta(seconds=ttl),
+            )
+            created[amount] += 1
+    return created
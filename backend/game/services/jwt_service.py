@@ -1,13 +1,21 @@
 import jwt
 import datetime
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from django.conf import settings
 
+TOKEN_CACHE_SIZE = 50_000  # verified tokens kept per process; least recently used are dropped
+
 
 def generate_jwt(user):
+    now = datetime.datetime.now(datetime.UTC)
     payload = {
         "user_id": user.id,
         "telegram_id": user.telegram_id,
-        "exp": datetime.datetime.now(datetime.UTC) + datetime.timedelta(
+        "iat": now,
+        "exp": now + datetime.timedelta(
             seconds=settings.JWT_EXP_DELTA_SECONDS
         )
     }
@@ -16,9 +24,67 @@ def generate_jwt(user):
     return token
 
 
-def decode_jwt(token):
+class VerifiedTokenCache:
+    """
+    Payloads of tokens that already passed signature verification, keyed by
+    the token's SHA-256 digest. An entry is only served until the token's
+    ``exp``, and never for a user whose tokens were revoked after it was issued.
+    """
+
+    def __init__(self, size=TOKEN_CACHE_SIZE, clock=time.time):
+        self.size = size
+        self.clock = clock
+        # digest → payload
+        self.entries = OrderedDict()
+        # user_id → time before which that user's tokens are refused
+        self.revoked = {}
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        with self._lock:
+            payload = self.entries.get(digest)
+            if payload is None:
+                return None
+            if payload["exp"] <= self.clock() or self._is_revoked(payload):
+                del self.entries[digest]
+                return None
+            self.entries.move_to_end(digest)
+            return dict(payload)
+
+    def put(self, digest, payload):
+        with self._lock:
+            self.entries[digest] = dict(payload)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def _is_revoked(self, payload):
+        revoked_at = self.revoked.get(payload.get("user_id"))
+        return revoked_at is not None and payload.get("iat", 0) <= revoked_at
+
+    def is_revoked(self, payload):
+        with self._lock:
+            return self._is_revoked(payload)
+
+    def revoke_user(self, user_id):
+        with self._lock:
+            self.revoked[user_id] = self.clock()
+            stale = [digest for digest, payload in self.entries.items() if payload.get("user_id") == user_id]
+            for digest in stale:
+                del self.entries[digest]
+
+
+_token_cache = VerifiedTokenCache()
+
+
+def decode_jwt(token, use_cache=True):
+    digest = hashlib.sha256(token.encode()).digest()
+    if use_cache:
+        payload = _token_cache.get(digest)
+        if payload is not None:
+            return payload
+
     try:
-        return jwt.decode(
+        payload = jwt.decode(
             token,
             settings.JWT_SECRET_KEY,
             algorithms=[settings.JWT_ALGORITHM]
@@ -27,3 +93,17 @@ def decode_jwt(token):
         return None
     except jwt.InvalidTokenError:
         return None
+
+    if _token_cache.is_revoked(payload):
+        return None
+    if use_cache:
+        _token_cache.put(digest, payload)
+    return payload
+
+
+def revoke_user_tokens(user_id):
+    """
+    Refuse every token issued to this user so far (e.g. on ban). Applies to
+    this process; other workers still reject banned users in jwt_required.
+    """
+    _token_cache.revoke_user(user_id)
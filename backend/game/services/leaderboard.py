@@ -0,0 +1,298 @@
+"""
+Rating leaderboard. Each process keeps every rated user in memory:
+
+* a Fenwick tree of how many users hold each rating value, so the rank of
+  a rating (1 + users rated strictly higher) costs O(log R) for R distinct
+  possible values;
+* for each rating present, its user ids in ascending order, and the
+  ratings present in ascending order, for top-N pages.
+
+Ratings saved in this process are applied as they commit (update_elo and
+the quick-play rating saves report them); changes made elsewhere are
+picked up by polling ``Rating.updated_at`` every ``LEADERBOARD_REFRESH``
+seconds. Until the first load from the database finishes, reads are
+answered by ``DatabaseLeaderboard`` with plain queries.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from game.models import Rating
+
+logger = logging.getLogger(__name__)
+
+RATING_RANGE = (0, 4096)  # initial span of the Fenwick tree; it grows on demand
+REFRESH_OVERLAP = 5  # seconds re-read before the last poll, for commits that landed late
+LOAD_CHUNK_SIZE = 10_000
+MAX_PAGE = 100
+
+
+def encode_cursor(value, user_id):
+    return f"{value}:{user_id}"
+
+
+def decode_cursor(cursor):
+    """(value, user_id) of the last entry of the previous page. Raises ValueError."""
+    value, user_id = cursor.split(":")
+    return int(value), int(user_id)
+
+
+class _Fenwick:
+    """Counts per index with O(log n) point updates and prefix sums."""
+
+    def __init__(self, counts):
+        # O(n) build: push each node's total into its parent
+        self.tree = [0] + list(counts)
+        for i in range(1, len(self.tree)):
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index, delta):
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index):
+        """Sum of counts at 0..index."""
+        index += 1
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+
+class Leaderboard:
+    """
+    Ratings ordered by value (highest first), ties by user id. Ranks are
+    competition ranks: users with the same rating share one.
+    """
+
+    def __init__(self, rows=(), refreshed_at=None):
+        self.values = {}  # user_id → rating
+        self.buckets = {}  # rating → user ids, ascending
+        self.levels = []  # ratings present, ascending
+        self.refreshed_at = refreshed_at  # Rating.updated_at polled up to here
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._polled = time.monotonic()
+
+        for user_id, value in rows:
+            self.values[user_id] = value
+            self.buckets.setdefault(value, []).append(user_id)
+        for user_ids in self.buckets.values():
+            user_ids.sort()
+        self.levels = sorted(self.buckets)
+        self._rebuild(*RATING_RANGE)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _rebuild(self, low, high):
+        if self.levels:
+            low, high = min(low, self.levels[0]), max(high, self.levels[-1] + 1)
+        self.low, self.high = low, high
+        counts = [0] * (high - low)
+        for value, user_ids in self.buckets.items():
+            counts[value - low] = len(user_ids)
+        self.counts = _Fenwick(counts)
+
+    def _higher(self, value):
+        """Users rated strictly above ``value``."""
+        return len(self.values) - self.counts.prefix(value - self.low)
+
+    def _remove(self, user_id):
+        value = self.values.pop(user_id, None)
+        if value is None:
+            return
+        user_ids = self.buckets[value]
+        del user_ids[bisect_left(user_ids, user_id)]
+        if not user_ids:
+            del self.buckets[value]
+            del self.levels[bisect_left(self.levels, value)]
+        self.counts.add(value - self.low, -1)
+
+    def _insert(self, user_id, value):
+        if not self.low <= value < self.high:
+            # Double the span towards the new value
+            span = self.high - self.low
+            self._rebuild(min(self.low, value - span), max(self.high, value + span))
+        self.values[user_id] = value
+        user_ids = self.buckets.get(value)
+        if user_ids is None:
+            user_ids = self.buckets[value] = []
+            insort(self.levels, value)
+        insort(user_ids, user_id)
+        self.counts.add(value - self.low, 1)
+
+    def update(self, user_id, value):
+        with self._lock:
+            if self.values.get(user_id) == value:
+                return
+            self._remove(user_id)
+            self._insert(user_id, value)
+
+    def remove(self, user_id):
+        with self._lock:
+            self._remove(user_id)
+
+    def rank(self, user_id):
+        """(rank, rating, rated users) for a user, or None if unrated."""
+        with self._lock:
+            value = self.values.get(user_id)
+            if value is None:
+                return None
+            return self._higher(value) + 1, value, len(self.values)
+
+    def top(self, limit, after=None):
+        """
+        Up to ``limit`` entries (rank, user_id, rating) after the cursor
+        ``after`` (rating, user_id), and the cursor for the next page (None
+        on the last one).
+        """
+        with self._lock:
+            level = len(self.levels) - 1
+            start = 0
+            if after is not None:
+                after_value, after_user = after
+                level = bisect_right(self.levels, after_value) - 1
+                if level >= 0 and self.levels[level] == after_value:
+                    start = bisect_right(self.buckets[after_value], after_user)
+
+            # One entry more than asked tells whether another page follows
+            entries = []
+            while level >= 0 and len(entries) <= limit:
+                value = self.levels[level]
+                user_ids = self.buckets[value][start:start + limit + 1 - len(entries)]
+                if user_ids:
+                    rank = self._higher(value) + 1
+                    entries.extend((rank, user_id, value) for user_id in user_ids)
+                level, start = level - 1, 0
+
+        if len(entries) <= limit:
+            return entries, None
+        entries = entries[:limit]
+        return entries, encode_cursor(entries[-1][2], entries[-1][1])
+
+    def refresh(self, interval):
+        """Apply ratings changed since the last poll, at most once per ``interval`` seconds."""
+        if time.monotonic() - self._polled < interval or not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            if self.refreshed_at is None:
+                self.refreshed_at = timezone.now()
+                return
+            since = self.refreshed_at - timedelta(seconds=REFRESH_OVERLAP)
+            polled_at = timezone.now()
+            changed = Rating.objects.filter(updated_at__gte=since).values_list(
+                "user_id", "value", "user__is_banned"
+            )
+            for user_id, value, is_banned in changed.iterator(chunk_size=LOAD_CHUNK_SIZE):
+                if is_banned:
+                    self.remove(user_id)
+                else:
+                    self.update(user_id, value)
+            self.refreshed_at = polled_at
+            self._polled = time.monotonic()
+        finally:
+            self._refreshing.release()
+
+
+class DatabaseLeaderboard:
+    """Same reads straight from the database, used until the in-memory board is loaded."""
+
+    def _rated(self):
+        return Rating.objects.filter(user__is_banned=False)
+
+    def rank(self, user_id):
+        value = self._rated().filter(user_id=user_id).values_list("value", flat=True).first()
+        if value is None:
+            return None
+        return self._rated().filter(value__gt=value).count() + 1, value, self._rated().count()
+
+    def top(self, limit, after=None):
+        ratings = self._rated().order_by("-value", "user_id")
+        if after is not None:
+            after_value, after_user = after
+            ratings = ratings.filter(Q(value__lt=after_value) | Q(value=after_value, user_id__gt=after_user))
+        rows = list(ratings.values_list("user_id", "value")[:limit + 1])
+
+        entries, ranks = [], {}
+        for user_id, value in rows[:limit]:
+            if value not in ranks:
+                ranks[value] = self._rated().filter(value__gt=value).count() + 1
+            entries.append((ranks[value], user_id, value))
+        next_cursor = encode_cursor(entries[-1][2], entries[-1][1]) if len(rows) > limit else None
+        return entries, next_cursor
+
+
+_board = None
+_loading = threading.Lock()  # held while the board is being loaded
+
+
+def load_leaderboard():
+    """Build the in-memory board from every rating of a user in good standing."""
+    started = timezone.now()
+    rows = (
+        Rating.objects.filter(user__is_banned=False)
+        .values_list("user_id", "value")
+        .iterator(chunk_size=LOAD_CHUNK_SIZE)
+    )
+    return Leaderboard(rows, refreshed_at=started)
+
+
+def _load_in_background():
+    global _board
+    try:
+        _board = load_leaderboard()
+        logger.info("Leaderboard loaded: %s rated users", len(_board))
+    except Exception:
+        logger.exception("Leaderboard load failed")
+    finally:
+        close_old_connections()
+        _loading.release()
+
+
+def get_leaderboard():
+    """
+    This process's board, brought up to date when ``settings.LEADERBOARD_REFRESH``
+    seconds have passed. The first call starts loading it in the background;
+    until that finishes the database answers.
+    """
+    board = _board
+    if board is not None:
+        board.refresh(settings.LEADERBOARD_REFRESH)
+        return board
+    if _loading.acquire(blocking=False):
+        threading.Thread(target=_load_in_background, name="leaderboard-load", daemon=True).start()
+    return DatabaseLeaderboard()
+
+
+def record_rating(user_id, value):
+    """Apply a saved rating to this process's board (if loaded) right away."""
+    board = _board
+    if board is not None:
+        board.update(user_id, value)
+
+
+def rating_saved(*ratings):
+    """Apply saved Rating rows to the board once the current transaction commits."""
+    changes = [(rating.user_id, rating.value) for rating in ratings]
+    transaction.on_commit(lambda: [record_rating(user_id, value) for user_id, value in changes])
+
+
+def remove_user(user_id):
+    """Take a user off this process's board (e.g. on ban); other processes follow on refresh."""
+    board = _board
+    if board is not None:
+        board.remove(user_id)
@@ -1,21 +1,96 @@
-from game.models import Match, User
-from game.services.wallet import deduct_coins
+from django.db import transaction
+from django.db.models import F
+
+from game.models import Match, Transaction, User
+from game.services.anti_farm import record_pair_match
+from game.services.fraud import match_created_event, publish
+from game.services.user_cache import invalidate_users
+from game.services.rps_engine import ROUNDS_TO_WIN, decide_round_winner
+from game.services.settlement import settle_match
 
 
 def enter_match(player1: User, player2: User, stake: int, player1_ip=None, player2_ip=None):
     """
-    Deduct coins from both players and create match (escrow).
+    Escrow both stakes and create the match in one transaction: one
+    conditional UPDATE debits both players, one bulk INSERT logs both stake
+    transactions, then the match row is created and counted in the pair's
+    PairStats. If either player cannot cover the stake nothing is written
+    and ValueError is raised.
     """
-    deduct_coins(player1, stake, tx_type="stake")
-    deduct_coins(player2, stake, tx_type="stake")
-
-    match = Match.objects.create(
-        player1=player1,
-        player2=player2,
-        stake=stake,
-        status="active",
-        player1_ip=player1_ip,
-        player2_ip=player2_ip,
-    )
+    if stake <= 0:
+        raise ValueError("Amount must be positive")
+    if player1.pk == player2.pk:
+        raise ValueError("A player cannot play against themselves")
+
+    with transaction.atomic():
+        debited = User.objects.filter(pk__in=[player1.pk, player2.pk], coins__gte=stake).update(
+            coins=F("coins") - stake
+        )
+        if debited != 2:
+            # Rolls back the debit of whichever player could pay
+            raise ValueError("Insufficient balance")
+
+        Transaction.objects.bulk_create([
+            Transaction(user=player1, amount=-stake, type="stake"),
+            Transaction(user=player2, amount=-stake, type="stake"),
+        ])
+
+        match = Match.objects.create(
+            player1=player1,
+            player2=player2,
+            stake=stake,
+            status="active",
+            player1_ip=player1_ip,
+            player2_ip=player2_ip,
+        )
+        record_pair_match(match)
+        publish(match_created_event(match))
+        invalidate_users(player1.pk, player2.pk)
+
+    # Keep the callers' copies in step without re-reading both rows
+    player1.coins -= stake
+    player2.coins -= stake
 
     return match
+
+
+def resolve_round(match: Match, move1, move2):
+    """
+    Score one round and settle the match once a player reaches ROUNDS_TO_WIN.
+    A missing move (None) loses the round; two missing moves are a draw.
+    """
+    if move1 is None and move2 is None:
+        result = "draw"
+    elif move1 is None:
+        result = "player2"
+    elif move2 is None:
+        result = "player1"
+    else:
+        result = decide_round_winner(move1, move2)
+
+    if result == "player1":
+        match.player1_score += 1
+    elif result == "player2":
+        match.player2_score += 1
+
+    winner = None
+    if match.player1_score >= ROUNDS_TO_WIN:
+        winner = match.player1
+    elif match.player2_score >= ROUNDS_TO_WIN:
+        winner = match.player2
+
+    if winner:
+        if not settle_match(match, winner):
+            # Settled or cancelled elsewhere in the meantime
+            match.refresh_from_db()
+            winner = match.winner if match.status == "finished" else None
+    else:
+        match.save(update_fields=["player1_score", "player2_score"])
+
+    return {
+        "round_result": result,
+        "player1_score": match.player1_score,
+        "player2_score": match.player2_score,
+        "match_finished": winner is not None,
+        "winner": winner.username if winner else None,
+    }
@@ -1,36 +1,334 @@
+import threading
 import time
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Abs
+from django.utils import timezone
+
+from game.models import MatchQueueEntry, Rating
 from game.services.match import enter_match
+from game.services.notifications import notify_match_found
 
-MATCH_QUEUES = defaultdict(list)
 QUEUE_TIMEOUT = 15  # seconds
+CLAIM_CANDIDATES = 20  # rows examined (and locked) per pairing attempt in the shared queue
+CLAIM_TTL = 2 * QUEUE_TIMEOUT  # seconds a created match waits to be picked up
+REAPER_INTERVAL = 5  # seconds between background sweeps of the in-memory queue
+
+DEFAULT_RATING = 1000
+RATING_BUCKET = 50  # width of one bucket of the in-memory rating index
+RATING_WINDOW_BASE = 100  # rating gap accepted straight away
+RATING_WINDOW_GROWTH = 25  # extra points accepted per second waited
+RATING_WINDOW_MAX = 400
+
+QueuedPlayer = namedtuple("QueuedPlayer", "user enqueued_at ip rating waiting_since")
+
+
+def rating_window(waited):
+    """Largest rating gap accepted once a pair has waited ``waited`` seconds."""
+    return min(RATING_WINDOW_MAX, RATING_WINDOW_BASE + RATING_WINDOW_GROWTH * waited)
+
+
+class InMemoryQueue:
+    """
+    Process-local queue. Only pairs players whose requests land on the same
+    worker, so it is meant for single-process deployments and local dev.
+
+    Each stake is indexed by rating bucket, and each bucket is an OrderedDict
+    keyed by user id in arrival order. A lookup only inspects the head of the
+    buckets inside the widest rating window, a re-poll removes its own entry
+    by key, and expired entries are only ever found at a bucket head.
+    """
+
+    def __init__(self, clock=time.time):
+        self.queues = defaultdict(dict)  # stake → bucket → user_id → QueuedPlayer
+        self.positions = {}  # user_id → (stake, bucket)
+        self.claimed = OrderedDict()  # user_id → (Match or None while it is being created, claim time)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def _remove(self, user_id):
+        position = self.positions.pop(user_id, None)
+        if position is None:
+            return None, None
+        stake, bucket_key = position
+        buckets = self.queues[stake]
+        entry = buckets[bucket_key].pop(user_id)
+        if not buckets[bucket_key]:
+            del buckets[bucket_key]
+        return stake, entry
+
+    def _expire_head(self, buckets, bucket_key, now):
+        bucket = buckets[bucket_key]
+        while bucket:
+            user_id, entry = next(iter(bucket.items()))
+            if now - entry.enqueued_at < QUEUE_TIMEOUT:
+                break
+            bucket.popitem(last=False)
+            del self.positions[user_id]
+        if not bucket:
+            del buckets[bucket_key]
+
+    def _expire_claims(self, now):
+        while self.claimed:
+            _, claimed_at = next(iter(self.claimed.values()))
+            if now - claimed_at < CLAIM_TTL:
+                break
+            self.claimed.popitem(last=False)
+
+    def _find_opponent(self, buckets, rating, waited, now):
+        """Closest-rated bucket head inside the pair's rating window."""
+        home = rating // RATING_BUCKET
+        best, best_gap = None, None
+        for offset in range(RATING_WINDOW_MAX // RATING_BUCKET + 2):
+            if best is not None and (offset - 1) * RATING_BUCKET >= best_gap:
+                break
+            for bucket_key in {home - offset, home + offset}:
+                if bucket_key not in buckets:
+                    continue
+                self._expire_head(buckets, bucket_key, now)
+                if bucket_key not in buckets:
+                    continue
+                head = next(iter(buckets[bucket_key].values()))
+                gap = abs(head.rating - rating)
+                window = rating_window(max(waited, now - head.waiting_since))
+                if gap <= window and (best is None or gap < best_gap):
+                    best, best_gap = head, gap
+        return best
+
+    def pair_or_enqueue(self, user, stake, ip_address=None, rating=DEFAULT_RATING):
+        """
+        Claim the closest-rated waiting opponent at this stake, or park ``user``.
+        Returns ``(opponent, opponent_ip)`` or None.
+        """
+        now = self.clock()
+        with self._lock:
+            claim = self.claimed.get(user.id)
+            if claim and now - claim[1] < CLAIM_TTL:
+                return None
+            self.claimed.pop(user.id, None)
+
+            # Our own entry from the previous poll keeps its place in the rating window
+            previous_stake, previous = self._remove(user.id)
+            waiting_since = now
+            if previous and previous_stake == stake and now - previous.enqueued_at < QUEUE_TIMEOUT:
+                waiting_since = previous.waiting_since
+
+            buckets = self.queues[stake]
+            opponent = self._find_opponent(buckets, rating, now - waiting_since, now)
+            if opponent:
+                self._remove(opponent.user.id)
+                self.claimed[opponent.user.id] = (None, now)
+                return opponent.user, opponent.ip
+
+            self._park(QueuedPlayer(user, now, ip_address, rating, waiting_since), stake)
+
+        return None
+
+    def _park(self, entry, stake):
+        bucket_key = entry.rating // RATING_BUCKET
+        self.queues[stake].setdefault(bucket_key, OrderedDict())[entry.user.id] = entry
+        self.positions[entry.user.id] = (stake, bucket_key)
+
+    def leave(self, user):
+        with self._lock:
+            self._remove(user.id)
+
+    def set_match(self, user, match):
+        with self._lock:
+            self.claimed.pop(user.id, None)
+            self.claimed[user.id] = (match, self.clock())
+
+    def release(self, user):
+        with self._lock:
+            self.claimed.pop(user.id, None)
+
+    def pop_match(self, user):
+        """Match created for ``user`` while it was parked, if any."""
+        with self._lock:
+            match, claimed_at = self.claimed.get(user.id, (None, 0))
+            if match is None or self.clock() - claimed_at >= CLAIM_TTL:
+                return None
+            del self.claimed[user.id]
+            return match
+
+    def reap(self):
+        """Drop expired entries from every queue. Returns how many were removed."""
+        now = self.clock()
+        with self._lock:
+            before = len(self.positions) + len(self.claimed)
+            for buckets in self.queues.values():
+                for bucket_key in list(buckets):
+                    self._expire_head(buckets, bucket_key, now)
+            self._expire_claims(now)
+            return before - len(self.positions) - len(self.claimed)
+
+    def start_reaper(self, interval=REAPER_INTERVAL):
+        """Reap in a daemon thread so idle stakes do not hold expired players."""
+        if self._reaper is not None:
+            return
 
+        def run():
+            while True:
+                time.sleep(interval)
+                self.reap()
 
-def enqueue_player(user, stake, ip_address=None):
-    queue = MATCH_QUEUES[stake]
+        self._reaper = threading.Thread(target=run, name="matchmaking-reaper", daemon=True)
+        self._reaper.start()
 
-    # Remove expired players
-    now = time.time()
-    queue[:] = [q for q in queue if now - q["time"] < QUEUE_TIMEOUT]
 
-    # Try to match
-    for q in queue:
-        opponent = q["user"]
-        player1_ip = q.get("ip")
-        queue.remove(q)
-        return enter_match(
+class DatabaseQueue:
+    """
+    Queue stored in the ``MatchQueueEntry`` table, shared by every worker.
+
+    Candidates inside the widest rating window are read closest-first through
+    the (stake, claimed, rating) index, locked with ``FOR UPDATE SKIP LOCKED``
+    where the database supports it, and claimed with a conditional UPDATE on
+    ``claimed``. A parked player leaves the queue with a conditional DELETE
+    of its own unclaimed row, so exactly one of "opponent claims me" and
+    "I move on" wins, even on SQLite where row locks are not available.
+    """
+
+    def pair_or_enqueue(self, user, stake, ip_address=None, rating=DEFAULT_RATING):
+        now = timezone.now()
+        cutoff = now - timedelta(seconds=QUEUE_TIMEOUT)
+        claim_cutoff = now - timedelta(seconds=CLAIM_TTL)
+
+        with transaction.atomic():
+            MatchQueueEntry.objects.filter(
+                stake=stake, claimed=False, enqueued_at__lt=cutoff
+            ).delete()
+
+            waiting_since = now
+            own = MatchQueueEntry.objects.filter(user=user).first()
+            if own is not None:
+                left, _ = MatchQueueEntry.objects.filter(pk=own.pk).filter(
+                    Q(claimed=False) | Q(enqueued_at__lt=claim_cutoff)
+                ).delete()
+                if not left:
+                    # Someone paired with us; the match is picked up by pop_match
+                    return None
+                if not own.claimed and own.stake == stake and own.enqueued_at >= cutoff:
+                    waiting_since = own.waiting_since
+
+            candidates = MatchQueueEntry.objects.filter(
+                stake=stake,
+                claimed=False,
+                rating__range=(rating - RATING_WINDOW_MAX, rating + RATING_WINDOW_MAX),
+            ).exclude(user=user)
+            if connection.features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True, of=("self",))
+            candidates = (
+                candidates.select_related("user")
+                .annotate(gap=Abs(F("rating") - rating))
+                .order_by("gap", "waiting_since")
+            )
+
+            waited = (now - waiting_since).total_seconds()
+            for entry in candidates[:CLAIM_CANDIDATES]:
+                window = rating_window(max(waited, (now - entry.waiting_since).total_seconds()))
+                if entry.gap > window:
+                    continue
+                if MatchQueueEntry.objects.filter(pk=entry.pk, claimed=False).update(claimed=True):
+                    return entry.user, entry.ip_address
+
+            MatchQueueEntry.objects.create(
+                user=user,
+                stake=stake,
+                ip_address=ip_address,
+                rating=rating,
+                enqueued_at=now,
+                waiting_since=waiting_since,
+            )
+
+        return None
+
+    def leave(self, user):
+        MatchQueueEntry.objects.filter(user=user, claimed=False).delete()
+
+    def set_match(self, user, match):
+        MatchQueueEntry.objects.filter(user=user, claimed=True).update(match=match)
+
+    def release(self, user):
+        MatchQueueEntry.objects.filter(user=user, claimed=True).delete()
+
+    def pop_match(self, user):
+        claim_cutoff = timezone.now() - timedelta(seconds=CLAIM_TTL)
+        entry = (
+            MatchQueueEntry.objects.filter(
+                user=user, match__isnull=False, enqueued_at__gte=claim_cutoff
+            )
+            .select_related("match")
+            .first()
+        )
+        if entry is None:
+            return None
+        entry.delete()
+        return entry.match
+
+
+QUEUE_BACKENDS = {
+    "memory": InMemoryQueue,
+    "database": DatabaseQueue,
+}
+
+_queue = None
+
+
+def get_queue():
+    """Backend selected by ``settings.MATCHMAKING_BACKEND``, built once per process."""
+    global _queue
+    if _queue is None:
+        _queue = QUEUE_BACKENDS[settings.MATCHMAKING_BACKEND]()
+        if isinstance(_queue, InMemoryQueue):
+            _queue.start_reaper()
+    return _queue
+
+
+def enqueue_player(user, stake, ip_address=None, rating=None, queue=None):
+    """
+    Pair ``user`` with a waiting opponent of similar rating, or park them
+    until the next poll. The accepted rating gap widens the longer either
+    player has been waiting.
+    Returns the Match once the player has one, else None.
+    """
+    queue = queue or get_queue()
+
+    match = queue.pop_match(user)
+    if match:
+        return match
+
+    if rating is None:
+        rating = Rating.objects.filter(user=user).values_list("value", flat=True).first()
+    if rating is None:
+        rating = DEFAULT_RATING
+
+    paired = queue.pair_or_enqueue(user, stake, ip_address, rating)
+    if paired is None:
+        return None
+
+    opponent, player1_ip = paired
+    try:
+        match = enter_match(
             player1=opponent,
             player2=user,
             stake=stake,
             player1_ip=player1_ip,
             player2_ip=ip_address,
         )
+    except Exception:
+        queue.release(opponent)
+        raise
+
+    queue.set_match(opponent, match)
+    notify_match_found(match)
+    return match
 
-    # No match found → enqueue
-    queue.append({
-        "user": user,
-        "time": now,
-        "ip": ip_address,
-    })
 
-    return None
+def leave_queue(user, queue=None):
+    """Stop searching (a parked player cancelled or disconnected)."""
+    (queue or get_queue()).leave(user)
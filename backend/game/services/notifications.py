@@ -0,0 +1,26 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+def user_group(user_id):
+    """Channel-layer group every open socket of a user joins."""
+    return f"user_{user_id}"
+
+
+def match_group(match_id):
+    """Channel-layer group joined by both players' sockets for one match."""
+    return f"match_{match_id}"
+
+
+def notify_user(user_id, event_type, **data):
+    """Push an event to the user's open sockets. No-op without a channel layer."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    async_to_sync(layer.group_send)(user_group(user_id), {"type": event_type, **data})
+
+
+def notify_match_found(match):
+    """Tell both players a match was created so parked clients stop waiting."""
+    for user_id in (match.player1_id, match.player2_id):
+        notify_user(user_id, "match.found", match_id=match.id)
@@ -1,33 +1,37 @@
 from django.db import transaction
-from game.models import Transaction, PlatformRevenue
+from django.db.models import F
+from game.models import User, Transaction, PlatformRevenue
+from game.services.user_cache import invalidate_users
 
 
 RAKE_PERCENT = 0.10  # 10% house fee
 
 
-def payout_match(winner, stake, match=None):
+def split_pot(stake):
     """
-    Pay winner from pot minus 10% rake.
-    pot = stake * 2, rake = 10%, winner gets 90%.
+    Split the pot of a match between the house and the winner.
+    pot = stake * 2, rake = 10%, winner gets 90%. Returns (rake, winner_reward).
     """
     pot = stake * 2
     rake = int(pot * RAKE_PERCENT)
-    winner_reward = pot - rake
+    return rake, pot - rake
 
-    with transaction.atomic():
-        winner.coins += winner_reward
-        winner.save()
 
-        Transaction.objects.create(
-            user=winner,
-            amount=winner_reward,
-            type="win",
-        )
+def payout_match(winner, stake, match=None):
+    """
+    Pay winner from pot minus 10% rake.
+    """
+    rake, winner_reward = split_pot(stake)
+
+    with transaction.atomic():
+        User.objects.filter(pk=winner.pk).update(coins=F("coins") + winner_reward)
 
-        Transaction.objects.create(
-            user=winner,
-            amount=-rake,
-            type="commission",
-        )
+        Transaction.objects.bulk_create([
+            Transaction(user=winner, amount=winner_reward, type="win"),
+            Transaction(user=winner, amount=-rake, type="commission"),
+        ])
 
         PlatformRevenue.objects.create(amount=rake, match=match)
+        invalidate_users(winner.pk)
+
+    winner.refresh_from_db(fields=["coins"])
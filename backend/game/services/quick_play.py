@@ -0,0 +1,123 @@
+import random
+
+from django.db import transaction
+from django.db.models import F
+
+from game.models import PlatformRevenue, Rating, Transaction, User
+from game.services.leaderboard import rating_saved
+from game.services.payout import split_pot
+from game.services.rating_service import expected_score
+from game.services.rps_engine import decide_round_winner
+from game.services.user_cache import invalidate_users
+
+# Stake options (fixed values only, Phase 1)
+STAKE_OPTIONS = [50, 100, 200]
+AI_OPPONENT_RATING = 1000
+K_FACTOR = 32
+
+MAX_BATCH_ROUNDS = 100  # moves accepted by one auto-play request
+BATCH_ATTEMPTS = 3  # re-reads of the balance when it moved under a batch
+
+
+def play_ai_round(move):
+    """Play one round against a random AI move. Returns (opponent_move, "win" | "lose" | "draw")."""
+    opponent_move = random.choice(["rock", "paper", "scissors"])
+    result = decide_round_winner(move, opponent_move)
+
+    # Map internal result to frontend format
+    result_map = {"player1": "win", "player2": "lose", "draw": "draw"}
+    return opponent_move, result_map.get(result, "draw")
+
+
+def rating_after_ai_round(old_rating, result_str):
+    """Elo update vs the fixed-rating AI. Returns (delta, new rating)."""
+    expected = expected_score(old_rating, AI_OPPONENT_RATING)
+    actual = 1 if result_str == "win" else (0.5 if result_str == "draw" else 0)
+    rating_delta = int(K_FACTOR * (actual - expected))
+    return rating_delta, max(0, old_rating + rating_delta)
+
+
+def apply_ai_round(rating, result_str):
+    """Apply one round's Elo change to an unsaved Rating, ``quick_play_delta`` included. Returns the delta."""
+    old_rating = rating.value
+    rating_delta, rating.value = rating_after_ai_round(old_rating, result_str)
+    rating.quick_play_delta += rating.value - old_rating
+    return rating_delta
+
+
+def _settle(played, balance, stake):
+    """
+    Coins side of rounds played in order from ``balance``, stopping at the
+    first round the balance cannot cover. Returns (rounds settled, lowest
+    starting balance that covers them, net coin delta).
+    """
+    _, winner_reward = split_pot(stake)
+    settled, required, net = 0, 0, 0
+    for _, _, result_str in played:
+        if balance + net < stake:
+            break
+        required = max(required, stake - net)
+        net += winner_reward - stake if result_str == "win" else -stake
+        settled += 1
+    return settled, required, net
+
+
+def play_batch(user, moves, stake):
+    """
+    Auto-play: one quick-play round per move, resolved in memory and written
+    in one transaction (a conditional balance UPDATE, the ledger rows in bulk
+    and one rating write). The ledger is the one the rounds would have left
+    one request at a time; play stops at the first round the balance cannot
+    cover. Returns the per-round results; ``user`` ends up with the new balance.
+    """
+    played = [(move, *play_ai_round(move)) for move in moves]
+    rake, winner_reward = split_pot(stake)
+
+    for _ in range(BATCH_ATTEMPTS):
+        settled, required, net = _settle(played, user.coins, stake)
+        if not settled:
+            return []
+        rounds = played[:settled]
+
+        with transaction.atomic():
+            # Every round still finds its stake as long as the balance covers the worst dip
+            updated = User.objects.filter(pk=user.pk, coins__gte=required).update(coins=F("coins") + net)
+            if not updated:
+                user.refresh_from_db(fields=["coins"])
+                continue
+
+            ledger, revenue = [], []
+            for _, _, result_str in rounds:
+                ledger.append(Transaction(user=user, amount=-stake, type="stake"))
+                if result_str == "win":
+                    ledger.append(Transaction(user=user, amount=winner_reward, type="win"))
+                    ledger.append(Transaction(user=user, amount=-rake, type="commission"))
+                    revenue.append(PlatformRevenue(amount=rake))
+            Transaction.objects.bulk_create(ledger)
+            PlatformRevenue.objects.bulk_create(revenue)
+
+            rating_obj, _ = Rating.objects.get_or_create(user=user, defaults={"value": 1000})
+            results = []
+            for move, opponent_move, result_str in rounds:
+                rating_delta = apply_ai_round(rating_obj, result_str)
+                results.append({
+                    "player_move": move,
+                    "opponent_move": opponent_move,
+                    "result": result_str,
+                    # As in the single-round response: the payout on a win, the stake otherwise
+                    "coins_delta": winner_reward if result_str == "win" else -stake,
+                    "rating_delta": rating_delta,
+                    "new_rating": rating_obj.value,
+                })
+            rating_obj.save(update_fields=["value", "quick_play_delta", "updated_at"])
+            rating_saved(rating_obj)
+            invalidate_users(user.pk)
+
+        user.refresh_from_db(fields=["coins"])
+        balance = user.coins - net
+        for result in results:
+            balance += result["coins_delta"] - (stake if result["result"] == "win" else 0)
+            result["new_balance"] = balance
+        return results
+
+    raise ValueError("Balance changed too often, try again")
@@ -0,0 +1,165 @@
+import math
+import threading
+import time
+from collections import deque, namedtuple
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+RateLimit = namedtuple("RateLimit", "limit period message")
+
+# Per-endpoint policies: at most `limit` requests per user in any `period` seconds
+RATE_LIMITS = {
+    "find_match": RateLimit(60, 60, "Too many matchmaking requests. Slow down."),
+    # Replaces the old "max 10 matches per minute" check; a match is several moves
+    "submit_move": RateLimit(60, 60, "Too many matches. Slow down."),
+    "quick_play": RateLimit(60, 60, "Too many games. Slow down."),
+    # Up to MAX_BATCH_ROUNDS rounds each
+    "quick_play_batch": RateLimit(10, 60, "Too many games. Slow down."),
+    "request_withdrawal": RateLimit(5, 60 * 60, "Too many withdrawal requests. Try again later."),
+}
+
+PURGE_THRESHOLD = 10_000  # tracked keys before the in-memory limiter drops idle ones
+
+
+class InMemoryRateLimiter:
+    """
+    Sliding-window log per key in process memory: exact, but each worker
+    counts on its own, so the effective limit is per worker.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        # key → (period, deque of request timestamps inside the window)
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, period):
+        """Record a request. Returns 0 if allowed, else seconds until it would be."""
+        now = self.clock()
+        with self._lock:
+            if len(self.windows) > PURGE_THRESHOLD:
+                self._purge(now)
+            _, window = self.windows.setdefault(key, (period, deque()))
+            while window and window[0] <= now - period:
+                window.popleft()
+            if len(window) >= limit:
+                return window[0] + period - now
+            window.append(now)
+            return 0
+
+    async def ahit(self, key, limit, period):
+        return self.hit(key, limit, period)
+
+    def _purge(self, now):
+        idle = [
+            key for key, (period, window) in self.windows.items()
+            if not window or window[-1] <= now - period
+        ]
+        for key in idle:
+            del self.windows[key]
+
+
+class CacheRateLimiter:
+    """
+    Sliding-window counter in the Django cache (Redis when REDIS_URL is
+    set), shared by every worker. The previous fixed window is weighted by
+    how much of it still overlaps the sliding window, so one request costs
+    a get_many and an incr.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+
+    def hit(self, key, limit, period):
+        now = self.clock()
+        index = int(now // period)
+        current_key, previous_key = f"rl:{key}:{index}", f"rl:{key}:{index - 1}"
+        counts = cache.get_many([current_key, previous_key])
+
+        overlap = 1 - (now % period) / period
+        used = counts.get(previous_key, 0) * overlap + counts.get(current_key, 0)
+        if used >= limit:
+            return (index + 1) * period - now
+
+        if not cache.add(current_key, 1, timeout=2 * period):
+            try:
+                cache.incr(current_key)
+            except ValueError:
+                # Expired between add and incr
+                cache.set(current_key, 1, timeout=2 * period)
+        return 0
+
+    async def ahit(self, key, limit, period):
+        now = self.clock()
+        index = int(now // period)
+        current_key, previous_key = f"rl:{key}:{index}", f"rl:{key}:{index - 1}"
+        counts = await cache.aget_many([current_key, previous_key])
+
+        overlap = 1 - (now % period) / period
+        used = counts.get(previous_key, 0) * overlap + counts.get(current_key, 0)
+        if used >= limit:
+            return (index + 1) * period - now
+
+        if not await cache.aadd(current_key, 1, timeout=2 * period):
+            try:
+                await cache.aincr(current_key)
+            except ValueError:
+                await cache.aset(current_key, 1, timeout=2 * period)
+        return 0
+
+
+LIMITER_BACKENDS = {
+    "memory": InMemoryRateLimiter,
+    "cache": CacheRateLimiter,
+}
+
+_limiter = None
+
+
+def get_limiter():
+    """Backend selected by ``settings.RATE_LIMIT_BACKEND``, built once per process."""
+    global _limiter
+    if _limiter is None:
+        _limiter = LIMITER_BACKENDS[settings.RATE_LIMIT_BACKEND]()
+    return _limiter
+
+
+def rate_limit(policy):
+    """
+    Limit a view per authenticated user under ``RATE_LIMITS[policy]``.
+    Apply below ``jwt_required``; over the limit the view answers 429 with
+    a Retry-After header.
+    """
+    limit, period, message = RATE_LIMITS[policy]
+
+    def too_many(retry_after):
+        response = JsonResponse({"error": message}, status=429)
+        response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                retry_after = await get_limiter().ahit(f"{policy}:{request.user.pk}", limit, period)
+                if retry_after:
+                    return too_many(retry_after)
+                return await view_func(request, *args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            retry_after = get_limiter().hit(f"{policy}:{request.user.pk}", limit, period)
+            if retry_after:
+                return too_many(retry_after)
+            return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
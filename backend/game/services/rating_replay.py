@@ -0,0 +1,137 @@
+"""
+Rebuild ratings from history, e.g. after changing K_FACTOR or fixing
+update_elo. Rated PvP matches (the ones settle_match applied Elo to) are
+streamed in the order they were played and replayed through elo_delta
+against a compact array of ratings indexed by user id, so memory grows
+with the number of users, not matches. The anti-farm rule is applied as
+settlement applies it: each pair's matches are numbered by the database in
+creation order, cancelled ones included, since PairStats counts those too.
+
+Quick-play rounds against the AI leave no history that can be replayed (a
+draw and a loss write the same ledger rows), so each Rating keeps their net
+effect in ``quick_play_delta`` and the rebuilt rating is the replayed PvP
+rating plus that offset. For players who mixed both, the replay's Elo is
+computed without the quick-play part, so the result is close to but not
+exactly the live rating.
+"""
+
+from array import array
+
+from django.db import transaction
+from django.db.models import F, Max, Window
+from django.db.models.functions import Greatest, Least, RowNumber
+from django.utils import timezone
+
+from game.models import Match, Rating, User
+from game.services.anti_farm import gains_allowed
+from game.services.rating_service import INITIAL_RATING, K_FACTOR, elo_delta
+
+REPLAY_CHUNK_SIZE = 10_000  # matches fetched per round trip
+WRITE_BATCH_SIZE = 1_000  # ratings read / written per query
+PROGRESS_EVERY = 1_000_000
+
+
+def replay_history(k=K_FACTOR, initial=INITIAL_RATING, chunk_size=REPLAY_CHUNK_SIZE, progress=None):
+    """
+    Replay every rated match in ``created_at`` order. Returns (ratings,
+    played, games): ``ratings[user_id]`` is the rebuilt PvP rating and
+    ``played[user_id]`` is 1 for users that took part in a replayed game.
+    ``progress(games)`` is called after every PROGRESS_EVERY matches.
+    """
+    size = (User.objects.aggregate(top=Max("id"))["top"] or 0) + 1
+    ratings = array("i", [initial]) * size
+    played = bytearray(size)
+
+    pair = [Least("player1_id", "player2_id"), Greatest("player1_id", "player2_id")]
+    rows = (
+        Match.objects.annotate(
+            pair_match_number=Window(RowNumber(), partition_by=pair, order_by=[F("created_at").asc(), F("id").asc()])
+        )
+        .order_by("created_at", "id")
+        .values_list("player1_id", "player2_id", "winner_id", "rated", "pair_match_number")
+        .iterator(chunk_size=chunk_size)
+    )
+    games = 0
+    for player1_id, player2_id, winner_id, rated, pair_match_number in rows:
+        if not rated or winner_id is None:
+            continue
+        loser_id = player2_id if winner_id == player1_id else player1_id
+        winner_delta, loser_delta = elo_delta(
+            ratings[winner_id], ratings[loser_id], k, winner_gains=gains_allowed(pair_match_number)
+        )
+        ratings[winner_id] += winner_delta
+        ratings[loser_id] += loser_delta
+        played[winner_id] = played[loser_id] = 1
+
+        games += 1
+        if progress and games % PROGRESS_EVERY == 0:
+            progress(games)
+    return ratings, played, games
+
+
+def _batches(played, batch_size):
+    batch = []
+    user_id = played.find(1)
+    while user_id != -1:
+        batch.append(user_id)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+        user_id = played.find(1, user_id + 1)
+    if batch:
+        yield batch
+
+
+def apply_ratings(ratings, played, initial=INITIAL_RATING, batch_size=WRITE_BATCH_SIZE, dry_run=False, on_change=None):
+    """
+    Compare the rebuilt ratings (replayed PvP rating plus each row's
+    ``quick_play_delta``) with the stored ones and, unless ``dry_run``,
+    write them back in one transaction: bulk_update over every Rating row,
+    and bulk_create for players of a replayed game without one.
+    ``on_change(user_id, old, new)`` is called for every rating that
+    changes, with ``old`` None for a missing row. Returns (ratings updated,
+    ratings created).
+    """
+    updated = created = 0
+    now = timezone.now()
+    unseen = bytearray(played)  # replayed players not met among the stored rows yet
+    with transaction.atomic():
+        last_pk = 0
+        while True:
+            stored = list(
+                Rating.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("id", "user_id", "value", "quick_play_delta")[:batch_size]
+            )
+            if not stored:
+                break
+            last_pk = stored[-1].pk
+
+            changed = []
+            for rating in stored:
+                user_id = rating.user_id
+                # Users who signed up after the replay started have no PvP games in it
+                replayed = ratings[user_id] if user_id < len(ratings) else initial
+                if user_id < len(unseen):
+                    unseen[user_id] = 0
+                new = replayed + rating.quick_play_delta
+                if rating.value == new:
+                    continue
+                if on_change:
+                    on_change(user_id, rating.value, new)
+                rating.value, rating.updated_at = new, now
+                changed.append(rating)
+
+            updated += len(changed)
+            if not dry_run:
+                Rating.objects.bulk_update(changed, ["value", "updated_at"], batch_size=batch_size)
+
+        for user_ids in _batches(unseen, batch_size):
+            missing = [Rating(user_id=user_id, value=ratings[user_id]) for user_id in user_ids]
+            if on_change:
+                for rating in missing:
+                    on_change(rating.user_id, None, rating.value)
+            created += len(missing)
+            if not dry_run:
+                Rating.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+    return updated, created
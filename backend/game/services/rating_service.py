@@ -1,19 +1,82 @@
-import math
+import numpy as np
+from django.utils import timezone
+
 from game.models import Rating
+from game.services.leaderboard import rating_saved
 
 K_FACTOR = 32
+INITIAL_RATING = 1000  # Rating.value default
 
 
 def expected_score(rating_a, rating_b):
-    return 1 / (1 + math.pow(10, (rating_b - rating_a) / 400))
+    return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+
+
+def elo_delta(winner_value, loser_value, k=K_FACTOR, winner_gains=True):
+    """
+    Rating changes (winner, loser) for one decided game. With
+    ``winner_gains`` False (anti-farm) the winner gets nothing; the loser
+    still loses.
+    """
+    expected_winner = 1 / (1 + 10 ** ((loser_value - winner_value) / 400))
+    expected_loser = 1 / (1 + 10 ** ((winner_value - loser_value) / 400))
+    return int(k * (1 - expected_winner)) if winner_gains else 0, int(k * (0 - expected_loser))
+
+
+def expected_scores(ratings_a, ratings_b):
+    """``expected_score`` over arrays of ratings."""
+    diff = np.asarray(ratings_b, dtype=np.float64) - np.asarray(ratings_a, dtype=np.float64)
+    return 1 / (1 + np.power(10.0, diff / 400))
+
+
+def elo_deltas(winner_values, loser_values, k=K_FACTOR):
+    """``elo_delta`` over arrays of ratings: int64 arrays (winner deltas, loser deltas)."""
+    expected_winner = expected_scores(winner_values, loser_values)
+    expected_loser = expected_scores(loser_values, winner_values)
+    # Truncate towards zero like int()
+    return (
+        np.trunc(k * (1 - expected_winner)).astype(np.int64),
+        np.trunc(k * (0 - expected_loser)).astype(np.int64),
+    )
 
 
 def update_elo(winner_rating, loser_rating):
-    expected_winner = expected_score(winner_rating.value, loser_rating.value)
-    expected_loser = expected_score(loser_rating.value, winner_rating.value)
+    winner_delta, loser_delta = elo_delta(winner_rating.value, loser_rating.value)
 
-    winner_rating.value += int(K_FACTOR * (1 - expected_winner))
-    loser_rating.value += int(K_FACTOR * (0 - expected_loser))
+    winner_rating.value += winner_delta
+    loser_rating.value += loser_delta
 
     winner_rating.save()
     loser_rating.save()
+    rating_saved(winner_rating, loser_rating)
+
+
+def rate_pvp_game(winner_id, loser_id, winner_gains=True):
+    """
+    Elo update for a settled PvP match, inside the caller's transaction: both
+    Rating rows are read (locked where the database supports it), missing
+    ones are created at INITIAL_RATING, and both are written back in one
+    UPDATE. ``winner_gains`` is the anti-farm verdict. Returns (winner
+    delta, loser delta).
+    """
+    def locked():
+        rows = Rating.objects.select_for_update().filter(user_id__in=[winner_id, loser_id])
+        return {rating.user_id: rating for rating in rows}
+
+    ratings = locked()
+    if len(ratings) < 2:
+        # A player's first rated game; another settlement may be creating the row too
+        Rating.objects.bulk_create(
+            [Rating(user_id=user_id, value=INITIAL_RATING) for user_id in (winner_id, loser_id)],
+            ignore_conflicts=True,
+        )
+        ratings = locked()
+
+    winner_rating, loser_rating = ratings[winner_id], ratings[loser_id]
+    winner_delta, loser_delta = elo_delta(winner_rating.value, loser_rating.value, winner_gains=winner_gains)
+    winner_rating.value += winner_delta
+    loser_rating.value += loser_delta
+    winner_rating.updated_at = loser_rating.updated_at = timezone.now()
+    Rating.objects.bulk_update([winner_rating, loser_rating], ["value", "updated_at"])
+    rating_saved(winner_rating, loser_rating)
+    return winner_delta, loser_delta
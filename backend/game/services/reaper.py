@@ -0,0 +1,92 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from game.models import Match, Transaction, User
+from game.services.round_state import purge_expired_rounds
+from game.services.user_cache import invalidate_users
+
+STUCK_MATCH_TIMEOUT = 10 * 60  # seconds an active match may run before it is cancelled
+REAP_BATCH_SIZE = 500
+
+
+class _Settled(Exception):
+    """A match of the batch stopped being active after it was selected."""
+
+
+def _cancel_active(batch):
+    """
+    Cancel the matches of ``batch`` that are still active and return those.
+    Where the select could not lock them, settle_match may have finished
+    one since; such a match must be neither cancelled nor refunded.
+    """
+    try:
+        with transaction.atomic():
+            cancelled = Match.objects.filter(id__in=[m.id for m in batch], status="active").update(
+                status="cancelled"
+            )
+            if cancelled != len(batch):
+                raise _Settled
+        return batch
+    except _Settled:
+        # Rare: find out which ones, one guarded UPDATE each
+        return [
+            match for match in batch
+            if Match.objects.filter(pk=match.id, status="active").update(status="cancelled")
+        ]
+
+
+def refund_stuck_matches(timeout=STUCK_MATCH_TIMEOUT, batch_size=REAP_BATCH_SIZE):
+    """
+    Cancel matches still active after ``timeout`` seconds and give both
+    players their stake back. Each batch is one transaction: a status UPDATE,
+    one balance UPDATE for every refunded user and a bulk insert of the
+    refund ledger rows. Returns the number of matches cancelled.
+    """
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    total = 0
+
+    while True:
+        with transaction.atomic():
+            stuck = Match.objects.filter(status="active", created_at__lt=cutoff)
+            if connection.features.has_select_for_update_skip_locked:
+                # Leave matches another worker is settling right now alone
+                stuck = stuck.select_for_update(skip_locked=True)
+            batch = list(stuck.only("id", "player1_id", "player2_id", "stake")[:batch_size])
+            if not batch:
+                return total
+
+            batch = _cancel_active(batch)
+            if not batch:
+                continue
+
+            refunds = Counter()
+            for match in batch:
+                refunds[match.player1_id] += match.stake
+                refunds[match.player2_id] += match.stake
+
+            User.objects.filter(id__in=refunds).update(
+                coins=F("coins") + Case(
+                    *[When(id=user_id, then=Value(amount)) for user_id, amount in refunds.items()],
+                    output_field=IntegerField(),
+                )
+            )
+            Transaction.objects.bulk_create(
+                Transaction(user_id=user_id, amount=match.stake, type="refund")
+                for match in batch
+                for user_id in (match.player1_id, match.player2_id)
+            )
+            invalidate_users(*refunds)
+
+        total += len(batch)
+
+
+def sweep(match_timeout=STUCK_MATCH_TIMEOUT, batch_size=REAP_BATCH_SIZE):
+    """One reaper pass. Returns how many rounds and matches it processed."""
+    return {
+        "rounds": purge_expired_rounds(),
+        "matches": refund_stuck_matches(match_timeout, batch_size),
+    }
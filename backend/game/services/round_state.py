@@ -1,28 +1,182 @@
+import threading
 import time
+from datetime import timedelta
 
-# match_id → round data
-ACTIVE_ROUNDS = {}
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from game.models import ActiveRound, RoundMove
+
+ROUND_STATE_TTL = 60  # seconds before an abandoned round is dropped
+REAPER_INTERVAL = 30  # seconds between background sweeps of the in-memory store
+
+
+class InMemoryRoundStore:
+    """
+    Process-local round state. Both players' moves must reach the same
+    worker, so it is meant for single-process deployments and local dev.
+    """
+
+    def __init__(self):
+        # match_id → round data
+        self.rounds = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def _live(self, match_id, now):
+        round_data = self.rounds.get(match_id)
+        if round_data and now - round_data["start_time"] >= ROUND_STATE_TTL:
+            del self.rounds[match_id]
+            return None
+        return round_data
+
+    def start_round(self, match_id):
+        now = time.time()
+        with self._lock:
+            round_data = self._live(match_id, now)
+            if round_data is None:
+                round_data = self.rounds[match_id] = {"start_time": now, "moves": {}}
+            return {"start_time": round_data["start_time"], "moves": dict(round_data["moves"])}
+
+    def submit_move(self, match_id, user_id, move):
+        with self._lock:
+            round_data = self._live(match_id, time.time())
+            if round_data is None:
+                return None
+            round_data["moves"].setdefault(user_id, move)
+            return dict(round_data["moves"])
+
+    def get_round(self, match_id):
+        with self._lock:
+            round_data = self._live(match_id, time.time())
+            if round_data is None:
+                return None
+            return {"start_time": round_data["start_time"], "moves": dict(round_data["moves"])}
+
+    def end_round(self, match_id):
+        with self._lock:
+            return self.rounds.pop(match_id, None) is not None
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                match_id for match_id, round_data in self.rounds.items()
+                if now - round_data["start_time"] >= ROUND_STATE_TTL
+            ]
+            for match_id in expired:
+                del self.rounds[match_id]
+        return len(expired)
+
+    def start_reaper(self, interval=REAPER_INTERVAL):
+        """Purge in a daemon thread; rounds nobody touches again never expire on access."""
+        if self._reaper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.purge_expired()
+
+        self._reaper = threading.Thread(target=run, name="round-state-reaper", daemon=True)
+        self._reaper.start()
+
+
+class DatabaseRoundStore:
+    """
+    Round state in the ``ActiveRound`` / ``RoundMove`` tables, shared by every
+    worker and kept across restarts. Each move is its own row under a unique
+    (round, user) constraint, so two workers recording moves for the same
+    match at once can neither lose nor overwrite each other's move.
+    """
+
+    def _moves(self, match_id):
+        return dict(RoundMove.objects.filter(round_id=match_id).values_list("user_id", "move"))
+
+    def start_round(self, match_id):
+        now = timezone.now()
+        # Both statements are safe to race: only an expired round is replaced,
+        # and get_or_create falls back to reading the row the other worker made.
+        ActiveRound.objects.filter(pk=match_id, expires_at__lte=now).delete()
+        active_round, _ = ActiveRound.objects.get_or_create(
+            match_id=match_id,
+            defaults={
+                "started_at": now,
+                "expires_at": now + timedelta(seconds=ROUND_STATE_TTL),
+            },
+        )
+        return {"start_time": active_round.started_at.timestamp(), "moves": self._moves(match_id)}
+
+    def submit_move(self, match_id, user_id, move):
+        if not ActiveRound.objects.filter(pk=match_id, expires_at__gt=timezone.now()).exists():
+            return None
+        try:
+            # ignore_conflicts covers a second move by the same player; the
+            # round's foreign key is only checked when this commits
+            with transaction.atomic():
+                RoundMove.objects.bulk_create(
+                    [RoundMove(round_id=match_id, user_id=user_id, move=move)],
+                    ignore_conflicts=True,
+                )
+        except IntegrityError:
+            # The round ended (end_round, purge_expired) since the check above
+            return None
+        return self._moves(match_id)
+
+    def get_round(self, match_id):
+        active_round = ActiveRound.objects.filter(pk=match_id, expires_at__gt=timezone.now()).first()
+        if active_round is None:
+            return None
+        return {"start_time": active_round.started_at.timestamp(), "moves": self._moves(match_id)}
+
+    def end_round(self, match_id):
+        deleted, _ = ActiveRound.objects.filter(pk=match_id).delete()
+        return deleted > 0
+
+    def purge_expired(self):
+        return ActiveRound.objects.filter(expires_at__lte=timezone.now()).delete()[1].get(
+            ActiveRound._meta.label, 0
+        )
+
+
+STORE_BACKENDS = {
+    "memory": InMemoryRoundStore,
+    "database": DatabaseRoundStore,
+}
+
+_store = None
+
+
+def get_store():
+    """Backend selected by ``settings.ROUND_STATE_BACKEND``, built once per process."""
+    global _store
+    if _store is None:
+        _store = STORE_BACKENDS[settings.ROUND_STATE_BACKEND]()
+        if isinstance(_store, InMemoryRoundStore):
+            _store.start_reaper()
+    return _store
 
 
 def start_round(match_id):
-    ACTIVE_ROUNDS[match_id] = {
-        "start_time": time.time(),
-        "moves": {}
-    }
+    """Start the match's round, or join the one already running. Returns the round."""
+    return get_store().start_round(match_id)
 
 
 def submit_move(match_id, user_id, move):
-    if match_id not in ACTIVE_ROUNDS:
-        return False
-
-    ACTIVE_ROUNDS[match_id]["moves"][user_id] = move
-    return True
+    """Record a player's first move. Returns all moves so far, or None without a live round."""
+    return get_store().submit_move(match_id, user_id, move)
 
 
 def get_round(match_id):
-    return ACTIVE_ROUNDS.get(match_id)
+    return get_store().get_round(match_id)
 
 
 def end_round(match_id):
-    if match_id in ACTIVE_ROUNDS:
-        del ACTIVE_ROUNDS[match_id]
+    """Close the round. Only the caller that actually removed it gets True."""
+    return get_store().end_round(match_id)
+
+
+def purge_expired_rounds():
+    """Drop rounds older than ROUND_STATE_TTL. Returns how many were removed."""
+    return get_store().purge_expired()
@@ -1,23 +1,60 @@
 import time
 
+import numpy as np
+
 VALID_MOVES = ["rock", "paper", "scissors"]
 ROUND_TIMEOUT = 2  # seconds
 ROUNDS_TO_WIN = 2
 
+# Integer move codes: the index into VALID_MOVES
+ROCK, PAPER, SCISSORS = range(3)
+MOVE_CODES = {move: code for code, move in enumerate(VALID_MOVES)}
+
+# Round result codes: the index into ROUND_RESULTS
+DRAW, PLAYER1, PLAYER2 = range(3)
+ROUND_RESULTS = ["draw", "player1", "player2"]
+
+# OUTCOMES[move1][move2]: result of a round for every pair of move codes
+OUTCOMES = (
+    # vs rock  vs paper  vs scissors
+    (DRAW, PLAYER2, PLAYER1),  # rock
+    (PLAYER1, DRAW, PLAYER2),  # paper
+    (PLAYER2, PLAYER1, DRAW),  # scissors
+)
+OUTCOME_TABLE = np.array(OUTCOMES, dtype=np.int8)
+# The same table keyed by move names, for one round at a time
+_ROUND_WINNERS = {
+    move1: {move2: ROUND_RESULTS[OUTCOMES[code1][code2]] for move2, code2 in MOVE_CODES.items()}
+    for move1, code1 in MOVE_CODES.items()
+}
+
 
 def validate_move(move: str):
     return move in VALID_MOVES
 
 
 def decide_round_winner(move1, move2):
-    if move1 == move2:
-        return "draw"
+    try:
+        return _ROUND_WINNERS[move1][move2]
+    except (KeyError, TypeError):
+        # Same answer as before for moves that were never validated
+        return "draw" if move1 == move2 else "player2"
+
+
+def encode_moves(moves):
+    """Move names to an int8 array of move codes. Raises ValueError on an unknown move."""
+    try:
+        return np.fromiter((MOVE_CODES[move] for move in moves), dtype=np.int8)
+    except KeyError as e:
+        raise ValueError(f"Invalid move: {e.args[0]}") from None
+
+
+def random_moves(count, rng=None):
+    """``count`` uniformly random move codes, e.g. for an AI opponent or a simulation."""
+    rng = rng or np.random.default_rng()
+    return rng.integers(0, len(VALID_MOVES), size=count, dtype=np.int8)
 
-    if (
-        (move1 == "rock" and move2 == "scissors") or
-        (move1 == "scissors" and move2 == "paper") or
-        (move1 == "paper" and move2 == "rock")
-    ):
-        return "player1"
 
-    return "player2"
+def decide_round_winners(moves1, moves2):
+    """Result codes (DRAW / PLAYER1 / PLAYER2) for arrays of move-code pairs, by table lookup."""
+    return OUTCOME_TABLE[np.asarray(moves1, dtype=np.intp), np.asarray(moves2, dtype=np.intp)]
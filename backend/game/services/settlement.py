@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models import F
+
+from game.models import Match, PlatformRevenue, Transaction, User
+from game.services.anti_farm import can_gain_rating
+from game.services.fraud import match_finished_event, publish
+from game.services.payout import split_pot
+from game.services.rating_service import rate_pvp_game
+from game.services.user_cache import invalidate_users
+
+
+def settle_match(match: Match, winner: User) -> bool:
+    """
+    Close a finished PvP match, pay the winner and update both ratings in
+    one transaction: a guarded UPDATE of the match, one balance UPDATE, one
+    bulk INSERT of the win and commission ledger rows, the rake row, and the
+    Elo update (the pair's anti-farm lookup, one read and one write of the
+    two ratings). Returns False (and writes nothing) if the match was no
+    longer active, so a match can only ever be settled once.
+    """
+    rake, winner_reward = split_pot(match.stake)
+    # Only the loser's id is needed, so don't load the row
+    loser = User(pk=match.player2_id if winner.pk == match.player1_id else match.player1_id)
+
+    with transaction.atomic():
+        closed = Match.objects.filter(pk=match.pk, status="active").update(
+            status="finished",
+            winner=winner,
+            player1_score=match.player1_score,
+            player2_score=match.player2_score,
+            rated=True,
+        )
+        if not closed:
+            return False
+
+        User.objects.filter(pk=winner.pk).update(coins=F("coins") + winner_reward)
+        Transaction.objects.bulk_create([
+            Transaction(user=winner, amount=winner_reward, type="win"),
+            Transaction(user=winner, amount=-rake, type="commission"),
+        ])
+        PlatformRevenue.objects.create(amount=rake, match=match)
+        rate_pvp_game(winner.pk, loser.pk, winner_gains=can_gain_rating(winner, loser))
+        publish(match_finished_event(match, winner))
+        invalidate_users(winner.pk)
+
+    match.status = "finished"
+    match.winner = winner
+    match.rated = True
+    return True
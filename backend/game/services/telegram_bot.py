@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 3  # seconds to open a connection to the Bot API
+READ_TIMEOUT = 5  # default seconds to wait for an answer; callers may pass their own
+MAX_RETRIES = 2  # extra attempts after a 429, a 5xx or a network error
+MAX_RETRY_AFTER = 5  # longest 429 retry_after we wait out inside a request
+BACKOFF = 0.2  # seconds before the first retry of a failure, doubled each time
+POOL_SIZE = 20
+
+BREAKER_THRESHOLD = 5  # consecutive failures that open the circuit
+BREAKER_RESET = 30  # seconds the circuit stays open before one trial call
+
+
+class TelegramAPIError(Exception):
+    """The Bot API could not be reached or kept failing."""
+
+
+class CircuitOpenError(TelegramAPIError):
+    """Calls are refused without trying because the Bot API has been failing."""
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After ``threshold`` consecutive failures it
+    opens and refuses calls for ``reset_timeout`` seconds, then lets a
+    single trial call through (half-open) which closes or re-opens it.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+class TelegramBotClient:
+    """
+    Bot API client with one pooled keep-alive connection set per process
+    (``requests.Session`` for sync code, an ``httpx.AsyncClient`` per event
+    loop for async code). ``call``/``acall`` return the decoded Bot API
+    response (``{"ok": ..., ...}``); 429s are retried after ``retry_after``,
+    5xx and network errors with backoff, and a circuit breaker fails fast
+    while Telegram is down.
+    """
+
+    def __init__(self, token=None, base_url=None, breaker=None, max_retries=MAX_RETRIES):
+        # Settings are read per call unless given, so overrides apply to the shared client
+        self.token = token
+        self.base_url = base_url
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def url(self, method):
+        token = self.token if self.token is not None else settings.TELEGRAM_BOT_TOKEN
+        return f"{self.base_url or settings.TELEGRAM_API_BASE_URL}/bot{token}/{method}"
+
+    def _retry_delay(self, attempt, data):
+        """Seconds to wait before retrying this answer, or None if it is final."""
+        if attempt >= self.max_retries or data is None:
+            return None
+        if data.get("error_code") == 429:
+            retry_after = (data.get("parameters") or {}).get("retry_after", 1)
+            return retry_after if retry_after <= MAX_RETRY_AFTER else None
+        return None
+
+    def call(self, method, payload, timeout=READ_TIMEOUT):
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Telegram {method}: circuit open")
+            try:
+                resp = self.session.post(self.url(method), json=payload, timeout=(CONNECT_TIMEOUT, timeout))
+                if resp.status_code >= 500:
+                    raise TelegramAPIError(f"Telegram {method}: HTTP {resp.status_code}")
+                data = resp.json()
+            except (requests.RequestException, ValueError, TelegramAPIError) as exc:
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise TelegramAPIError(f"Telegram {method} failed: {exc}") from exc
+                time.sleep(BACKOFF * 2 ** attempt)
+                continue
+
+            # Telegram answered: a 4xx is the caller's problem, not an outage
+            self.breaker.record_success()
+            delay = self._retry_delay(attempt, data)
+            if delay is None:
+                return data
+            logger.warning("Telegram %s rate limited, retrying in %ss", method, delay)
+            time.sleep(delay)
+
+    def _async_client(self):
+        # A client is bound to the loop it was first used on
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+            )
+        return client
+
+    async def acall(self, method, payload, timeout=READ_TIMEOUT):
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Telegram {method}: circuit open")
+            try:
+                resp = await self._async_client().post(
+                    self.url(method),
+                    json=payload,
+                    timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+                )
+                if resp.status_code >= 500:
+                    raise TelegramAPIError(f"Telegram {method}: HTTP {resp.status_code}")
+                data = resp.json()
+            except (httpx.HTTPError, ValueError, TelegramAPIError) as exc:
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise TelegramAPIError(f"Telegram {method} failed: {exc}") from exc
+                await asyncio.sleep(BACKOFF * 2 ** attempt)
+                continue
+
+            self.breaker.record_success()
+            delay = self._retry_delay(attempt, data)
+            if delay is None:
+                return data
+            logger.warning("Telegram %s rate limited, retrying in %ss", method, delay)
+            await asyncio.sleep(delay)
+
+
+_bot_client = None
+
+
+def get_bot_client():
+    """Client for the configured bot, built once per process."""
+    global _bot_client
+    if _bot_client is None:
+        _bot_client = TelegramBotClient()
+    return _bot_client
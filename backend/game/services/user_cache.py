@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from game.models import User
+
+USER_CACHE_SIZE = 10_000  # users kept per process; least recently used are dropped
+
+_FIELDS = [field.attname for field in User._meta.concrete_fields]
+
+
+def _row(user):
+    return tuple(getattr(user, name) for name in _FIELDS)
+
+
+def _build(row):
+    # A new instance per hit, so callers can mutate it without touching the cache
+    return User.from_db("default", _FIELDS, row)
+
+
+class UserCache:
+    """
+    Short-lived copies of User rows for jwt_required. Entries live
+    ``USER_CACHE_TTL`` seconds in a per-process LRU and, with
+    ``USER_CACHE_SHARED``, in the Django cache as a second level.
+    Invalidation clears this process and the shared level; other
+    processes' LRUs catch up within the TTL, which is why views that
+    move money ask for a fresh row.
+    """
+
+    def __init__(self, ttl, shared=False, size=USER_CACHE_SIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self.shared = shared
+        self.size = size
+        self.clock = clock
+        # user_id → (expires_at, row)
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+        # endpoint → {"hits", "misses", "fresh", "db_time"}
+        self.stats = defaultdict(lambda: {"hits": 0, "misses": 0, "fresh": 0, "db_time": 0.0})
+
+    def get(self, user_id, fresh=False, endpoint=None):
+        """The user with this id (a private copy), or None if there is none."""
+        if not fresh and self.ttl > 0:
+            row = self._get_local(user_id) or self._get_shared(user_id)
+            if row is not None:
+                with self._lock:
+                    self.stats[endpoint]["hits"] += 1
+                return _build(row)
+
+        start = time.perf_counter()
+        user = User.objects.filter(id=user_id).first()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stats = self.stats[endpoint]
+            stats["fresh" if fresh else "misses"] += 1
+            stats["db_time"] += elapsed
+
+        if user is not None and self.ttl > 0:
+            row = _row(user)
+            self._put_local(user_id, row)
+            if self.shared:
+                cache.set(f"user:{user_id}", row, timeout=self.ttl)
+        return user
+
+    async def aget(self, user_id, fresh=False, endpoint=None):
+        """``get`` for async code: only a local miss goes to a thread."""
+        if not fresh and self.ttl > 0:
+            row = self._get_local(user_id)
+            if row is not None:
+                with self._lock:
+                    self.stats[endpoint]["hits"] += 1
+                return _build(row)
+        return await sync_to_async(self.get)(user_id, fresh, endpoint)
+
+    def _get_local(self, user_id):
+        with self._lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, row = entry
+            if expires_at <= self.clock():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return row
+
+    def _get_shared(self, user_id):
+        if not self.shared:
+            return None
+        row = cache.get(f"user:{user_id}")
+        if row is not None:
+            self._put_local(user_id, row)
+        return row
+
+    def _put_local(self, user_id, row):
+        with self._lock:
+            self.entries[user_id] = (self.clock() + self.ttl, row)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self.entries.pop(user_id, None)
+        if self.shared:
+            cache.delete_many([f"user:{user_id}" for user_id in user_ids])
+
+    def report(self):
+        """Per-endpoint hit rate and the DB time the hits avoided (estimated from the misses)."""
+        with self._lock:
+            rows = {}
+            for endpoint, stats in self.stats.items():
+                loads = stats["misses"] + stats["fresh"]
+                per_load = stats["db_time"] / loads if loads else 0.0
+                lookups = stats["hits"] + stats["misses"]
+                rows[endpoint] = dict(
+                    stats,
+                    hit_rate=stats["hits"] / lookups if lookups else 0.0,
+                    saved=stats["hits"] * per_load,
+                )
+            return rows
+
+
+_user_cache = None
+
+
+def get_user_cache():
+    """Cache configured by ``settings.USER_CACHE_TTL`` / ``USER_CACHE_SHARED``, built once per process."""
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = UserCache(settings.USER_CACHE_TTL, settings.USER_CACHE_SHARED)
+    return _user_cache
+
+
+def invalidate_users(*user_ids):
+    """Drop cached copies of these users once the current transaction commits."""
+    transaction.on_commit(lambda: get_user_cache().invalidate(user_ids))
@@ -1,5 +1,13 @@
 from django.db import transaction
+from django.db.models import F
 from game.models import User, Transaction
+from game.services.user_cache import invalidate_users
+
+# Balance changes are single conditional UPDATEs (``coins = coins - X WHERE
+# coins >= X``) evaluated by the database, so concurrent requests can neither
+# lose an update nor overdraw. Only the changed columns are written; the
+# in-memory user is refreshed afterwards so callers see the new balance, and
+# cached copies from jwt_required are dropped.
 
 
 def get_available_balance(user: User) -> int:
@@ -14,26 +22,47 @@ def lock_coins(user: User, amount: int) -> None:
     """
     if amount <= 0:
         raise ValueError("Amount must be positive")
-    if user.coins < amount:
+
+    updated = User.objects.filter(pk=user.pk, coins__gte=amount).update(
+        coins=F("coins") - amount,
+        locked_coins=F("locked_coins") + amount,
+    )
+    if not updated:
         raise ValueError("Insufficient balance")
 
-    with transaction.atomic():
-        user.coins -= amount
-        user.locked_coins += amount
-        user.save()
+    invalidate_users(user.pk)
+    user.refresh_from_db(fields=["coins", "locked_coins"])
 
 
 def unlock_coins(user: User, amount: int) -> None:
     """Move locked coins back to available (e.g. withdrawal rejected)."""
     if amount <= 0:
         raise ValueError("Amount must be positive")
-    if user.locked_coins < amount:
+
+    updated = User.objects.filter(pk=user.pk, locked_coins__gte=amount).update(
+        locked_coins=F("locked_coins") - amount,
+        coins=F("coins") + amount,
+    )
+    if not updated:
         raise ValueError("Insufficient locked balance")
 
-    with transaction.atomic():
-        user.locked_coins -= amount
-        user.coins += amount
-        user.save()
+    invalidate_users(user.pk)
+    user.refresh_from_db(fields=["coins", "locked_coins"])
+
+
+def release_locked_coins(user: User, amount: int) -> None:
+    """Remove locked coins for good (withdrawal approved and paid out)."""
+    if amount <= 0:
+        raise ValueError("Amount must be positive")
+
+    updated = User.objects.filter(pk=user.pk, locked_coins__gte=amount).update(
+        locked_coins=F("locked_coins") - amount,
+    )
+    if not updated:
+        raise ValueError("Insufficient locked balance")
+
+    invalidate_users(user.pk)
+    user.refresh_from_db(fields=["locked_coins"])
 
 
 def add_coins(user: User, amount: int, tx_type="purchase"):
@@ -44,8 +73,7 @@ def add_coins(user: User, amount: int, tx_type="purchase"):
         raise ValueError("Amount must be positive")
 
     with transaction.atomic():
-        user.coins += amount
-        user.save()
+        User.objects.filter(pk=user.pk).update(coins=F("coins") + amount)
 
         Transaction.objects.create(
             user=user,
@@ -53,6 +81,9 @@ def add_coins(user: User, amount: int, tx_type="purchase"):
             type=tx_type
         )
 
+    invalidate_users(user.pk)
+    user.refresh_from_db(fields=["coins"])
+
 
 def deduct_coins(user: User, amount: int, tx_type="stake"):
     """
@@ -61,15 +92,18 @@ def deduct_coins(user: User, amount: int, tx_type="stake"):
     if amount <= 0:
         raise ValueError("Amount must be positive")
 
-    if user.coins < amount:
-        raise ValueError("Insufficient balance")
-
     with transaction.atomic():
-        user.coins -= amount
-        user.save()
+        updated = User.objects.filter(pk=user.pk, coins__gte=amount).update(
+            coins=F("coins") - amount
+        )
+        if not updated:
+            raise ValueError("Insufficient balance")
 
         Transaction.objects.create(
             user=user,
             amount=-amount,
             type=tx_type
         )
+
+    invalidate_users(user.pk)
+    user.refresh_from_db(fields=["coins"])
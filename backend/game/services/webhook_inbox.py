@@ -0,0 +1,310 @@
+"""
+Ack-first handling of Telegram webhook updates. The webhook only verifies
+the secret token and inserts the raw update into the WebhookUpdate inbox
+(a duplicate ``update_id`` is dropped by the unique constraint), then
+answers 200 so Telegram never retries a slow delivery. Pre-checkout
+queries, which Telegram needs answered within 10 seconds, and successful
+payments are handed to a small thread pool in the web process (the fast
+lane) right after the insert, so a deployment without a worker still
+credits purchases. process_webhooks drains the inbox in batches: updates
+the fast lane failed on, dropped or never saw (the web process restarted).
+"""
+
+import hmac
+import logging
+import queue
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from game.models import Payment, WebhookUpdate
+from game.services.telegram_bot import get_bot_client
+from game.services.wallet import add_coins
+
+logger = logging.getLogger(__name__)
+
+PRE_CHECKOUT_WINDOW = 10  # seconds Telegram waits for answerPreCheckoutQuery
+CLAIM_TIMEOUT = 5 * 60  # seconds before a claimed update whose worker died is retried
+MAX_ATTEMPTS = 5
+DRAIN_BATCH_SIZE = 100
+FAST_LANE_KINDS = ("pre_checkout", "payment")
+
+
+class WebhookError(Exception):
+    """An update could not be processed; it is retried up to MAX_ATTEMPTS."""
+
+
+def secret_token_ok(header):
+    """Check X-Telegram-Bot-Api-Secret-Token; any request passes while no secret is configured."""
+    secret = settings.TELEGRAM_WEBHOOK_SECRET
+    if not secret:
+        return True
+    return hmac.compare_digest((header or "").encode(), secret.encode())
+
+
+def update_kind(data):
+    if "pre_checkout_query" in data:
+        return "pre_checkout"
+    if "successful_payment" in (data.get("message") or {}):
+        return "payment"
+    return "other"
+
+
+def _inbox_row(data):
+    update_id = data.get("update_id") if isinstance(data, dict) else None
+    if not isinstance(update_id, int):
+        raise ValueError("Update has no update_id")
+    return WebhookUpdate(update_id=update_id, kind=update_kind(data), payload=data)
+
+
+def enqueue_update(data):
+    """Store an update in the inbox (once per update_id) and fast-lane the ones users wait on."""
+    row = _inbox_row(data)
+    WebhookUpdate.objects.bulk_create([row], ignore_conflicts=True)
+    if row.kind in FAST_LANE_KINDS:
+        transaction.on_commit(lambda: fast_lane_submit(row.update_id))
+    return row
+
+
+async def aenqueue_update(data):
+    row = _inbox_row(data)
+    await WebhookUpdate.objects.abulk_create([row], ignore_conflicts=True)
+    if row.kind in FAST_LANE_KINDS:
+        fast_lane_submit(row.update_id)
+    return row
+
+
+# -------------------------
+# Handlers
+# -------------------------
+def pre_checkout_answer(query, valid):
+    return {
+        "pre_checkout_query_id": query["id"],
+        "ok": valid,
+        "error_message": "Payment session expired or invalid." if not valid else ""
+    }
+
+
+def answer_pre_checkout(query):
+    # Verify if payment exists in our DB
+    valid = Payment.objects.filter(payload_id=query.get("invoice_payload"), status="pending").exists()
+    # TelegramAPIError propagates so the update is retried
+    get_bot_client().call("answerPreCheckoutQuery", pre_checkout_answer(query, valid))
+
+
+def complete_payment(sp):
+    """
+    Mark the payment of a successful_payment update completed and credit the
+    coins, once. Returns a result body and an HTTP-style status code.
+    """
+    payload_id = sp.get("invoice_payload")
+    telegram_charge_id = sp.get("telegram_payment_charge_id")
+
+    try:
+        # Atomic update to prevent race conditions or duplicate processing
+        with transaction.atomic():
+            # Claim the payment with one conditional UPDATE before reading
+            # anything, so concurrent deliveries cannot both complete it (and
+            # SQLite never has to upgrade a read lock). Unclaimed pool invoices
+            # are refused at pre-checkout and have no user.
+            now = timezone.now()
+            claimed = Payment.objects.filter(payload_id=payload_id).exclude(
+                status__in=["pooled", "completed"]
+            ).update(
+                status="completed",
+                telegram_payment_charge_id=telegram_charge_id,
+                provider_payment_charge_id=sp.get("provider_payment_charge_id"),
+                completed_at=now,
+                updated_at=now,
+            )
+            if not claimed:
+                if Payment.objects.filter(telegram_payment_charge_id=telegram_charge_id).exists():
+                    return {"status": "already_processed"}, 200
+                if Payment.objects.filter(payload_id=payload_id, status="completed").exists():
+                    return {"status": "already_completed"}, 200
+                raise Payment.DoesNotExist
+
+            # Credit user
+            payment_obj = Payment.objects.select_related("user").get(payload_id=payload_id)
+            add_coins(payment_obj.user, payment_obj.coins_credited, tx_type="purchase")
+
+        return {"status": "ok"}, 200
+
+    except IntegrityError:
+        # The charge ID is already recorded on another payment
+        return {"status": "already_processed"}, 200
+    except Payment.DoesNotExist:
+        logger.error(f"Payment record not found for payload: {payload_id}")
+        return {"error": "Payment record not found"}, 404
+    except Exception as e:
+        logger.error(f"Webhook error: {traceback.format_exc()}")
+        return {"error": str(e)}, 500
+
+
+def handle_update(update):
+    """
+    Process one claimed update. Returns an error text for updates that can
+    never succeed, None when done; raises WebhookError to have it retried.
+    """
+    data = update.payload
+    if update.kind == "pre_checkout":
+        if timezone.now() - update.received_at > timedelta(seconds=PRE_CHECKOUT_WINDOW):
+            return "Pre-checkout window passed"
+        try:
+            answer_pre_checkout(data["pre_checkout_query"])
+        except Exception as e:
+            raise WebhookError(str(e)) from e
+    elif update.kind == "payment":
+        body, status = complete_payment(data["message"]["successful_payment"])
+        if status >= 500:
+            raise WebhookError(body["error"])
+        if status >= 400:
+            return body["error"]
+    return None
+
+
+def _finish(update, error=None, retry=False):
+    if retry and update.attempts < MAX_ATTEMPTS:
+        WebhookUpdate.objects.filter(pk=update.pk).update(status="queued", error=error)
+        return
+    WebhookUpdate.objects.filter(pk=update.pk).update(
+        status="failed" if error else "done", error=error or "", processed_at=timezone.now()
+    )
+
+
+def process(update):
+    try:
+        error = handle_update(update)
+    except WebhookError as e:
+        logger.warning("Webhook update %s failed (attempt %s): %s", update.update_id, update.attempts, e)
+        _finish(update, str(e), retry=True)
+    except Exception:
+        logger.exception("Webhook update %s crashed", update.update_id)
+        _finish(update, traceback.format_exc(), retry=True)
+    else:
+        _finish(update, error)
+
+
+# -------------------------
+# Claiming
+# -------------------------
+def claim_update(update_id):
+    """Claim one queued update by id (one conditional UPDATE). Returns it, or None if taken."""
+    claimed = WebhookUpdate.objects.filter(update_id=update_id, status="queued").update(
+        status="processing", claimed_at=timezone.now(), attempts=F("attempts") + 1
+    )
+    return WebhookUpdate.objects.get(update_id=update_id) if claimed else None
+
+
+def claim_batch(size=DRAIN_BATCH_SIZE, kinds=None, since=None):
+    """
+    Claim up to ``size`` queued updates (and ones whose worker died), oldest
+    first. With ``since``, updates already tried after that time are left
+    for a later pass.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = WebhookUpdate.objects.filter(
+            Q(status="queued") | Q(status="processing", claimed_at__lt=now - timedelta(seconds=CLAIM_TIMEOUT))
+        )
+        if kinds:
+            pending = pending.filter(kind__in=kinds)
+        if since is not None:
+            pending = pending.filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=since))
+        if connection.features.has_select_for_update_skip_locked:
+            # Leave updates another worker is claiming right now alone
+            pending = pending.select_for_update(skip_locked=True)
+        ids = list(pending.order_by("id").values_list("pk", flat=True)[:size])
+        if not ids:
+            return []
+        WebhookUpdate.objects.filter(pk__in=ids).update(
+            status="processing", claimed_at=now, attempts=F("attempts") + 1
+        )
+    return list(WebhookUpdate.objects.filter(pk__in=ids).order_by("id"))
+
+
+def drain(batch_size=DRAIN_BATCH_SIZE, kinds=None):
+    """
+    Process inbox batches until none is left. Failed updates are retried on
+    the next call. Returns how many updates were processed.
+    """
+    since = timezone.now()
+    total = 0
+    while True:
+        batch = claim_batch(batch_size, kinds, since)
+        if not batch:
+            return total
+        for update in batch:
+            process(update)
+        total += len(batch)
+
+
+def prune(days):
+    """Delete processed updates older than ``days`` days. Returns how many."""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = WebhookUpdate.objects.filter(status="done", processed_at__lt=cutoff).delete()
+    return deleted
+
+
+# -------------------------
+# Fast lane
+# -------------------------
+class FastLane:
+    """Daemon threads in the web process handling FAST_LANE_KINDS updates as soon as they are stored."""
+
+    def __init__(self, threads, maxsize=10_000):
+        self.threads = threads
+        self.update_ids = queue.Queue(maxsize=maxsize)
+        self._workers = []
+
+    def submit(self, update_id):
+        try:
+            self.update_ids.put_nowait(update_id)
+        except queue.Full:
+            # Still in the inbox; process_webhooks picks it up
+            logger.warning("Webhook fast lane full, leaving update %s to the workers", update_id)
+
+    def start(self):
+        if self._workers:
+            return
+
+        def run():
+            while True:
+                update_id = self.update_ids.get()
+                try:
+                    update = claim_update(update_id)
+                    if update is not None:
+                        process(update)
+                except Exception:
+                    logger.exception("Webhook fast lane failed on update %s", update_id)
+                finally:
+                    close_old_connections()
+                    self.update_ids.task_done()
+
+        for i in range(self.threads):
+            worker = threading.Thread(target=run, name=f"webhook-fast-lane-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+
+_fast_lane = None
+
+
+def get_fast_lane():
+    """Fast lane with ``settings.WEBHOOK_FAST_LANE_THREADS`` threads (None if 0), started once per process."""
+    global _fast_lane
+    if _fast_lane is None and settings.WEBHOOK_FAST_LANE_THREADS > 0:
+        _fast_lane = FastLane(settings.WEBHOOK_FAST_LANE_THREADS)
+        _fast_lane.start()
+    return _fast_lane
+
+
+def fast_lane_submit(update_id):
+    lane = get_fast_lane()
+    if lane is not None:
+        lane.submit(update_id)
@@ -1,3 +1,414 @@
-from django.test import TestCase
+import json
+import random
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.db.models import Sum
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from game import async_views, views
+from game.models import Match, PairStats, Payment, Rating, RoundMove, Transaction, User, WebhookUpdate
+from game.services.analytics import get_platform_metrics, rollup_metrics
+from game.services.anti_farm import PAIR_MATCH_LIMIT
+from game.services.fraud import DUMP_MIN_COINS, PAIR_MIN_MATCHES, FraudScorer
+from game.services.jwt_service import generate_jwt
+from game.services.match import enter_match
+from game.services.quick_play import apply_ai_round
+from game.services.rating_replay import apply_ratings, replay_history
+from game.services.reaper import _cancel_active
+from game.services.round_state import DatabaseRoundStore
+from game.services.settlement import settle_match
+from game.services.user_cache import get_user_cache
+from game.services.wallet import add_coins, deduct_coins
+from game.services.webhook_inbox import complete_payment
+
+
+def run_concurrently(*targets):
+    """
+    Run each callable in its own thread (and so its own database connection),
+    all released at the same instant. Returns their results in order;
+    an exception in any thread is re-raised here.
+    """
+    barrier = threading.Barrier(len(targets))
+    results, errors = [None] * len(targets), []
+
+    def run(i, target):
+        try:
+            barrier.wait()
+            results[i] = target()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(i, target)) for i, target in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+class DatabaseRoundStoreTests(TransactionTestCase):
+    """Two workers handling the two players of one match at once."""
+
+    def setUp(self):
+        self.store = DatabaseRoundStore()
+        self.player1 = User.objects.create(telegram_id=1, username="p1")
+        self.player2 = User.objects.create(telegram_id=2, username="p2")
+
+    def test_concurrent_moves_are_both_recorded(self):
+        for _ in range(10):
+            match = Match.objects.create(player1=self.player1, player2=self.player2, stake=50, status="active")
+
+            def play(user, move):
+                self.store.start_round(match.id)
+                return self.store.submit_move(match.id, user.id, move)
+
+            run_concurrently(lambda: play(self.player1, "rock"), lambda: play(self.player2, "paper"))
+
+            self.assertEqual(
+                self.store.get_round(match.id)["moves"],
+                {self.player1.id: "rock", self.player2.id: "paper"},
+            )
+
+    def test_only_one_caller_ends_the_round(self):
+        for _ in range(10):
+            match = Match.objects.create(player1=self.player1, player2=self.player2, stake=50, status="active")
+            self.store.start_round(match.id)
+
+            ended = run_concurrently(lambda: self.store.end_round(match.id), lambda: self.store.end_round(match.id))
+
+            self.assertEqual(sorted(ended), [False, True])
+            self.assertIsNone(self.store.get_round(match.id))
+
+    def test_move_submitted_as_the_round_ends_reports_round_over(self):
+        match = Match.objects.create(player1=self.player1, player2=self.player2, stake=50, status="active")
+        self.store.start_round(match.id)
+        insert = RoundMove.objects.bulk_create
+
+        def end_then_insert(*args, **kwargs):
+            # The other player's request closes the round after the live-round check
+            self.store.end_round(match.id)
+            return insert(*args, **kwargs)
+
+        with mock.patch.object(RoundMove.objects, "bulk_create", end_then_insert):
+            self.assertIsNone(self.store.submit_move(match.id, self.player1.id, "rock"))
+        self.assertFalse(RoundMove.objects.exists())
+
+
+class SettlementTests(TestCase):
+    def assertNumStatements(self, expected, func, *args):
+        """assertNumQueries without transaction control (BEGIN, COMMIT, savepoints)."""
+        with CaptureQueriesContext(connection) as queries:
+            result = func(*args)
+        statements = [
+            q["sql"] for q in queries.captured_queries
+            if not q["sql"].upper().startswith(("BEGIN", "COMMIT", "SAVEPOINT", "RELEASE"))
+        ]
+        self.assertEqual(len(statements), expected, "\n".join(statements))
+        return result
+
+    def setUp(self):
+        self.player1 = User.objects.create(telegram_id=1, username="p1", coins=0)
+        self.player2 = User.objects.create(telegram_id=2, username="p2", coins=0)
+        Rating.objects.bulk_create([Rating(user=self.player1), Rating(user=self.player2)])
+        self.match = Match.objects.create(
+            player1=self.player1, player2=self.player2, stake=50, status="active", player1_score=2
+        )
+
+    def test_settles_in_seven_queries(self):
+        # Match UPDATE, balance UPDATE, ledger bulk INSERT, rake INSERT,
+        # then the pair's anti-farm lookup and the ratings' read and write
+        self.assertTrue(self.assertNumStatements(7, settle_match, self.match, self.player1))
+
+    def test_second_settlement_is_a_no_op(self):
+        settle_match(self.match, self.player1)
+        balances = dict(User.objects.values_list("id", "coins"))
+        ratings = dict(Rating.objects.values_list("user_id", "value"))
+        ledger = Transaction.objects.count()
+
+        match = Match.objects.get(pk=self.match.pk)
+        self.assertFalse(settle_match(match, self.player2))
+
+        self.assertEqual(dict(User.objects.values_list("id", "coins")), balances)
+        self.assertEqual(Transaction.objects.count(), ledger)
+        self.assertEqual(Match.objects.get(pk=self.match.pk).winner_id, self.player1.id)
+        self.assertEqual(dict(Rating.objects.values_list("user_id", "value")), ratings)
+
+    def test_updates_both_ratings(self):
+        settle_match(self.match, self.player1)
+
+        self.assertTrue(Match.objects.get(pk=self.match.pk).rated)
+        self.assertEqual(
+            dict(Rating.objects.values_list("user_id", "value")),
+            {self.player1.id: 1016, self.player2.id: 984},
+        )
+
+    def test_farmed_pair_gains_no_rating(self):
+        PairStats.objects.create(user_low=self.player1, user_high=self.player2, match_count=PAIR_MATCH_LIMIT)
+
+        settle_match(self.match, self.player1)
+
+        self.assertEqual(
+            dict(Rating.objects.values_list("user_id", "value")),
+            {self.player1.id: 1000, self.player2.id: 984},
+        )
+
+
+class RatingReplayTests(TestCase):
+    def test_rebuild_reproduces_live_ratings(self):
+        users = [User.objects.create(telegram_id=i + 1, username=f"u{i}", coins=10_000) for i in range(4)]
+        # Quick-play only: kept as the rating's offset
+        rating = Rating.objects.create(user=users[3])
+        for result in ("win", "win", "lose"):
+            apply_ai_round(rating, result)
+        rating.save()
+
+        # A pair past the anti-farm limit, a cancelled match counting towards it, and a third player
+        for winner, loser in [(0, 1), (1, 0), (0, 1), (0, 1), (2, 0), (1, 2)]:
+            match = enter_match(users[winner], users[loser], 50)
+            match.player1_score = 2
+            settle_match(match, users[winner])
+        enter_match(users[0], users[1], 50)
+        Match.objects.filter(status="active").update(status="cancelled")
+        settle_match(enter_match(users[1], users[0], 50), users[1])
+
+        ratings, played, games = replay_history()
+        updated, created = apply_ratings(ratings, played, dry_run=True)
+
+        self.assertEqual(games, 7)
+        self.assertEqual((updated, created), (0, 0))
+
+
+class FraudScorerTests(TestCase):
+    SHARED_IP = "203.0.113.7"
+
+    def setUp(self):
+        self.users = [User.objects.create(telegram_id=i + 1, username=f"u{i}").pk for i in range(4)]
+        self.scorer = FraudScorer()
+        self.at = time.time()
+
+    def play(self, player1, player2, winner, ip1=SHARED_IP, ip2=SHARED_IP, stake=50):
+        self.at += 1
+        event = {
+            "match": int(self.at), "player1": player1, "player2": player2,
+            "player1_ip": ip1, "player2_ip": ip2, "stake": stake, "at": self.at,
+        }
+        self.scorer.process(dict(event, kind="match.created"))
+        self.scorer.process(dict(event, kind="match.finished", winner=winner))
+
+    def flagged(self):
+        return set(User.objects.filter(is_flagged=True).values_list("id", flat=True))
+
+    def test_honest_play_from_a_shared_ip_flags_nobody(self):
+        with self.assertLogs("game.services.fraud", "WARNING") as logs:
+            for i in range(24):
+                a, b = self.users[i % 4], self.users[(i + 1 + i // 4) % 4]
+                self.play(a, b, (a, b)[i // 2 % 2])
+
+        self.assertIn("for review, not flagged", logs.output[0])
+        self.assertEqual(self.flagged(), set())
+
+    def test_one_sided_pair_on_one_ip_is_flagged(self):
+        winner, loser = self.users[:2]
+        for _ in range(PAIR_MIN_MATCHES):
+            self.play(winner, loser, winner)
+
+        self.assertEqual(self.flagged(), {winner, loser})
+
+    def test_one_sided_pair_on_different_ips_is_not_flagged(self):
+        # A strong player against a weak one
+        winner, loser = self.users[:2]
+        for _ in range(PAIR_MIN_MATCHES):
+            self.play(winner, loser, winner, "192.0.2.1", "198.51.100.1")
+
+        self.assertEqual(self.flagged(), set())
+
+    def test_one_sided_pair_below_the_win_rate_is_not_flagged(self):
+        winner, loser = self.users[:2]
+        for i in range(PAIR_MIN_MATCHES):
+            self.play(winner, loser, loser if i == 0 else winner)
+
+        self.assertEqual(self.flagged(), set())
+
+    def test_losses_dumped_on_one_opponent_are_flagged(self):
+        receiver, dumper = self.users[:2]
+        self.play(receiver, dumper, receiver, "192.0.2.1", "198.51.100.1", stake=DUMP_MIN_COINS)
+
+        self.assertEqual(self.flagged(), {receiver, dumper})
+
+    def test_losses_spread_over_opponents_are_not_flagged(self):
+        loser, *winners = self.users
+        # 75% of the losses to one opponent, under DUMP_SHARE
+        for winner, stake in zip(winners, (DUMP_MIN_COINS // 2, DUMP_MIN_COINS // 2, 3 * DUMP_MIN_COINS)):
+            self.play(winner, loser, winner, "192.0.2.1", "198.51.100.1", stake=stake)
+
+        self.assertEqual(self.flagged(), set())
+
+
+class WalletConcurrencyTests(TransactionTestCase):
+    """Concurrent stakes, escrows and credits against a few shared balances."""
+
+    STAKE = 50
+
+    def test_balances_match_the_ledger(self):
+        users = [User.objects.create(telegram_id=i + 1, username=f"u{i}", coins=0) for i in range(4)]
+        for user in users:
+            add_coins(user, 4 * self.STAKE, tx_type="purchase")
+
+        def op(i):
+            # A fresh (soon stale) copy per request, as jwt_required would load it
+            player1, player2 = (User.objects.get(pk=users[(i + k) % len(users)].pk) for k in (0, 1))
+            try:
+                if i % 4 == 0:
+                    add_coins(player1, self.STAKE, tx_type="win")
+                elif i % 4 == 1:
+                    deduct_coins(player1, self.STAKE, tx_type="stake")
+                else:
+                    enter_match(player1, player2, self.STAKE)
+            except ValueError:
+                return None
+            return i % 4
+
+        done = run_concurrently(*(lambda i=i: op(i) for i in range(24)))
+
+        for user in User.objects.all():
+            ledger = Transaction.objects.filter(user=user).aggregate(total=Sum("amount"))["total"]
+            self.assertEqual(user.coins, ledger)
+            self.assertGreaterEqual(user.coins, 0)
+
+        # Each escrow debited both players or neither
+        matches = Match.objects.count()
+        self.assertEqual(matches, sum(1 for kind in done if kind in (2, 3)))
+        self.assertEqual(
+            Transaction.objects.filter(type="stake").count(),
+            2 * matches + done.count(1),
+        )
+
+
+class ReaperTests(TestCase):
+    def test_match_settled_after_the_select_is_not_refunded(self):
+        player1 = User.objects.create(telegram_id=1, username="p1", coins=0)
+        player2 = User.objects.create(telegram_id=2, username="p2", coins=0)
+        stuck = Match.objects.create(player1=player1, player2=player2, stake=50, status="active")
+        settled = Match.objects.create(player1=player1, player2=player2, stake=50, status="active", player1_score=2)
+        batch = list(Match.objects.filter(status="active"))
+
+        # The PvP round finishes between the reaper's select and its UPDATE
+        settle_match(settled, player1)
+        cancelled = _cancel_active(batch)
+
+        self.assertEqual([m.id for m in cancelled], [stuck.id])
+        self.assertEqual(Match.objects.get(pk=settled.pk).status, "finished")
+        self.assertEqual(Match.objects.get(pk=stuck.pk).status, "cancelled")
+
+
+class PlatformMetricsTests(TestCase):
+    def test_saving_a_rolled_up_payment_does_not_count_it_twice(self):
+        user = User.objects.create(telegram_id=1, username="p1", coins=0)
+        Payment.objects.create(user=user, payload_id="p", amount=100, coins_credited=1000)
+        complete_payment({"invoice_payload": "p", "telegram_payment_charge_id": "c"})
+        paid_at = timezone.now() - timedelta(hours=3)
+        Payment.objects.update(completed_at=paid_at, updated_at=paid_at)
+        rollup_metrics()
+
+        # Any later save (an admin edit, a refund note) bumps updated_at
+        Payment.objects.get(payload_id="p").save()
+
+        self.assertEqual(get_platform_metrics()["revenue"]["total_stars"], 100)
+
+
+class AsyncViewParityTests(TestCase):
+    """
+    Each view in game.async_views (served while ASYNC_VIEWS is on) against
+    its sync twin in game.views, called by two users in the same state.
+    """
+
+    def setUp(self):
+        self.users = [User.objects.create(telegram_id=i + 1, username=f"u{i}", coins=1000) for i in range(4)]
+        # Ids are reused between tests; don't let the user cache serve a previous test's row
+        get_user_cache().invalidate([user.pk for user in self.users])
+
+    def post(self, view, user, body, headers=None):
+        """POST ``body`` as JSON to the view as ``user``. Returns (status, JSON body)."""
+        headers = {"Authorization": f"Bearer {generate_jwt(user)}", **(headers or {})}
+        if view.__module__ == async_views.__name__:
+            request = AsyncRequestFactory().post("/", body, content_type="application/json", headers=headers)
+            response = async_to_sync(view)(request)
+        else:
+            request = RequestFactory().post("/", body, content_type="application/json", headers=headers)
+            response = view(request)
+        return response.status_code, json.loads(response.content)
+
+    def assertSameResponse(self, name, body, sync_user=None, async_user=None, headers=None):
+        """Both versions of the view answer alike (random draws seeded the same). Returns the async response."""
+        responses = []
+        for module, user in ((views, sync_user or self.users[0]), (async_views, async_user or self.users[1])):
+            random.seed(0)
+            responses.append(self.post(getattr(module, name), user, body, headers))
+        self.assertEqual(responses[0], responses[1])
+        return responses[1]
+
+    def test_wallet_balance(self):
+        self.assertEqual(self.assertSameResponse("wallet_balance", {}), (200, {"coins": 1000, "locked_coins": 0}))
+
+    def test_find_match(self):
+        # Each side queues a player at its own stake, then pairs them with a second one
+        self.post(views.find_match, self.users[0], {"stake": 50})
+        self.post(async_views.find_match, self.users[1], {"stake": 100})
+        responses = [
+            self.post(views.find_match, self.users[2], {"stake": 50}),
+            self.post(async_views.find_match, self.users[3], {"stake": 100}),
+        ]
+
+        for (status, body), player in zip(responses, self.users[:2]):
+            self.assertEqual((status, body["matched"]), (200, True))
+            self.assertEqual(Match.objects.get(pk=body["match_id"]).player1_id, player.pk)
+
+    def test_quick_play_submit(self):
+        self.assertEqual(self.assertSameResponse("quick_play_submit", {"move": "rock", "stake": 50})[0], 200)
+        self.assertEqual(self.assertSameResponse("quick_play_submit", {"move": "lizard", "stake": 50})[0], 400)
+
+    def test_quick_play_batch(self):
+        moves = ["rock", "paper", "scissors"]
+        status, body = self.assertSameResponse("quick_play_batch", {"moves": moves, "stake": 50})
+        self.assertEqual((status, body["played"]), (200, 3))
+        self.assertEqual(self.assertSameResponse("quick_play_batch", {"moves": [], "stake": 50})[0], 400)
+
+    def test_create_invoice_view(self):
+        Payment.objects.bulk_create(
+            Payment(
+                payload_id=f"pool-{i}", invoice_link="https://t.me/$pooled", amount=100, coins_credited=100,
+                status="pooled", expires_at=timezone.now() + timedelta(hours=1),
+            )
+            for i in range(2)
+        )
+        responses = [
+            self.post(module.create_invoice_view, user, {"amount": 100})
+            for module, user in ((views, self.users[0]), (async_views, self.users[1]))
+        ]
+
+        for (status, body), user in zip(responses, self.users):
+            self.assertEqual((status, body["invoice_link"]), (200, "https://t.me/$pooled"))
+            self.assertEqual(Payment.objects.get(pk=body["payment_id"]).user_id, user.pk)
+
+    @override_settings(TELEGRAM_WEBHOOK_SECRET="secret")
+    def test_telegram_webhook(self):
+        self.assertEqual(self.assertSameResponse("telegram_webhook", {"update_id": 1})[0], 403)
+
+        for update_id, module in enumerate((views, async_views), start=1):
+            response = self.post(
+                module.telegram_webhook, self.users[0], {"update_id": update_id, "message": {"text": "hi"}},
+                headers={"X-Telegram-Bot-Api-Secret-Token": "secret"},
+            )
+            self.assertEqual(response, (200, {"status": "queued"}))
+        self.assertEqual(sorted(WebhookUpdate.objects.values_list("update_id", flat=True)), [1, 2])
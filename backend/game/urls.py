@@ -1,4 +1,4 @@
-from .views import find_match
+from django.conf import settings
 from django.urls import path
 from .views import (
     telegram_login,
@@ -9,8 +9,19 @@ from .views import (
     request_withdrawal,
     withdraw_list,
 )
-from .views import submit_move_view, quick_play_submit
-from .views import telegram_webhook, health_check, create_invoice_view, migration_status, run_migrations, repair_db
+from .views import submit_move_view, quick_play_submit, quick_play_batch
+from .views import health_check, create_invoice_view, migration_status, run_migrations, repair_db
+from .views import find_match
+from .views import leaderboard_top, leaderboard_me
+
+if settings.ASYNC_VIEWS:
+    from .async_views import (  # noqa: F811
+        create_invoice_view,
+        find_match,
+        quick_play_batch,
+        quick_play_submit,
+        wallet_balance,
+    )
 
 urlpatterns = [
     path("auth/telegram/", telegram_login),
@@ -23,6 +34,9 @@ urlpatterns = [
     path("match/find/", find_match),
     path("match/", submit_move_view),
     path("match/submit/", quick_play_submit),
+    path("match/submit/batch/", quick_play_batch),
+    path("leaderboard/", leaderboard_top),
+    path("leaderboard/me/", leaderboard_me),
     path("withdraw/request/", request_withdrawal),
     path("withdraw/list/", withdraw_list),
     path("health/", health_check),
@@ -1,32 +1,32 @@
 import json
 import time
-import random
-from urllib.parse import unquote
 
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST, require_GET
 from django.utils import timezone
-from django.db import transaction, models
 from django.db.models import Sum
-from datetime import timedelta
 
 
 import logging
 logger = logging.getLogger(__name__)
 
-import uuid
-import requests
 from django.conf import settings
 from .models import User, Match, Payment, Withdrawal, Transaction, Rating
 from game.services.auth import jwt_required
+from game.services.invoice_pool import claim_invoice, invoice_link_request, new_payload_id
+from game.services.leaderboard import MAX_PAGE, decode_cursor, get_leaderboard, rating_saved
+from game.services.rate_limit import rate_limit
 from game.services.telegram_auth import verify_telegram_data
 from game.services.wallet import add_coins, deduct_coins, lock_coins
-from game.services.rps_engine import validate_move, decide_round_winner
-from game.services.round_state import start_round, submit_move, get_round, end_round
+from game.services.rps_engine import validate_move, decide_round_winner, ROUND_TIMEOUT
+from game.services.round_state import start_round, submit_move, end_round
 from game.services.matchmaking import enqueue_player
+from game.services.match import resolve_round
 from game.services.payout import payout_match
-from game.services.rating_service import expected_score, update_elo
+from game.services.quick_play import MAX_BATCH_ROUNDS, STAKE_OPTIONS, apply_ai_round, play_ai_round, play_batch
+from game.services.telegram_bot import CircuitOpenError, get_bot_client
+from game.services.webhook_inbox import enqueue_update, secret_token_ok
 
 # -------------------------
 # Health check
@@ -184,7 +184,7 @@ def wallet_transactions(request):
 
 
 @csrf_exempt
-@jwt_required
+@jwt_required(fresh=True)
 @require_POST
 def wallet_add_coins(request):
     body = json.loads(request.body)
@@ -199,7 +199,7 @@ def wallet_add_coins(request):
 
 
 @csrf_exempt
-@jwt_required
+@jwt_required(fresh=True)
 @require_POST
 def wallet_deduct_coins(request):
     body = json.loads(request.body)
@@ -218,6 +218,7 @@ def wallet_deduct_coins(request):
 @csrf_exempt
 @jwt_required
 @require_POST
+@rate_limit("find_match")
 def find_match(request):
     body = json.loads(request.body)
     stake = int(body.get("stake"))
@@ -243,6 +244,7 @@ def find_match(request):
 @csrf_exempt
 @jwt_required
 @require_POST
+@rate_limit("submit_move")
 def submit_move_view(request):
     body = json.loads(request.body)
     match_id = body.get("match_id")
@@ -252,68 +254,47 @@ def submit_move_view(request):
     if not validate_move(move):
         return JsonResponse({"error": "Invalid move"}, status=400)
 
-    # Rapid play detection: max 10 matches per minute
-    recent_matches = Match.objects.filter(
-        player1=request.user
-    ).filter(
-        created_at__gte=timezone.now() - timedelta(minutes=1)
-    ).count()
-
-    if recent_matches > 10:
-        return JsonResponse({"error": "Too many matches. Slow down."}, status=429)
-
     match = Match.objects.get(id=match_id)
 
-    round_data = get_round(match_id)
-    if not round_data:
-        start_round(match_id)
-        round_data = get_round(match_id)
+    round_data = start_round(match_id)
 
-    if time.time() - round_data["start_time"] > 2:
+    if time.time() - round_data["start_time"] > ROUND_TIMEOUT:
         end_round(match_id)
         return JsonResponse({"error": "Round timeout"}, status=400)
 
-    submit_move(match_id, request.user.id, move)
+    moves = submit_move(match_id, request.user.id, move)
+    if moves is None:
+        return JsonResponse({"error": "Round timeout"}, status=400)
 
-    moves = round_data["moves"]
     if len(moves) < 2:
         return JsonResponse({"status": "waiting"})
 
-    p1 = match.player1.id
-    p2 = match.player2.id
-
-    result = decide_round_winner(
-        moves.get(p1),
-        moves.get(p2)
-    )
-
-    if result == "player1":
-        match.player1_score += 1
-    elif result == "player2":
-        match.player2_score += 1
-
-    match.save()
-    end_round(match_id)
-
-    if match.player1_score == 2 or match.player2_score == 2:
-        from game.services.payout import payout_match
+    move1 = moves.get(match.player1_id)
+    move2 = moves.get(match.player2_id)
 
-        winner = match.player1 if match.player1_score == 2 else match.player2
-        match.winner = winner
-        match.status = "finished"
-        match.save()
-
-        payout_match(winner, match.stake, match=match)
+    # Both players may complete the round at once; only the one that closes it scores it
+    if end_round(match_id):
+        outcome = resolve_round(match, move1, move2)
+    else:
+        match.refresh_from_db()
+        outcome = {
+            "round_result": decide_round_winner(move1, move2),
+            "player1_score": match.player1_score,
+            "player2_score": match.player2_score,
+            "match_finished": match.status == "finished",
+            "winner": match.winner.username if match.winner else None,
+        }
 
+    if outcome["match_finished"]:
         return JsonResponse({
             "match_finished": True,
-            "winner": winner.username
+            "winner": outcome["winner"]
         })
 
     return JsonResponse({
-        "round_result": result,
-        "player1_score": match.player1_score,
-        "player2_score": match.player2_score
+        "round_result": outcome["round_result"],
+        "player1_score": outcome["player1_score"],
+        "player2_score": outcome["player2_score"]
     })
 
 # -------------------------
@@ -332,11 +313,19 @@ def create_invoice_view(request):
     if amount <= 0:
         return JsonResponse({"error": "Invalid amount"}, status=400)
 
+    # Pool hit: an invoice created ahead of time by refill_invoice_pool
+    payment_obj = claim_invoice(request.user, amount)
+    if payment_obj is not None:
+        return JsonResponse({
+            "invoice_link": payment_obj.invoice_link,
+            "payment_id": payment_obj.id
+        })
+
     # 1 Star = 1 Coin (adjust ratio as needed)
     coins_to_credit = amount
 
-    payload_id = f"pay_{uuid.uuid4().hex}"
-    
+    payload_id = new_payload_id()
+
     payment_obj = None
     try:
         payment_obj = Payment.objects.create(
@@ -348,21 +337,9 @@ def create_invoice_view(request):
         )
 
         # Telegram API to get invoice link
-        token = settings.TELEGRAM_BOT_TOKEN
-        url = f"https://api.telegram.org/bot{token}/createInvoiceLink"
-        
-        payload = {
-            "title": f"Purchase {coins_to_credit} Coins",
-            "description": f"Buy {coins_to_credit} coins for Rock-Paper-Scissors Arena",
-            "payload": payload_id,
-            "currency": "XTR",
-            "prices": [
-                {"label": f"{coins_to_credit} Coins", "amount": amount}
-            ]
-        }
-
-        resp = requests.post(url, json=payload, timeout=10)
-        res_data = resp.json()
+        res_data = get_bot_client().call(
+            "createInvoiceLink", invoice_link_request(payload_id, coins_to_credit, amount)
+        )
         if res_data.get("ok"):
             return JsonResponse({
                 "invoice_link": res_data["result"],
@@ -376,6 +353,10 @@ def create_invoice_view(request):
                 "details": res_data.get("description", "Unknown error"),
                 "raw": res_data
             }, status=400)
+    except CircuitOpenError:
+        payment_obj.status = "failed"
+        payment_obj.save()
+        return JsonResponse({"error": "Payments are temporarily unavailable"}, status=503)
     except Exception as e:
         import traceback
         error_tb = traceback.format_exc()
@@ -400,85 +381,28 @@ def create_invoice_view(request):
 # -------------------------
 @csrf_exempt
 def telegram_webhook(request):
+    """Store the update in the inbox and ack at once; see game.services.webhook_inbox."""
     if request.method != "POST":
         return JsonResponse({"error": "invalid request"}, status=400)
 
-    data = json.loads(request.body)
-    token = settings.TELEGRAM_BOT_TOKEN
-
-    # 1. Handle Pre-Checkout Query (Requirement for Telegram Payments)
-    if "pre_checkout_query" in data:
-        query = data["pre_checkout_query"]
-        payload_id = query.get("invoice_payload")
-        
-        # Verify if payment exists in our DB
-        valid = Payment.objects.filter(payload_id=payload_id, status="pending").exists()
-        
-        url = f"https://api.telegram.org/bot{token}/answerPreCheckoutQuery"
-        answer = {
-            "pre_checkout_query_id": query["id"],
-            "ok": valid,
-            "error_message": "Payment session expired or invalid." if not valid else ""
-        }
-        requests.post(url, json=answer, timeout=10)
-        return JsonResponse({"status": "pre_checkout_handled"})
-
-    # 2. Handle Successful Payment
-    if "message" in data and "successful_payment" in data["message"]:
-        sp = data["message"]["successful_payment"]
-        payload_id = sp.get("invoice_payload")
-        telegram_charge_id = sp.get("telegram_payment_charge_id")
+    if not secret_token_ok(request.headers.get("X-Telegram-Bot-Api-Secret-Token")):
+        return JsonResponse({"error": "Forbidden"}, status=403)
 
-        try:
-            # Atomic update to prevent race conditions or duplicate processing
-            with transaction.atomic():
-                # Check for existing completed payment with this charge ID (extra safety)
-                if Payment.objects.filter(telegram_payment_charge_id=telegram_charge_id).exists():
-                    return JsonResponse({"status": "already_processed"})
-
-                payment_obj = Payment.objects.select_for_update().get(payload_id=payload_id)
-                
-                if payment_obj.status == "completed":
-                    return JsonResponse({"status": "already_completed"})
-
-                # Update payment record
-                payment_obj.telegram_payment_charge_id = telegram_charge_id
-                payment_obj.provider_payment_charge_id = sp.get("provider_payment_charge_id")
-                payment_obj.status = "completed"
-                payment_obj.save()
-
-                # Credit user
-                user = payment_obj.user
-                add_coins(user, payment_obj.coins_credited, tx_type="purchase")
-
-            return JsonResponse({"status": "ok"})
-
-        except Payment.DoesNotExist:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Payment record not found for payload: {payload_id}")
-            return JsonResponse({"error": "Payment record not found"}, status=404)
-        except Exception as e:
-            import traceback
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Webhook error: {traceback.format_exc()}")
-            return JsonResponse({"error": str(e)}, status=500)
-
-    return JsonResponse({"status": "ignored"})
+    try:
+        enqueue_update(json.loads(request.body))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
-# Stake options (fixed values only, Phase 1)
-STAKE_OPTIONS = [50, 100, 200]
-AI_OPPONENT_RATING = 1000
-K_FACTOR = 32
+    return JsonResponse({"status": "queued"})
 
 
 # -------------------------
 # Quick-play vs AI (for Telegram Mini App)
 # -------------------------
 @csrf_exempt
-@jwt_required
+@jwt_required(fresh=True)
 @require_POST
+@rate_limit("quick_play")
 def quick_play_submit(request):
     """Single-round RPS vs random opponent. Deducts stake, pays out on win, updates rating."""
     body = json.loads(request.body)
@@ -498,12 +422,7 @@ def quick_play_submit(request):
     deduct_coins(request.user, stake, tx_type="stake")
     balance_after_stake = request.user.coins
 
-    opponent_move = random.choice(["rock", "paper", "scissors"])
-    result = decide_round_winner(move, opponent_move)
-
-    # Map internal result to frontend format
-    result_map = {"player1": "win", "player2": "lose", "draw": "draw"}
-    result_str = result_map.get(result, "draw")
+    opponent_move, result_str = play_ai_round(move)
 
     if result_str == "win":
         payout_match(request.user, stake)
@@ -514,12 +433,9 @@ def quick_play_submit(request):
 
     # Rating: get or create, then update vs AI (fixed 1000)
     rating_obj, _ = Rating.objects.get_or_create(user=request.user, defaults={"value": 1000})
-    old_rating = rating_obj.value
-    expected = expected_score(old_rating, AI_OPPONENT_RATING)
-    actual = 1 if result_str == "win" else (0.5 if result_str == "draw" else 0)
-    rating_delta = int(K_FACTOR * (actual - expected))
-    rating_obj.value = max(0, old_rating + rating_delta)
+    rating_delta = apply_ai_round(rating_obj, result_str)
     rating_obj.save()
+    rating_saved(rating_obj)
 
     return JsonResponse({
         "player_move": move,
@@ -532,12 +448,93 @@ def quick_play_submit(request):
     })
 
 
+@csrf_exempt
+@jwt_required(fresh=True)
+@require_POST
+@rate_limit("quick_play_batch")
+def quick_play_batch(request):
+    """Auto-play: one round vs random opponent per move, settled in a single transaction."""
+    body = json.loads(request.body)
+    moves = body.get("moves")
+    stake = int(body.get("stake", 0))
+
+    if not isinstance(moves, list) or not 0 < len(moves) <= MAX_BATCH_ROUNDS:
+        return JsonResponse({"error": f"Send 1 to {MAX_BATCH_ROUNDS} moves"}, status=400)
+
+    if not all(validate_move(move) for move in moves):
+        return JsonResponse({"error": "Invalid move"}, status=400)
+
+    if stake not in STAKE_OPTIONS:
+        return JsonResponse({"error": "Invalid stake"}, status=400)
+
+    if request.user.coins < stake:
+        return JsonResponse({"error": "Insufficient balance"}, status=400)
+
+    try:
+        rounds = play_batch(request.user, moves, stake)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=409)
+
+    return JsonResponse({
+        "rounds": rounds,
+        "played": len(rounds),
+        # Play stops at the first round the balance cannot cover
+        "stopped_early": len(rounds) < len(moves),
+        "new_balance": request.user.coins,
+        "new_rating": rounds[-1]["new_rating"] if rounds else None,
+    })
+
+
 # -------------------------
-# Request withdrawal
+# Leaderboard
 # -------------------------
 @csrf_exempt
 @jwt_required
+@require_GET
+def leaderboard_top(request):
+    """Highest ratings first, ``limit`` per page; pass ``next_cursor`` back as ``cursor`` for the next one."""
+    try:
+        limit = int(request.GET.get("limit", 50))
+        cursor = request.GET.get("cursor")
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit or cursor"}, status=400)
+
+    if not 0 < limit <= MAX_PAGE:
+        return JsonResponse({"error": f"limit must be 1 to {MAX_PAGE}"}, status=400)
+
+    entries, next_cursor = get_leaderboard().top(limit, after)
+    usernames = dict(User.objects.filter(id__in=[user_id for _, user_id, _ in entries]).values_list("id", "username"))
+
+    return JsonResponse({
+        "entries": [
+            {"rank": rank, "username": usernames.get(user_id), "rating": value}
+            for rank, user_id, value in entries
+        ],
+        "next_cursor": next_cursor,
+    })
+
+
+@csrf_exempt
+@jwt_required
+@require_GET
+def leaderboard_me(request):
+    """The current user's rank (shared by equal ratings) among all rated players."""
+    position = get_leaderboard().rank(request.user.id)
+    if position is None:
+        return JsonResponse({"rank": None, "rating": None})
+
+    rank, value, total = position
+    return JsonResponse({"rank": rank, "rating": value, "total": total})
+
+
+# -------------------------
+# Request withdrawal
+# -------------------------
+@csrf_exempt
+@jwt_required(fresh=True)
 @require_POST
+@rate_limit("request_withdrawal")
 def request_withdrawal(request):
     body = json.loads(request.body)
     amount = int(body.get("amount", 0))
@@ -561,10 +558,11 @@ def request_withdrawal(request):
     if request.user.coins < amount:
         return JsonResponse({"error": "Insufficient balance"}, status=400)
 
-    today = timezone.now().date()
+    # A range on the raw column (not requested_at__date) so the index applies
+    today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
     daily_total = Withdrawal.objects.filter(
         user=request.user,
-        requested_at__date=today,
+        requested_at__gte=today_start,
     ).aggregate(total=Sum("amount"))["total"] or 0
 
     if daily_total + amount > DAILY_LIMIT: